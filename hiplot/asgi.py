@@ -0,0 +1,211 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Asynchronous (ASGI) version of the HiPlot server, for production use with several users.
+Fetchers are blocking, so requests to `/data` are handled in a thread pool, while the event loop keeps serving
+other requests.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import mimetypes
+import os
+import typing as tp
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from .disk_cache import DiskCache
+from .experiment import ExperimentFetcher
+from .fetchers import get_fetchers, get_tail_reader, set_load_workers
+from .isolation import set_isolation_workers
+from .render import get_index_html_template
+from .server import LIVE_KEEPALIVE_INTERVAL, LIVE_POLL_INTERVAL, DataService, HTTPResponse, StreamingHTTPResponse, sse_event
+
+ASGIApp = tp.Callable[[tp.Dict[str, tp.Any], tp.Callable[[], tp.Awaitable[tp.Any]], tp.Callable[[tp.Any], tp.Awaitable[None]]],
+                      tp.Awaitable[None]]
+
+CONFIG_ENV_VARIABLE = "HIPLOT_ASGI_CONFIG"
+STATIC_DIR = (Path(__file__).parent / "static").resolve()
+
+
+def _serve_static(path: str) -> HTTPResponse:
+    file = (STATIC_DIR / path).resolve()
+    if STATIC_DIR not in file.parents or not file.is_file():
+        return 404, {"Content-Type": "text/plain"}, b"Not Found"
+    mimetype, _ = mimetypes.guess_type(str(file))
+    return 200, {"Content-Type": mimetype or "application/octet-stream"}, file.read_bytes()
+
+
+def create_asgi_app(fetchers: tp.List[ExperimentFetcher], cache_entries: int = 16, cache_bytes: int = 1 << 30,
+                    max_threads: tp.Optional[int] = None, disk_cache: tp.Optional[DiskCache] = None) -> ASGIApp:
+    """
+    Creates the HiPlot ASGI application, that can be served with any ASGI server (uvicorn, hypercorn...)
+
+    :param max_threads: Maximum number of `/data` requests handled at the same time
+    :param disk_cache: Persistent cache of parsed experiments, shared by all server processes (see :func:`hiplot.server.run_server`)
+    """
+    service = DataService(fetchers, cache_entries=cache_entries, cache_bytes=cache_bytes, disk_cache=disk_cache)
+    executor = concurrent.futures.ThreadPoolExecutor(max_threads, thread_name_prefix="hiplot-data")
+    index_html = get_index_html_template().encode("utf-8")
+
+    def handle(path: str, query: tp.Dict[str, tp.List[str]],
+               headers: tp.Dict[str, str]) -> tp.Union[HTTPResponse, StreamingHTTPResponse]:
+        if path == "/data":
+            if "uri" not in query:
+                return 400, {"Content-Type": "text/plain"}, b"Missing uri"
+            if query.get("format") == ["delta"]:
+                return service.get_data_delta(query["uri"][0], query.get("watermark", ["0"])[0])
+            if query.get("format") == ["stream"]:
+                return service.get_data_stream(
+                    query["uri"][0],
+                    accept_encoding=headers.get("accept-encoding"),
+                    if_none_match=headers.get("if-none-match"),
+                )
+            return service.get_data(
+                query["uri"][0],
+                data_format=query.get("format", ["json"])[0],
+                accept_encoding=headers.get("accept-encoding"),
+                if_none_match=headers.get("if-none-match"),
+            )
+        if path == "/cache_stats":
+            return service.get_cache_stats()
+        return _serve_static(path[len("/static/"):])
+
+    async def live_events(query: tp.Dict[str, tp.List[str]], receive: tp.Callable[[], tp.Awaitable[tp.Any]],
+                          send: tp.Callable[[tp.Any], tp.Awaitable[None]]) -> None:
+        # Same as `DataService.get_live_events`, but we wait between polls in the event loop instead of blocking a thread
+        loop = asyncio.get_running_loop()
+        uri = query["uri"][0] if "uri" in query else None
+        if uri is None or await loop.run_in_executor(executor, get_tail_reader, service.fetchers, uri) is None:
+            body = b"Live updates are not supported for this experiment"
+            await send({"type": "http.response.start", "status": 404, "headers": [(b"content-type", b"text/plain")]})
+            await send({"type": "http.response.body", "body": body})
+            return
+        watermark = query.get("watermark", ["0"])[0]
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")],
+        })
+        await send({"type": "http.response.body", "body": f"retry: {int(LIVE_POLL_INTERVAL * 5000)}\n\n".encode("utf-8"), "more_body": True})
+
+        async def wait_disconnect() -> None:
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        disconnected = asyncio.ensure_future(wait_disconnect())
+        last_event = loop.time()
+        try:
+            while not disconnected.done():
+                new_watermark = await loop.run_in_executor(executor, service.poll_live, uri, watermark)
+                if new_watermark is not None:
+                    watermark = new_watermark
+                    await send({"type": "http.response.body", "body": sse_event("update", {"watermark": watermark}), "more_body": True})
+                    last_event = loop.time()
+                elif loop.time() - last_event > LIVE_KEEPALIVE_INTERVAL:
+                    await send({"type": "http.response.body", "body": b": keepalive\n\n", "more_body": True})
+                    last_event = loop.time()
+                await asyncio.wait([disconnected], timeout=LIVE_POLL_INTERVAL)
+        finally:
+            disconnected.cancel()
+
+    async def app(scope: tp.Dict[str, tp.Any], receive: tp.Callable[[], tp.Awaitable[tp.Any]],
+                  send: tp.Callable[[tp.Any], tp.Awaitable[None]]) -> None:
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    executor.shutdown(wait=False)
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        assert scope["type"] == "http", scope["type"]
+        path = scope["path"]
+        loop = asyncio.get_running_loop()
+        body: tp.Union[bytes, tp.Iterator[bytes]]
+        if path == "/data_events":
+            await live_events(parse_qs(scope["query_string"].decode("latin-1")), receive, send)
+            return
+        if path == "/":
+            status, headers, body = 200, {"Content-Type": "text/html; charset=utf-8"}, index_html
+        elif path in ["/data", "/cache_stats"] or path.startswith("/static/"):
+            query = parse_qs(scope["query_string"].decode("latin-1"))
+            request_headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+            status, headers, body = await loop.run_in_executor(executor, handle, path, query, request_headers)
+        else:
+            status, headers, body = 404, {"Content-Type": "text/plain"}, b"Not Found"
+        if isinstance(body, bytes):
+            headers["Content-Length"] = str(len(body))
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()],
+        })
+        if isinstance(body, bytes):
+            await send({"type": "http.response.body", "body": body})
+            return
+        # Streamed response: chunks are serialized in the thread pool too
+        while True:
+            chunk = await loop.run_in_executor(executor, next, body, None)
+            if chunk is None:
+                break
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    return app
+
+
+def create_asgi_app_from_env() -> ASGIApp:
+    """
+    Application factory for ASGI servers running several worker processes: the configuration is given
+    as JSON in the `HIPLOT_ASGI_CONFIG` environment variable (see :func:`run_asgi_server`)
+    """
+    config = json.loads(os.environ.get(CONFIG_ENV_VARIABLE, "{}"))
+    set_load_workers(config.get("load_workers"), processes=config.get("load_processes", False))
+    fetcher_processes = config.get("fetcher_processes", 0)
+    if fetcher_processes > 0:
+        set_isolation_workers(fetcher_processes)
+    return create_asgi_app(
+        fetchers=get_fetchers(config.get("fetchers", []), isolate=fetcher_processes > 0, timeout=config.get("fetcher_timeout"),
+                              max_memory_mb=config.get("fetcher_memory_mb")),
+        cache_entries=config.get("cache_entries", 16),
+        cache_bytes=config.get("cache_bytes", 1 << 30),
+        disk_cache=DiskCache(config["disk_cache"], max_bytes=config.get("disk_cache_bytes", 1 << 32)) if config.get("disk_cache") else None,
+    )
+
+
+def run_asgi_server(fetchers: tp.List[str], host: str = '127.0.0.1', port: int = 5005, workers: int = 1,
+                    cache_entries: int = 16, cache_bytes: int = 1 << 30,
+                    load_workers: tp.Optional[int] = None, load_processes: bool = False, fetcher_processes: int = 0,
+                    fetcher_timeout: tp.Optional[float] = None, fetcher_memory_mb: tp.Optional[int] = None,
+                    disk_cache: tp.Optional[str] = None, disk_cache_bytes: int = 1 << 32) -> None:
+    """
+    Runs the HiPlot ASGI app with `uvicorn`, in `workers` processes
+
+    :param fetchers: Additional fetchers specifications (see :func:`hiplot.fetchers.get_fetchers`)
+    :param fetcher_processes: If positive, run the additional fetchers in this many worker processes
+        (per server process), with the `fetcher_timeout` and `fetcher_memory_mb` limits (see :class:`hiplot.isolation.IsolatedFetcher`)
+    :param disk_cache: Directory of the persistent cache of parsed experiments (see :class:`hiplot.disk_cache.DiskCache`)
+    """
+    try:
+        import uvicorn
+    except ModuleNotFoundError as e:
+        raise RuntimeError("Running HiPlot in async mode requires `uvicorn`. Install it with `pip install uvicorn`") from e
+    # Worker processes create their own app from the environment
+    os.environ[CONFIG_ENV_VARIABLE] = json.dumps({
+        "fetchers": fetchers,
+        "cache_entries": cache_entries,
+        "cache_bytes": cache_bytes,
+        "load_workers": load_workers,
+        "load_processes": load_processes,
+        "fetcher_processes": fetcher_processes,
+        "fetcher_timeout": fetcher_timeout,
+        "fetcher_memory_mb": fetcher_memory_mb,
+        "disk_cache": disk_cache,
+        "disk_cache_bytes": disk_cache_bytes,
+    })
+    uvicorn.run("hiplot.asgi:create_asgi_app_from_env", factory=True, host=host, port=port, workers=workers, log_level="warning")
@@ -0,0 +1,133 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Binary columnar format to transmit an experiment to the browser.
+Numeric columns are sent as raw typed-array buffers, that javascript can use without parsing (see `src/lib/binary.ts`).
+
+Layout (all integers are little-endian):
+- 4 bytes: magic string `HIPB`
+- 4 bytes: uint32, length of the JSON header in bytes (including padding)
+- JSON header, padded with spaces so that buffers start on an 8-bytes boundary
+- Buffers of numeric columns, each one aligned on 8 bytes (offsets are relative to the end of the header)
+
+The header contains:
+- `extra`: data sent along with the experiment (eg the query for the webserver)
+- `experiment`: the experiment, without its datapoints
+- `num_rows`, `uid`, `from_uid`: number of datapoints, and their uids/parents encoded as in `compress.py`
+- `columns`: for each column its name, and either a `dtype` ("float64" or "int32") with an `offset` in the buffers,
+    or a `dtype` "json" with `values` encoded as in `compress.py`
+"""
+
+import array
+import struct
+import sys
+import typing as tp
+
+from . import jsonenc
+from .columns import ColumnData, RESERVED_COLUMNS, column_typecode
+from .compress import encode_column, encode_from_uids, encode_uids, decode_column, decode_from_uids
+from .experiment import Experiment
+
+MAGIC = b"HIPB"
+MIME_TYPE = "application/vnd.hiplot.experiment"
+_ALIGNMENT = 8
+_INT32_RANGE = (-2 ** 31, 2 ** 31 - 1)
+_MAX_SAFE_INTEGER = 2 ** 53
+
+
+def _to_little_endian(buf: tp.Union["array.array[tp.Any]", memoryview]) -> bytes:
+    if sys.byteorder == "big":
+        swapped = array.array(column_typecode(buf))  # type: ignore
+        swapped.frombytes(memoryview(buf).cast("B"))
+        swapped.byteswap()
+        return swapped.tobytes()
+    return buf.tobytes()
+
+
+def _encode_numeric(col: ColumnData) -> tp.Optional[tp.Tuple[str, bytes]]:
+    typecode = column_typecode(col)
+    if typecode is None or not col:
+        return None
+    assert not isinstance(col, list)
+    if typecode == "d":
+        return "float64", _to_little_endian(col)
+    assert typecode == "q", typecode
+    low, high = min(col), max(col)
+    if _INT32_RANGE[0] <= low and high <= _INT32_RANGE[1]:
+        return "int32", _to_little_endian(array.array("i" if array.array("i").itemsize == 4 else "l", col))
+    if -_MAX_SAFE_INTEGER <= low and high <= _MAX_SAFE_INTEGER:  # Javascript numbers can represent these exactly
+        return "float64", _to_little_endian(array.array("d", col))
+    return None
+
+
+def dumps(xp: Experiment, extra: tp.Optional[tp.Dict[str, tp.Any]] = None) -> bytes:
+    """
+    Serializes an experiment in binary format
+    """
+    experiment = xp._settings_asdict()
+    store = xp._get_columns()
+
+    columns: tp.List[tp.Dict[str, tp.Any]] = []
+    buffers: tp.List[bytes] = []
+    offset = 0
+    for name, col in store.columns.items():
+        if name in RESERVED_COLUMNS:
+            continue
+        numeric = _encode_numeric(col)
+        if numeric is None:
+            columns.append({"name": name, "dtype": "json", "values": encode_column(col)})
+            continue
+        dtype, buf = numeric
+        columns.append({"name": name, "dtype": dtype, "offset": offset})
+        padding = -len(buf) % _ALIGNMENT
+        buffers.append(buf + b"\0" * padding)
+        offset += len(buf) + padding
+
+    header = jsonenc.dumps({
+        "extra": extra if extra is not None else {},
+        "experiment": experiment,
+        "num_rows": len(store),
+        "uid": encode_uids(store.uids),
+        "from_uid": encode_from_uids(store.uids, store.from_uids),
+        "columns": columns,
+    }).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + 4 + len(header)) % _ALIGNMENT)
+    return b"".join([MAGIC, struct.pack("<I", len(header)), header] + buffers)
+
+
+def loads(data: bytes) -> tp.Dict[str, tp.Any]:
+    """
+    Reference decoder, mirrors `src/lib/binary.ts`. Returns the `extra` data, with an `experiment` key
+    that contains the experiment with its datapoints as they would be sent in JSON.
+    """
+    assert data[:len(MAGIC)] == MAGIC, "Not an HiPlot binary experiment"
+    header_len, = struct.unpack_from("<I", data, len(MAGIC))
+    buffers_start = len(MAGIC) + 4 + header_len
+    header = jsonenc.loads(data[len(MAGIC) + 4:buffers_start])
+    num_rows = header["num_rows"]
+    uids = decode_column(header["uid"], num_rows)
+    from_uids = decode_from_uids(header["from_uid"], uids)
+    values: tp.List[tp.Sequence[tp.Any]] = []
+    for col in header["columns"]:
+        if col["dtype"] == "json":
+            values.append(decode_column(col["values"], num_rows))
+            continue
+        typed = array.array({"float64": "d", "int32": "i"}[col["dtype"]])
+        start = buffers_start + col["offset"]
+        typed.frombytes(data[start:start + num_rows * typed.itemsize])
+        if sys.byteorder == "big":
+            typed.byteswap()
+        values.append(typed)
+    names = [col["name"] for col in header["columns"]]
+    return {
+        **header["extra"],
+        "experiment": {
+            **header["experiment"],
+            "datapoints": [
+                {"uid": uid, "from_uid": from_uid, "values": dict(zip(names, row))}
+                for uid, from_uid, row in zip(uids, from_uids, zip(*values) if values else [()] * num_rows)
+            ],
+        },
+    }
@@ -0,0 +1,194 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import concurrent.futures
+import functools
+import gzip
+import hashlib
+import sys
+import threading
+import typing as tp
+from collections import OrderedDict
+
+from .columns import column_typecode
+from .experiment import Experiment
+
+T = tp.TypeVar("T")
+
+
+def estimate_experiment_size(xp: Experiment) -> int:
+    """
+    Rough estimate of the memory used by an experiment, in bytes
+    """
+    store = xp._columns
+    if store is None:
+        return sum(sys.getsizeof(dp) + sys.getsizeof(dp.uid) + sys.getsizeof(dp.values) for dp in xp.datapoints)
+    size = sum(sys.getsizeof(uid) for uid in store.uids)
+    for col in store.columns.values():
+        # Values in lists are mostly shared (small ints, repeated strings...) so we only count pointers
+        size += len(col) * (col.itemsize if column_typecode(col) is not None else 8)  # type: ignore
+    return size
+
+
+@functools.lru_cache(maxsize=None)
+def available_encodings() -> tp.Tuple[str, ...]:
+    """
+    Content encodings we can compress responses with: gzip, and brotli if it's installed
+    """
+    try:
+        import brotli  # pylint: disable=unused-import
+    except ModuleNotFoundError:
+        return ("gzip",)
+    return ("gzip", "br")
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        import brotli
+        return brotli.compress(body, quality=5)  # type: ignore
+    assert encoding == "gzip", encoding
+    return gzip.compress(body, compresslevel=6)
+
+
+class EncodedResponse:
+    """
+    A serialized response, with its ETag. The body is compressed on demand, for the encoding clients ask for,
+    and compressed bodies are kept so that we don't compress it again for every request.
+    Responses in an :class:`ExperimentCache` are compressed with every encoding we support.
+    """
+
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.encodings: tp.Dict[str, bytes] = {}
+
+    def compressed(self, encoding: str) -> bytes:
+        data = self.encodings.get(encoding)
+        if data is None:
+            data = self.encodings[encoding] = _compress(self.body, encoding)
+        return data
+
+    def compress_all(self) -> None:
+        for encoding in available_encodings():
+            self.compressed(encoding)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.body) + sum(len(b) for b in self.encodings.values())
+
+
+class CacheEntry:
+    def __init__(self, version: tp.Any, experiment: Experiment) -> None:
+        self.version = version
+        self.experiment = experiment
+        self.responses: tp.Dict[str, EncodedResponse] = {}
+        self.nbytes = estimate_experiment_size(experiment)
+
+
+class ExperimentCache:
+    """
+    LRU cache of loaded experiments and of their serialized responses, for the webserver.
+    Entries are invalidated when the version of their URI changes (see :func:`hiplot.fetchers.get_uri_version`).
+
+    :param max_entries: Maximum number of experiments in the cache
+    :param max_bytes: Maximum (estimated) size of the cache in bytes
+    """
+
+    def __init__(self, max_entries: int = 16, max_bytes: int = 1 << 30) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, uri: str, version: tp.Any) -> tp.Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(uri)
+            if entry is not None and entry.version != version:
+                self._remove(uri)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(uri)
+            return entry
+
+    def put(self, uri: str, version: tp.Any, experiment: Experiment) -> CacheEntry:
+        entry = CacheEntry(version, experiment)
+        with self._lock:
+            if uri in self._entries:
+                self._remove(uri)
+            self._entries[uri] = entry
+            self.nbytes += entry.nbytes
+            self._evict()
+        return entry
+
+    def add_response(self, uri: str, entry: CacheEntry, key: str, response: EncodedResponse) -> None:
+        response.compress_all()  # Before we count its size, and outside of the lock
+        with self._lock:
+            if self._entries.get(uri) is not entry or key in entry.responses:
+                return  # Evicted or invalidated in the meantime
+            entry.responses[key] = response
+            entry.nbytes += response.nbytes
+            self.nbytes += response.nbytes
+            self._evict()
+
+    def stats(self) -> tp.Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, uri: str) -> None:
+        self.nbytes -= self._entries.pop(uri).nbytes
+
+    def _evict(self) -> None:
+        # Always keep the most recent entry, even if it's too big
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the function,
+    and callers that arrive while it's running wait for its result (or exception) instead of running it again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: tp.Dict[tp.Hashable, "concurrent.futures.Future[tp.Any]"] = {}
+
+    def do(self, key: tp.Hashable, fn: tp.Callable[[], T]) -> tp.Tuple[T, bool]:
+        """
+        Returns the result of `fn`, and whether it was shared with another caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = concurrent.futures.Future()
+        if not leader:
+            return call.result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return result, False
@@ -0,0 +1,267 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import array
+import typing as tp
+
+if tp.TYPE_CHECKING:
+    import pandas as pd
+    from .experiment import Datapoint
+
+ColumnBuilder = tp.Union["array.array[tp.Any]", tp.List[tp.Any]]
+# Numeric columns can also be memoryviews of a memory-mapped file (see `snapshot.py`)
+ColumnData = tp.Union[ColumnBuilder, memoryview]
+
+RESERVED_COLUMNS = ["uid", "from_uid"]
+
+
+class _Missing:
+    """
+    Marks a value that is absent from a datapoint (as opposed to a value set to `None`)
+    """
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "MISSING"
+
+    def __reduce__(self) -> str:
+        return "MISSING"
+
+
+MISSING: tp.Any = _Missing()
+
+_BASE62_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def compact_uid(index: int) -> str:
+    """
+    Returns a short uid for the `index`-th datapoint of an experiment (base 62: "0", ..., "Z", "10", ...)
+    """
+    if index < 62:
+        return _BASE62_DIGITS[index]
+    digits: tp.List[str] = []
+    while index:
+        index, d = divmod(index, 62)
+        digits.append(_BASE62_DIGITS[d])
+    return "".join(reversed(digits))
+
+
+# Numeric types we can store in a typed array (we don't want to store `bool` as integers)
+_TYPECODES: tp.Dict[type, str] = {float: "d", int: "q"}
+
+
+def pack_column(values: tp.List[tp.Any]) -> ColumnData:
+    """
+    Stores a column in a typed array if all its values are floats (or all are integers).
+    Other columns (strings, mixed types, missing values...) are kept as lists.
+    """
+    if not values:
+        return values
+    types = set(map(type, values))
+    if len(types) != 1:
+        return values
+    typecode = _TYPECODES.get(types.pop())
+    if typecode is None:
+        return values
+    try:
+        return array.array(typecode, values)
+    except OverflowError:  # Integers that don't fit in 64 bits
+        return values
+
+
+def column_typecode(col: ColumnData) -> tp.Optional[str]:
+    """
+    Returns the typecode of a numeric column ("d" for floats, "q" for integers), or `None` for lists
+    """
+    if isinstance(col, array.array):
+        return col.typecode
+    if isinstance(col, memoryview):
+        return col.format
+    return None
+
+
+def column_from_series(series: "pd.Series") -> ColumnData:
+    """
+    Converts a pandas Series to a column without creating a Python object per value for numeric dtypes
+    """
+    from pandas.api.types import is_extension_array_dtype
+
+    dtype = series.dtype
+    if is_extension_array_dtype(dtype):  # eg nullable integers
+        return pack_column(series.tolist())
+    if dtype.kind == "f":
+        floats = array.array("d")
+        floats.frombytes(series.to_numpy(dtype="float64").tobytes())
+        return floats
+    if dtype.kind == "i" or (dtype.kind == "u" and dtype.itemsize < 8):
+        ints = array.array("q")
+        ints.frombytes(series.to_numpy(dtype="int64").tobytes())
+        return ints
+    return pack_column(series.tolist())
+
+
+def _concat_columns(parts: tp.List[ColumnData]) -> ColumnData:
+    typecodes = {column_typecode(p) for p in parts}
+    if len(typecodes) == 1 and None not in typecodes:
+        merged = array.array(typecodes.pop())  # type: ignore
+        for p in parts:
+            merged.frombytes(memoryview(p).cast("B"))  # type: ignore
+        return merged
+    values: tp.List[tp.Any] = []
+    for p in parts:
+        values.extend(p)
+    return values
+
+
+class ColumnStore:
+    """
+    Columnar storage for the datapoints of an :class:`hiplot.Experiment`.
+    Stores one typed array (or list) per column, along with the uids and parents uids of the datapoints.
+    Values missing from a datapoint are marked with :data:`MISSING`.
+    """
+
+    def __init__(self, uids: tp.List[str], from_uids: tp.List[tp.Optional[str]],
+                 columns: tp.Optional[tp.Dict[str, ColumnData]] = None) -> None:
+        self.uids = uids
+        self.from_uids = from_uids
+        self.columns: tp.Dict[str, ColumnData] = columns if columns is not None else {}
+        assert len(uids) == len(from_uids), (len(uids), len(from_uids))
+        for name, col in self.columns.items():
+            assert len(col) == len(uids), f"Column {name} has {len(col)} values, expected {len(uids)}"
+
+    def __len__(self) -> int:
+        return len(self.uids)
+
+    def __getstate__(self) -> tp.Dict[str, tp.Any]:
+        # Memory-mapped columns can't be pickled: copy them
+        state = dict(self.__dict__)
+        state["columns"] = {
+            name: array.array(col.format, col.tobytes()) if isinstance(col, memoryview) else col
+            for name, col in self.columns.items()
+        }
+        return state
+
+    @staticmethod
+    def from_rows(rows: tp.Iterable[tp.Dict[str, tp.Any]], row_offset: int = 0) -> "ColumnStore":
+        """
+        Builds columns from an iterable of dictionaries, with the same semantics as :meth:`hiplot.Experiment.from_iterable`
+
+        :param row_offset: Number of previous rows, for default uids
+        """
+        uids: tp.List[str] = []
+        from_uids: tp.List[tp.Optional[str]] = []
+        columns: tp.Dict[str, tp.List[tp.Any]] = {}
+        for k, row in enumerate(rows):
+            uids.append(str(row.get("uid", row_offset + k)))
+            from_uid = row.get("from_uid")
+            from_uids.append(from_uid if from_uid != '' else None)
+            num_values = 0
+            for name, value in row.items():
+                if name in RESERVED_COLUMNS:
+                    continue
+                col = columns.get(name)
+                if col is None:
+                    col = columns[name] = [MISSING] * k
+                col.append(value)
+                num_values += 1
+            if num_values != len(columns):
+                for col in columns.values():
+                    if len(col) <= k:
+                        col.append(MISSING)
+        return ColumnStore(uids, from_uids, {name: pack_column(col) for name, col in columns.items()})
+
+    @staticmethod
+    def from_values(uids: tp.List[str], from_uids: tp.List[tp.Optional[str]],
+                    values: tp.Iterable[tp.Dict[str, tp.Any]]) -> "ColumnStore":
+        """
+        Builds columns from per-datapoint values dictionaries. Contrary to :meth:`from_rows`, reserved keys are kept.
+        """
+        columns: tp.Dict[str, tp.List[tp.Any]] = {}
+        for k, row in enumerate(values):
+            for name, value in row.items():
+                col = columns.get(name)
+                if col is None:
+                    col = columns[name] = [MISSING] * k
+                col.append(value)
+            if len(row) != len(columns):
+                for col in columns.values():
+                    if len(col) <= k:
+                        col.append(MISSING)
+        return ColumnStore(uids, from_uids, {name: pack_column(col) for name, col in columns.items()})
+
+    @staticmethod
+    def from_datapoints(datapoints: tp.List["Datapoint"]) -> "ColumnStore":
+        return ColumnStore.from_values(
+            [dp.uid for dp in datapoints],
+            [dp.from_uid for dp in datapoints],
+            (dp.values for dp in datapoints),
+        )
+
+    @staticmethod
+    def concat(stores: tp.List["ColumnStore"]) -> "ColumnStore":
+        """
+        Concatenates the rows of several stores. Columns absent from a store are filled with :data:`MISSING`.
+        """
+        names: tp.Dict[str, None] = {}
+        for s in stores:
+            names.update(dict.fromkeys(s.columns))
+        uids: tp.List[str] = []
+        from_uids: tp.List[tp.Optional[str]] = []
+        for s in stores:
+            uids.extend(s.uids)
+            from_uids.extend(s.from_uids)
+        return ColumnStore(uids, from_uids, {
+            name: _concat_columns([s.columns[name] if name in s.columns else [MISSING] * len(s) for s in stores])
+            for name in names
+        })
+
+    def slice(self, start: int, stop: int) -> "ColumnStore":
+        """
+        Returns a store with the datapoints from `start` to `stop` (excluded)
+        """
+        return ColumnStore(self.uids[start:stop], self.from_uids[start:stop], {
+            name: col[start:stop] for name, col in self.columns.items()
+        })
+
+    def compact_uids(self, offset: int = 0) -> None:
+        """
+        Replaces uids with :func:`compact_uid` of the datapoint position (plus `offset`), and updates parents accordingly.
+        Parents that don't exist in this store are removed.
+        """
+        new_uids = [compact_uid(i) for i in range(offset, offset + len(self))]
+        mapping = dict(zip(self.uids, new_uids))
+        self.from_uids = [mapping.get(uid) if uid is not None else None for uid in self.from_uids]
+        self.uids = new_uids
+
+    def column_values(self, name: str, missing: tp.Any = None) -> tp.Sequence[tp.Any]:
+        """
+        Returns the values of a column, where missing values are replaced by `missing`
+        """
+        col = self.columns[name]
+        if column_typecode(col) is not None:
+            return col
+        return [missing if v is MISSING else v for v in col]
+
+    def values_at(self, index: int) -> tp.Dict[str, tp.Any]:
+        """
+        Returns the values of the `index`-th datapoint, as stored in :attr:`hiplot.Datapoint.values`
+        """
+        values: tp.Dict[str, tp.Any] = {}
+        for name, col in self.columns.items():
+            v = col[index]
+            if v is not MISSING:
+                values[name] = v
+        return values
+
+    def iter_values(self) -> tp.Iterator[tp.Dict[str, tp.Any]]:
+        """
+        Iterates over the values of every datapoint, as stored in :attr:`hiplot.Datapoint.values`
+        """
+        names = list(self.columns)
+        if not names:
+            for _ in range(len(self)):
+                yield {}
+            return
+        for row in zip(*self.columns.values()):
+            yield {name: v for name, v in zip(names, row) if v is not MISSING}
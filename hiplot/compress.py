@@ -3,32 +3,163 @@
 # LICENSE file in the root directory of this source tree.
 
 
+import itertools
 import typing as tp
 
+from .columns import ColumnStore, RESERVED_COLUMNS, MISSING, column_typecode, compact_uid
 from .experiment import Datapoint
 
+# Version 2 of the format encodes every column separately. An encoded column is a dictionary with an "enc" key:
+# - {"enc": "raw", "values": [...]}
+# - {"enc": "rle", "values": [...], "lengths": [...]}: run-length encoding, for constant stretches
+# - {"enc": "delta", "values": <encoded column>}: first value followed by differences between consecutive values,
+#       for monotonic integers (eg epochs, timestamps...)
+# - {"enc": "dict", "dict": [...], "values": <encoded column>}: indices in a dictionary of distinct values, for categorical values
+# - {"enc": "index", "offset": int}: uids "0", "1", "2"... as created by `Experiment.from_iterable`
+# - {"enc": "compact_index", "offset": int}: uids as created by `Experiment.compact_uids` (offset is optional)
+# - {"enc": "uid_ref", "values": <encoded column>}: for `from_uid`, distance (in rows) from each datapoint to its parent
+# See `src/lib/compress.ts` for the decoder on the javascript side
+V2_MIN_RUN_LENGTH = 2  # Use RLE if runs are longer than this on average
+V2_MAX_DICT_RATIO = 0.5  # Use a dictionary if there are less than this ratio of distinct values
+_NUMERIC_TYPES = {bool, int, float}
 
-def _build_columns_list(datapoints: tp.List[Datapoint]) -> tp.List[str]:
-    columns: tp.Set[str] = set()
-    for dp in datapoints:
-        columns = columns.union(dp.values.keys())
-    for reserved_col in ['uid', 'from_uid']:
-        try:
-            columns.remove(reserved_col)
-        except KeyError:
-            pass
-    return list(columns)
-
-
-def compress(datapoints: tp.List[Datapoint]) -> tp.Dict[str, tp.Any]:
-    columns = _build_columns_list(datapoints)
-    rows: tp.List[tp.Any] = []
-    for dp in datapoints:
-        d: tp.List[tp.Any] = [dp.uid, dp.from_uid]
-        for c in columns:
-            d.append(dp.values.get(c))
-        rows.append(d)
+
+def compress(datapoints: tp.Union[tp.List[Datapoint], ColumnStore], version: int = 2) -> tp.Dict[str, tp.Any]:
+    store = datapoints if isinstance(datapoints, ColumnStore) else ColumnStore.from_datapoints(datapoints)
+    columns = [c for c in store.columns if c not in RESERVED_COLUMNS]
+    if version == 2:
+        return {
+            "version": 2,
+            "num_rows": len(store),
+            "columns": columns,
+            "uid": encode_uids(store.uids),
+            "from_uid": encode_from_uids(store.uids, store.from_uids),
+            "values": [encode_column(store.columns[c]) for c in columns],
+        }
+    assert version == 1, f"Unknown compression version {version}"
+    rows: tp.List[tp.Any] = [
+        list(row)
+        for row in zip(store.uids, store.from_uids, *(store.column_values(c) for c in columns))
+    ]
     return {
         "columns": columns,
         "rows": rows
     }
+
+
+def _is_int_column(values: tp.Sequence[tp.Any]) -> bool:
+    typecode = column_typecode(values)  # type: ignore
+    if typecode is not None:
+        return typecode == "q"
+    return all(type(v) is int for v in values)  # pylint: disable=unidiomatic-typecheck
+
+
+def encode_column(values: tp.Sequence[tp.Any], nested: bool = False) -> tp.Dict[str, tp.Any]:
+    """
+    Chooses an encoding for a column. Nested columns (deltas, dictionary indices...) can only be RLE-encoded or raw.
+    """
+    num_values = len(values)
+    if isinstance(values, list):
+        if any(v is MISSING for v in values):
+            values = [None if v is MISSING else v for v in values]
+        if len(_NUMERIC_TYPES.intersection(map(type, values))) > 1:
+            # Equal values of different types (eg `True == 1 == 1.0`) would be merged with RLE or in a dictionary
+            return {"enc": "raw", "values": values}
+    run_values: tp.List[tp.Any] = []
+    run_lengths: tp.List[int] = []
+    for value, run in itertools.groupby(values):
+        run_values.append(value)
+        run_lengths.append(sum(1 for _ in run))
+    if len(run_values) * V2_MIN_RUN_LENGTH < num_values:
+        return {"enc": "rle", "values": run_values, "lengths": run_lengths}
+    if nested:
+        return {"enc": "raw", "values": list(values)}
+    if num_values > 1 and _is_int_column(values):
+        deltas = [values[0]] + [b - a for a, b in zip(values, itertools.islice(values, 1, None))]
+        if all(d >= 0 for d in itertools.islice(deltas, 1, None)):
+            return {"enc": "delta", "values": encode_column(deltas, nested=True)}
+    if column_typecode(values) != "d":  # type: ignore
+        try:
+            lookup: tp.Dict[tp.Any, int] = {}
+            indices = [lookup.setdefault(v, len(lookup)) for v in values]
+        except TypeError:  # Unhashable values
+            indices = []
+        if indices and len(lookup) < num_values * V2_MAX_DICT_RATIO:
+            return {"enc": "dict", "dict": list(lookup), "values": encode_column(indices, nested=True)}
+    return {"enc": "raw", "values": list(values)}
+
+
+def encode_uids(uids: tp.List[str], row_offset: int = 0) -> tp.Dict[str, tp.Any]:
+    """
+    :param row_offset: Position of the first datapoint in the experiment, when encoding a chunk of its datapoints
+    """
+    if uids and uids[0].isdigit():
+        offset = int(uids[0])
+        if all(uid == str(i) for i, uid in enumerate(uids, offset)):
+            return {"enc": "index", "offset": offset}
+    if all(uid == compact_uid(i) for i, uid in enumerate(uids, row_offset)):
+        return {"enc": "compact_index", "offset": row_offset} if row_offset else {"enc": "compact_index"}
+    return encode_column(uids)
+
+
+def encode_from_uids(uids: tp.List[str], from_uids: tp.List[tp.Optional[str]]) -> tp.Dict[str, tp.Any]:
+    uid_to_row = {uid: row for row, uid in enumerate(uids)}
+    distances: tp.List[tp.Optional[int]] = []
+    for row, from_uid in enumerate(from_uids):
+        if from_uid is None:
+            distances.append(None)
+            continue
+        parent_row = uid_to_row.get(from_uid)
+        if parent_row is None:  # Missing parent - can't be represented as a distance
+            return encode_column(from_uids)
+        distances.append(row - parent_row)
+    return {"enc": "uid_ref", "values": encode_column(distances)}
+
+
+def decode_column(enc: tp.Dict[str, tp.Any], num_rows: int) -> tp.List[tp.Any]:
+    kind = enc["enc"]
+    if kind == "raw":
+        return list(enc["values"])
+    if kind == "rle":
+        values: tp.List[tp.Any] = []
+        for v, length in zip(enc["values"], enc["lengths"]):
+            values.extend([v] * length)
+        return values
+    if kind == "delta":
+        return list(itertools.accumulate(decode_column(enc["values"], num_rows)))
+    if kind == "dict":
+        lookup = enc["dict"]
+        return [lookup[i] for i in decode_column(enc["values"], num_rows)]
+    if kind == "index":
+        return [str(i) for i in range(enc["offset"], enc["offset"] + num_rows)]
+    if kind == "compact_index":
+        offset = enc.get("offset", 0)
+        return [compact_uid(i) for i in range(offset, offset + num_rows)]
+    raise ValueError(f"Unknown column encoding: {kind}")
+
+
+def decode_from_uids(enc: tp.Dict[str, tp.Any], uids: tp.List[str]) -> tp.List[tp.Optional[str]]:
+    if enc["enc"] == "uid_ref":
+        distances = decode_column(enc["values"], len(uids))
+        return [uids[row - d] if d is not None else None for row, d in enumerate(distances)]
+    return decode_column(enc, len(uids))
+
+
+def uncompress(compressed: tp.Dict[str, tp.Any]) -> tp.List[Datapoint]:
+    """
+    Reference decoder, mirrors `uncompress` in `src/lib/compress.ts`
+    """
+    if compressed.get("version", 1) == 1:
+        columns = compressed["columns"]
+        return [
+            Datapoint(uid=row[0], from_uid=row[1], values=dict(zip(columns, row[2:])))
+            for row in compressed["rows"]
+        ]
+    num_rows = compressed["num_rows"]
+    uids = decode_column(compressed["uid"], num_rows)
+    from_uids = decode_from_uids(compressed["from_uid"], uids)
+    values = [decode_column(enc, num_rows) for enc in compressed["values"]]
+    return [
+        Datapoint(uid=uid, from_uid=from_uid, values=dict(zip(compressed["columns"], row)))
+        for uid, from_uid, row in zip(uids, from_uids, zip(*values) if values else itertools.repeat(()))
+    ]
@@ -0,0 +1,57 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Transparent decompression of experiment files (eg `results.csv.gz`, `train.log.xz`).
+Files are decompressed on the fly while they are parsed, and never entirely in memory or on disk.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import typing as tp
+from pathlib import Path
+
+_OPENERS: tp.Dict[str, tp.Callable[[str], tp.BinaryIO]] = {
+    ".gz": lambda path: tp.cast(tp.BinaryIO, gzip.open(path, "rb")),
+    ".bz2": lambda path: tp.cast(tp.BinaryIO, bz2.open(path, "rb")),
+    ".xz": lambda path: tp.cast(tp.BinaryIO, lzma.open(path, "rb")),
+}
+COMPRESSED_SUFFIXES = tuple(_OPENERS)
+# Decompressors are faster with large reads
+BUFFER_SIZE = 1 << 20
+
+
+def is_compressed(path: tp.Union[str, Path]) -> bool:
+    return str(path).endswith(COMPRESSED_SUFFIXES)
+
+
+def strip_compressed_suffix(path: str) -> str:
+    """
+    Returns the path without its compression suffix, eg `results.csv` for `results.csv.gz`
+    """
+    for suffix in COMPRESSED_SUFFIXES:
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+def with_compressed_suffixes(suffixes: tp.Sequence[str]) -> tp.Tuple[str, ...]:
+    """
+    Returns the suffixes, followed by their compressed versions (eg `.csv`, `.csv.gz`, `.csv.bz2`...)
+    """
+    return tuple(suffixes) + tuple(s + c for s in suffixes for c in COMPRESSED_SUFFIXES)
+
+
+def open_text(path: tp.Union[str, Path], newline: tp.Optional[str] = None) -> tp.TextIO:
+    """
+    Opens a text file in UTF-8, and decompresses it on the fly if it's compressed
+    """
+    path = str(path)
+    for suffix, opener in _OPENERS.items():
+        if path.endswith(suffix):
+            raw = io.BufferedReader(opener(path), buffer_size=BUFFER_SIZE)  # type: ignore
+            return io.TextIOWrapper(raw, encoding="utf-8", newline=newline)
+    return open(path, encoding="utf-8", newline=newline, buffering=BUFFER_SIZE)
@@ -0,0 +1,228 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Persistent cache of parsed experiments, so that the webserver doesn't parse every log file again after a restart.
+Experiments are stored in `snapshot.py` format, one file per entry. The cache can be inspected and pruned
+with the `hiplot-cache` command.
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import typing as tp
+from collections import OrderedDict
+from pathlib import Path
+
+from . import pkginfo
+from . import snapshot
+from .experiment import Experiment
+
+_SUFFIX = ".hips"
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _header_uri(data: bytes) -> str:
+    return tp.cast(str, snapshot.loads_header(data)["extra"].get("uri", ""))
+
+
+class DiskCacheEntry(tp.NamedTuple):
+    key: str
+    uri: str
+    nbytes: int
+    last_used: float  # Timestamp
+
+
+class DiskCache:
+    """
+    Directory of parsed experiments, keyed by URI, fetchers and version of the files they were loaded from
+    (see :func:`hiplot.fetchers.get_uri_version`). The least recently used entries are removed when
+    the cache grows beyond `max_bytes`.
+
+    The directory is scanned once, when the cache is opened: the cache then keeps track of its entries in memory.
+    Entries added by other processes in the meantime are still found, but are only counted in the size of the cache
+    once they are used.
+    """
+
+    def __init__(self, directory: tp.Union[str, Path], max_bytes: int = 1 << 32) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Least recently used first
+        self._index: "OrderedDict[str, DiskCacheEntry]" = OrderedDict((e.key, e) for e in self._scan())
+        self._nbytes = sum(e.nbytes for e in self._index.values())
+
+    @staticmethod
+    def key(uri: str, fetchers_id: str, version: tp.Any) -> str:
+        """
+        :param fetchers_id: Identifies the fetchers that load the experiment (eg their names)
+        :param version: Version of the experiment, as returned by :func:`hiplot.fetchers.get_uri_version`
+        """
+        h = hashlib.blake2b(digest_size=20)
+        for part in [pkginfo.version, str(snapshot.VERSION), uri, fetchers_id, repr(version)]:
+            h.update(part.encode("utf-8") + b"\0")
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{_SUFFIX}"
+
+    def _set_entry(self, entry: DiskCacheEntry) -> None:
+        # Called with `self._lock` held
+        self._remove_entry(entry.key)
+        self._index[entry.key] = entry
+        self._nbytes += entry.nbytes
+
+    def _remove_entry(self, key: str) -> None:
+        # Called with `self._lock` held
+        entry = self._index.pop(key, None)
+        if entry is not None:
+            self._nbytes -= entry.nbytes
+
+    def get(self, key: str) -> tp.Optional[Experiment]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            xp = snapshot.loads(data)
+            uri = _header_uri(data)
+            os.utime(path)  # Recently used
+        except FileNotFoundError:
+            with self._lock:
+                self._remove_entry(key)
+                self.misses += 1
+            return None
+        except Exception:  # pylint: disable=broad-except
+            # Corrupted (or written by another version): the experiment is loaded again
+            _unlink(path)
+            with self._lock:
+                self._remove_entry(key)
+                self.misses += 1
+                self.errors += 1
+            return None
+        with self._lock:
+            self._set_entry(DiskCacheEntry(key, uri, len(data), time.time()))
+            self.hits += 1
+        return xp
+
+    def put(self, key: str, uri: str, xp: Experiment) -> bool:
+        """
+        Stores an experiment. Returns `False` if it can't be serialized
+        """
+        try:
+            data = snapshot.dumps(xp, extra={"uri": uri})
+        except (TypeError, ValueError):
+            with self._lock:
+                self.errors += 1
+            return False
+        # Write then rename, so that other processes never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        with self._lock:
+            self._set_entry(DiskCacheEntry(key, uri, len(data), time.time()))
+        self.prune(self.max_bytes)
+        return True
+
+    def entries(self) -> tp.List[DiskCacheEntry]:
+        """
+        Returns the entries of the cache, least recently used first
+        """
+        with self._lock:
+            return list(self._index.values())
+
+    def _scan(self) -> tp.List[DiskCacheEntry]:
+        entries: tp.List[DiskCacheEntry] = []
+        for path in self.directory.glob(f"*{_SUFFIX}"):
+            try:
+                st = path.stat()
+                with path.open("rb") as f:
+                    data = f.read(snapshot.PREFIX_SIZE)
+                    data += f.read(snapshot.header_size(data) - len(data))
+                uri = _header_uri(data)
+            except (OSError, ValueError):
+                continue  # Removed in the meantime, or corrupted
+            entries.append(DiskCacheEntry(path.name[:-len(_SUFFIX)], uri, st.st_size, st.st_mtime))
+        entries.sort(key=lambda e: e.last_used)
+        return entries
+
+    def prune(self, max_bytes: tp.Optional[int] = None, max_age: tp.Optional[float] = None) -> tp.List[DiskCacheEntry]:
+        """
+        Removes entries not used for more than `max_age` seconds, and the least recently used ones
+        until the cache is smaller than `max_bytes`. Returns the removed entries.
+        """
+        now = time.time()
+        removed: tp.List[DiskCacheEntry] = []
+        with self._lock:
+            for e in list(self._index.values()):
+                too_old = max_age is not None and now - e.last_used > max_age
+                if not too_old and (max_bytes is None or self._nbytes <= max_bytes):
+                    if max_age is None:
+                        break  # More recently used entries are kept too
+                    continue
+                _unlink(self._path(e.key))
+                self._remove_entry(e.key)
+                removed.append(e)
+        return removed
+
+    def stats(self) -> tp.Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "bytes": self._nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+            }
+
+
+def _format_size(nbytes: int) -> str:
+    return f"{nbytes / (1 << 20):.1f}MB"
+
+
+def hiplot_cache_main() -> int:
+    parser = argparse.ArgumentParser(prog="hiplot-cache", description="Inspect and prune HiPlot disk cache (see `hiplot --disk-cache`)")
+    parser.add_argument("directory", type=str, help="Cache directory")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True  # `required=` argument of `add_subparsers` needs Python 3.7
+    subparsers.add_parser("list", help="List cached experiments, least recently used first")
+    prune_parser = subparsers.add_parser("prune", help="Remove the least recently used experiments")
+    prune_parser.add_argument("--max-mb", type=int, default=None, help="Remove experiments until the cache is smaller than this")
+    prune_parser.add_argument("--max-days", type=float, default=None, help="Remove experiments not used for this many days")
+    subparsers.add_parser("clear", help="Remove all cached experiments")
+    args = parser.parse_args()
+
+    cache = DiskCache(args.directory)
+    if args.command == "list":
+        entries = cache.entries()
+        for e in entries:
+            last_used = time.strftime("%Y-%m-%d %H:%M", time.localtime(e.last_used))
+            print(f"{last_used}  {_format_size(e.nbytes):>10}  {e.uri}")
+        print(f"{len(entries)} experiments, {_format_size(sum(e.nbytes for e in entries))}")
+        return 0
+    if args.command == "prune":
+        removed = cache.prune(
+            max_bytes=args.max_mb * (1 << 20) if args.max_mb is not None else None,
+            max_age=args.max_days * 24 * 3600 if args.max_days is not None else None,
+        )
+    else:
+        removed = cache.prune(max_bytes=0)
+    print(f"Removed {len(removed)} experiments, {_format_size(sum(e.nbytes for e in removed))}")
+    return 0
@@ -3,6 +3,7 @@
 # LICENSE file in the root directory of this source tree.
 
 import csv
+import base64
 import uuid
 import json
 import codecs
@@ -13,6 +14,8 @@ from collections import defaultdict
 from pathlib import Path
 import typing as tp
 
+from .columns import ColumnStore, RESERVED_COLUMNS, compact_uid
+
 if tp.TYPE_CHECKING:
     import pandas as pd
     from .streamlit_helpers import ExperimentStreamlitComponent
@@ -39,6 +42,7 @@ class _DictSerializable:
     """
     All classes that are transmitted to Javascript must subclass this
     """
+    __slots__ = ()
 
     def _asdict(self) -> tp.Dict[str, tp.Any]:
         return self.__dict__
@@ -167,21 +171,43 @@ class Datapoint(_DictSerializable):
         })
         hip.Experiment(datapoints=[dp1, dp2]).display()  # Render in an ipython notebook
     """
+    __slots__ = ("uid", "values", "from_uid")
 
     def __init__(self, values: tp.Dict[str, DisplayableType], *, uid: tp.Optional[str] = None, from_uid: tp.Optional[str] = None) -> None:
         self.uid = uid if uid is not None else str(uuid.uuid4())
         self.values = values
         self.from_uid = from_uid
 
+    def _asdict(self) -> tp.Dict[str, tp.Any]:
+        return {"uid": self.uid, "values": self.values, "from_uid": self.from_uid}
+
     def validate(self) -> None:
         """
         Makes sure this object is valid - throws an :class:`hiplot.ExperimentValidationError` exception otherwise.
         """
-        for reserved_kw in ["uid", "from_uid"]:
+        for reserved_kw in RESERVED_COLUMNS:
             if reserved_kw in self.values:
                 raise ExperimentValidationError(f'Datapoint {self.uid} contains a value for "{reserved_kw}"')
 
 
+def _validate_lineage(uids: tp.Sequence[str], from_uids: tp.Sequence[tp.Optional[str]]) -> None:
+    parents: tp.Dict[str, tp.Optional[str]] = dict(zip(uids, from_uids))
+    seen: tp.Set[str] = set()
+    for uid, from_uid in zip(uids, from_uids):
+        if uid in seen:
+            continue
+        seen_now: tp.Set[str] = {uid}
+        child = uid
+        while from_uid is not None and from_uid not in seen:
+            if from_uid in seen_now:
+                raise ExperimentValidationCircularRef(f"Circular reference in {uid} parents ({len(seen_now)}-th parent)")
+            seen_now.add(from_uid)
+            if from_uid not in parents:
+                raise ExperimentValidationMissingParent(f"Datapoint ({child}) parent ({from_uid}) not found")
+            child, from_uid = from_uid, parents[from_uid]
+        seen |= seen_now
+
+
 def _is_running_ipython() -> bool:
     try:
         get_ipython()  # type: ignore
@@ -198,6 +224,8 @@ class Experiment(_DictSerializable):
     See :meth:`Experiment.display` to display an :class:`Experiment` in an ipython notebook.
 
     :ivar datapoints: All the measurements we have. One datapoint corresponds to one line in the parallel plot and to one line in the table.
+        Experiments created with :meth:`Experiment.from_iterable` store their datapoints in columns,
+        and only create this list the first time it is accessed.
     :ivar parameters_definition: Characteristics of the columns (ordering, type, etc...)
     :ivar colormap: Colormap to use
     :ivar colorby: Default column to color by
@@ -220,7 +248,8 @@ class Experiment(_DictSerializable):
                  parameters_definition: tp.Optional[tp.Dict[str, ValueDef]] = None,
                  colormap: tp.Optional[str] = None,
                  ) -> None:
-        self.datapoints = datapoints if datapoints is not None else []
+        self._datapoints: tp.List[Datapoint] = datapoints if datapoints is not None else []
+        self._columns: tp.Optional[ColumnStore] = None
         self.parameters_definition = parameters_definition if parameters_definition is not None else defaultdict(ValueDef)
         self.colormap = colormap if colormap is not None else "interpolateTurbo"
         self.colorby: tp.Optional[str] = None
@@ -229,27 +258,51 @@ class Experiment(_DictSerializable):
         self._display_data: tp.Dict[str, tp.Dict[str, tp.Any]] = {}
         self._compress: bool = False
 
+    @property
+    def datapoints(self) -> tp.List[Datapoint]:
+        if self._columns is not None:
+            # User code wants to access (and maybe modify) datapoints: switch to a list of `Datapoint`
+            columns = self._columns
+            self._datapoints = [
+                Datapoint(uid=uid, from_uid=from_uid, values=values)
+                for uid, from_uid, values in zip(columns.uids, columns.from_uids, columns.iter_values())
+            ]
+            self._columns = None
+        return self._datapoints
+
+    @datapoints.setter
+    def datapoints(self, datapoints: tp.List[Datapoint]) -> None:
+        self._datapoints = datapoints
+        self._columns = None
+
+    @staticmethod
+    def _from_columns(columns: ColumnStore) -> "Experiment":
+        xp = Experiment()
+        xp._columns = columns
+        return xp
+
+    def _get_columns(self) -> ColumnStore:
+        if self._columns is not None:
+            return self._columns
+        return ColumnStore.from_datapoints(self._datapoints)
+
     def validate(self) -> "Experiment":
         """
         Makes sure that this object is valid. Raises a :class:`hiplot.ExperimentValidationError` otherwise.
         Experiments with circular references, non-existent parents, or without datapoints are invalid.
         """
-        seen: tp.Set[str] = set()
-        dp_lookup: tp.Dict[str, Datapoint] = {dp.uid: dp for dp in self.datapoints}
-        for p in self.datapoints:
-            if p.uid not in seen:
-                seen_now: tp.Set[str] = {p.uid}
-                dp = p
-                while dp.from_uid is not None and dp.from_uid not in seen:
-                    if dp.from_uid in seen_now:
-                        raise ExperimentValidationCircularRef(f"Circular reference in {p} parents ({len(seen_now)}-th parent)")
-                    seen_now.add(dp.from_uid)
-                    if dp.from_uid not in dp_lookup:
-                        raise ExperimentValidationMissingParent(f"Datapoint ({dp.uid}) parent ({dp.from_uid}) not found")
-                    dp = dp_lookup[dp.from_uid]
-                seen |= seen_now
-            p.validate()
-        if not self.datapoints:
+        if self._columns is not None:
+            _validate_lineage(self._columns.uids, self._columns.from_uids)
+            for reserved_kw in RESERVED_COLUMNS:
+                if reserved_kw in self._columns.columns:
+                    raise ExperimentValidationError(f'Datapoints contain a value for "{reserved_kw}"')
+            num_datapoints = len(self._columns)
+        else:
+            _validate_lineage([dp.uid for dp in self._datapoints], [dp.from_uid for dp in self._datapoints])
+            for dp in self._datapoints:
+                dp.validate()
+            num_datapoints = len(self._datapoints)
+        if not num_datapoints:
             raise ExperimentValidationError('Not a single datapoint')
         validate_colormap(self.colormap)
         return self
@@ -353,21 +406,25 @@ It appears that you are trying to create a HiPlot visualization in ipython: you
 To render an experiment to HTML, use `experiment.to_html(file_name)` or `html_page = experiment.to_html()`""")
         return streamlit_helpers.ExperimentStreamlitComponent(self, key=key, ret=ret)
 
-    def to_html(self, file: tp.Optional[tp.Union[Path, str, TextWriterIO]] = None, **kwargs: tp.Any) -> str:
+    def to_html(self, file: tp.Optional[tp.Union[Path, str, TextWriterIO]] = None, binary: bool = False, **kwargs: tp.Any) -> str:
         """
         Returns the content of a standalone .html file that displays this experiment
         without any dependency to HiPlot server or static files.
 
         :param file: Path/handle to a file to write (optional)
+        :param binary: Embed the experiment in binary columnar format (smaller and faster to load for large experiments)
         :returns: A standalone HTML code to display this Experiment.
         """
         from .render import make_experiment_standalone_page, html_inlinize
 
         self.validate()
-        html = make_experiment_standalone_page(options={
-            **kwargs,
-            'experiment': self._asdict()
-        })
+        if binary:
+            from .binary_format import dumps
+
+            options = {**kwargs, 'experiment_binary': base64.b64encode(dumps(self)).decode("ascii")}
+        else:
+            options = {**kwargs, 'experiment': self._asdict()}
+        html = make_experiment_standalone_page(options=options)
         html = html_inlinize(html)
         if file is not None:
             if isinstance(file, (Path, str)):
@@ -389,22 +446,57 @@ To render an experiment to HTML, use `experiment.to_html(file_name)` or `html_pa
         else:
             return self._to_csv(file)
 
+    def save(self, file: tp.Union[Path, str]) -> None:
+        """
+        Saves this Experiment to a `.hiplot` file: a compact binary file that keeps
+        the datapoints with their types and lineage, the parameters definition and display data.
+
+        :param file: Path of the file to write
+        """
+        from .snapshot import save
+
+        save(self, file)
+
+    @staticmethod
+    def load(file: tp.Union[Path, str], mmap: bool = True) -> "Experiment":
+        """
+        Loads an Experiment saved with :meth:`Experiment.save`.
+
+        :param file: Path of the `.hiplot` file
+        :param mmap: Memory-map numeric columns instead of reading them right away,
+            so that large experiments open instantly and only use memory for the columns that are accessed.
+            The file must not be modified in place while the experiment is used.
+        """
+        from .snapshot import load
+
+        return load(file, use_mmap=mmap)
+
     def _to_csv(self, fh: TextWriterIO) -> None:
+        if self._columns is not None:
+            columns = self._columns
+            names = sorted(columns.columns)
+            csv_writer = csv.writer(fh)
+            csv_writer.writerow(RESERVED_COLUMNS + names)
+            csv_writer.writerows(zip(columns.uids, columns.from_uids, *(columns.column_values(n) for n in names)))
+            return
         fieldnames: tp.Set[str] = set()
-        for dp in self.datapoints:
+        for dp in self._datapoints:
             for f in dp.values.keys():
                 fieldnames.add(f)
         writer = csv.DictWriter(fh, fieldnames=["uid", "from_uid"] + sorted(list(fieldnames)))
         writer.writeheader()
-        for dp in self.datapoints:
+        for dp in self._datapoints:
             writer.writerow({
                 **dp.values,
                 "uid": dp.uid,
                 "from_uid": dp.from_uid,
             })
 
-    def _asdict(self) -> tp.Dict[str, tp.Any]:
-        data: tp.Dict[str, tp.Any] = {
+    def _settings_asdict(self) -> tp.Dict[str, tp.Any]:
+        """
+        Everything we transmit to javascript, except datapoints
+        """
+        return {
             "parameters_definition": {k: v._asdict() for k, v in self.parameters_definition.items()},
             "colormap": self.colormap,
             "colorby": self.colorby,
@@ -412,23 +504,51 @@ To render an experiment to HTML, use `experiment.to_html(file_name)` or `html_pa
             "display_data": self._display_data,
             "enabled_displays": self.enabledDisplays,
         }
+
+    def _asdict(self) -> tp.Dict[str, tp.Any]:
+        data = self._settings_asdict()
         if self._compress:
             from .compress import compress
-            data["datapoints_compressed"] = compress(self.datapoints)
+            data["datapoints_compressed"] = compress(self._columns if self._columns is not None else self._datapoints)
+        elif self._columns is not None:
+            columns = self._columns
+            data["datapoints"] = [
+                {"uid": uid, "values": values, "from_uid": from_uid}
+                for uid, from_uid, values in zip(columns.uids, columns.from_uids, columns.iter_values())
+            ]
         else:
-            data["datapoints"] = [d._asdict() for d in self.datapoints]
+            data["datapoints"] = [d._asdict() for d in self._datapoints]
         return data
 
     def remove_missing_parents(self) -> "Experiment":
         """
         Sets :attr:`hiplot.Datapoint.from_uid` to None when set to a non-existing Datapoint.
         """
-        existing_dp: tp.Set[str] = set((dp.uid for dp in self.datapoints))
-        for dp in self.datapoints:
+        if self._columns is not None:
+            existing_uids: tp.Set[str] = set(self._columns.uids)
+            self._columns.from_uids = [uid if uid in existing_uids else None for uid in self._columns.from_uids]
+            return self
+        existing_dp: tp.Set[str] = set((dp.uid for dp in self._datapoints))
+        for dp in self._datapoints:
             if dp.from_uid not in existing_dp:
                 dp.from_uid = None
         return self
 
+    def compact_uids(self) -> "Experiment":
+        """
+        Replaces datapoints uids with short sequential identifiers ("0", "1", ..., "Z", "10", ...), and updates
+        :attr:`hiplot.Datapoint.from_uid` accordingly. Parents that don't exist are removed.
+        This makes the experiment smaller in memory, and faster to transmit to the browser.
+        """
+        if self._columns is not None:
+            self._columns.compact_uids()
+            return self
+        mapping = {dp.uid: compact_uid(i) for i, dp in enumerate(self._datapoints)}
+        for dp in self._datapoints:
+            dp.uid = mapping[dp.uid]
+            dp.from_uid = mapping.get(dp.from_uid) if dp.from_uid is not None else None
+        return self
+
     def display_data(self, plugin: str) -> tp.Dict[str, tp.Any]:
         """
         Retrieve data dictionary for a plugin, which can be modified.
@@ -448,12 +568,13 @@ To render an experiment to HTML, use `experiment.to_html(file_name)` or `html_pa
         return self._display_data.setdefault(plugin, {})
 
     @staticmethod
-    def from_iterable(it: tp.Iterable[tp.Dict[str, tp.Any]]) -> "Experiment":
+    def from_iterable(it: tp.Iterable[tp.Dict[str, tp.Any]], compact_uids: bool = False) -> "Experiment":
         """
         Creates a HiPlot experiment from an iterable/list of dictionnaries.
         This is the easiest way to generate an `hiplot.Experiment` object.
 
         :param it: A list (or iterable) of dictionnaries
+        :param compact_uids: Replace uids with short sequential identifiers - see :meth:`Experiment.compact_uids`
 
         :Example:
 
@@ -462,27 +583,27 @@ To render an experiment to HTML, use `experiment.to_html(file_name)` or `html_pa
         <hiplot.experiment.Experiment object at 0x7f0f2e13c590>
 
         """
-        return Experiment(
-            datapoints=[
-                Datapoint(
-                    uid=str(row.get("uid", k)),
-                    from_uid=row.get("from_uid") if row.get("from_uid") != '' else None,
-                    values={mk: mv for mk, mv in row.items() if mk not in ["uid", "from_uid"]}) for k, row in enumerate(it)
-            ]
-        )
+        columns = ColumnStore.from_rows(it)
+        if compact_uids:
+            columns.compact_uids()
+        return Experiment._from_columns(columns)
 
     @staticmethod
-    def from_csv(file: tp.Union[Path, str, tp.IO[str]]) -> "Experiment":
+    def from_csv(file: tp.Union[Path, str, tp.IO[str]], infer_types: bool = True) -> "Experiment":
         """
         Creates a HiPlot experiment from a CSV file.
 
         :param file: CSV file path
+        :param infer_types: Convert values to numbers, booleans or timestamps when possible
+            (otherwise, all values are kept as strings)
         """
         if isinstance(file, (Path, str)):
-            with Path(file).open(encoding="utf-8") as csvfile:
-                return Experiment.from_iterable(csv.DictReader(csvfile))
-        else:
-            return Experiment.from_iterable(csv.DictReader(file))
+            with Path(file).open(encoding="utf-8", newline="") as csvfile:
+                return Experiment.from_csv(csvfile, infer_types=infer_types)
+        if infer_types:
+            from .typed_csv import read_csv
+            return read_csv(file)
+        return Experiment.from_iterable(csv.DictReader(file))
 
     @staticmethod
     def from_dataframe(dataframe: "pd.DataFrame") -> "Experiment":  # No type hint to avoid having pandas as an additional dependency
@@ -491,21 +612,29 @@ To render an experiment to HTML, use `experiment.to_html(file_name)` or `html_pa
 
         :param dataframe: Pandas DataFrame
         """
-        # Check if from_uid and uid is both in columns
-        if {'from_uid', 'uid'}.issubset(dataframe.columns):
-            # Check if there are any NaN values to handle
-            if dataframe['from_uid'].isnull().values.any():
+        from .columns import column_from_series
 
+        num_rows = len(dataframe.index)
+        uid_series = dataframe['uid'] if 'uid' in dataframe.columns else None
+        from_uids: tp.List[tp.Optional[str]] = [None] * num_rows
+        if 'from_uid' in dataframe.columns:
+            from_uid_series = dataframe['from_uid']
+            has_parent = from_uid_series.notnull() & (from_uid_series != '')
+            if uid_series is not None and not has_parent.all():
                 # NaN values forces integer columns to become float, if uid is integer and from_uid is float, it crashes.
                 # The line below changes uid to match from_uid type (either float or string), since NaN cannot be integer.
-                dataframe['uid'] = dataframe['uid'].astype(dataframe['from_uid'].dtypes)
-                dataframe = dataframe.fillna({'from_uid': '', 'uid': ''})
-
-                # Replaces their dtypes accordingly to str, which is handled better with lesser errors with no change to functionality
-                dataframe['uid'] = dataframe['uid'].astype(str)
-                dataframe['from_uid'] = dataframe['from_uid'].astype(str)
+                uid_series = uid_series.astype(from_uid_series.dtype)
+            from_uids = from_uid_series.astype(str).astype(object).where(has_parent, None).tolist()
+        if uid_series is not None:
+            uids: tp.List[str] = uid_series.astype(object).where(uid_series.notnull(), '').astype(str).tolist()
+        else:
+            uids = [str(k) for k in range(num_rows)]
 
-        experiment = Experiment.from_iterable(dataframe.to_dict(orient='records'))
+        experiment = Experiment._from_columns(ColumnStore(uids, from_uids, {
+            name: column_from_series(dataframe[name])
+            for name in dataframe.columns
+            if name not in RESERVED_COLUMNS
+        }))
 
         # Restore columns order
         experiment.display_data(Displays.PARALLEL_PLOT)['order'] = list(dataframe.columns)
@@ -550,24 +679,36 @@ To render an experiment to HTML, use `experiment.to_html(file_name)` or `html_pa
         return experiment
 
     @staticmethod
-    def merge(xp_dict: tp.Dict[str, "Experiment"]) -> "Experiment":
+    def merge(xp_dict: tp.Dict[str, "Experiment"], compact_uids: bool = False) -> "Experiment":
         """
         Merge several experiments into a single one
+
+        :param xp_dict: Experiments to merge. Keys are used to prefix datapoints uids, and as values of the "exp" column
+        :param compact_uids: Use short sequential identifiers as uids instead of prefixing them - see :meth:`Experiment.compact_uids`
         """
         xp = Experiment(datapoints=[])
         assert xp.parameters_definition is not None  # for mypy
+        stores: tp.List[ColumnStore] = []
+        num_datapoints = 0
         for k, subxp in xp_dict.items():
             assert subxp is not None, k
-            xp.datapoints += [
-                Datapoint(
-                    uid=f"{k}_{d.uid}", from_uid=f"{k}_{d.from_uid}" if d.from_uid is not None else None, values={**d.values, "exp": k}
+            subcolumns = subxp._get_columns()
+            if compact_uids:
+                store = ColumnStore(list(subcolumns.uids), list(subcolumns.from_uids), {**subcolumns.columns, "exp": [k] * len(subcolumns)})
+                store.compact_uids(offset=num_datapoints)
+            else:
+                store = ColumnStore(
+                    [f"{k}_{uid}" for uid in subcolumns.uids],
+                    [f"{k}_{from_uid}" if from_uid is not None else None for from_uid in subcolumns.from_uids],
+                    {**subcolumns.columns, "exp": [k] * len(subcolumns)},
                 )
-                for d in subxp.datapoints
-            ]
+            stores.append(store)
+            num_datapoints += len(store)
             if subxp.parameters_definition is not None:
                 xp.parameters_definition.update(subxp.parameters_definition)
             for d, v in subxp._display_data.items():
                 xp.display_data(d).update(v)
+        xp._columns = ColumnStore.concat(stores)
         return xp
 
 
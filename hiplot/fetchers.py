@@ -2,7 +2,9 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import concurrent.futures
 import csv
+import functools
 import random
 import uuid
 import json
@@ -11,18 +13,197 @@ import re
 import ast
 import glob
 import os
+import stat
+import threading
+import time
 import importlib
 import importlib.util
+import itertools
 import typing as tp
+from collections import OrderedDict
 from pathlib import Path
 
 from . import experiment as hip
+from . import parquet
+from . import sqlite
+from .columns import ColumnStore
+from .decompress import is_compressed, open_text, strip_compressed_suffix, with_compressed_suffixes
 from .fetchers_demo import README_DEMOS
+from .json_records import columns_from_records, experiment_from_records, iter_json_array, iter_json_lines
+from .tail import LineTailReader, TailReader
 
 
 class NoFetcherFound(Exception):
     def __init__(self, uri: str):
         super().__init__(f"Unable to fetch an HiPlot experiment from '{uri}'")
+        self.uri = uri
+
+    def __reduce__(self) -> tp.Tuple[tp.Any, ...]:  # Raised in a process pool
+        return (NoFetcherFound, (self.uri,))
+
+
+F = tp.TypeVar("F")
+
+
+def uri_patterns(prefixes: tp.Sequence[str] = (), suffixes: tp.Sequence[str] = ()) -> tp.Callable[[F], F]:
+    """
+    Decorator for fetcher functions, to declare the URIs they apply to (see :class:`FetcherRegistry`).
+    Fetcher classes can set `uri_prefixes` and `uri_suffixes` attributes instead.
+    """
+    def decorator(fetcher: F) -> F:
+        setattr(fetcher, "uri_prefixes", tuple(prefixes))
+        setattr(fetcher, "uri_suffixes", tuple(suffixes))
+        return fetcher
+    return decorator
+
+
+def _fetcher_name(fetcher: tp.Any) -> str:
+    if hasattr(fetcher, "fetcher_spec"):  # See `isolation.IsolatedFetcher`
+        return f"isolated:{fetcher.fetcher_spec}"
+    if not hasattr(fetcher, "__qualname__"):
+        fetcher = type(fetcher)
+    return f"{getattr(fetcher, '__module__', '')}.{getattr(fetcher, '__qualname__', repr(fetcher))}"
+
+
+class _FetcherStats:
+    def __init__(self, fetcher: tp.Any) -> None:
+        self.fetcher = _fetcher_name(fetcher)
+        self.calls = 0
+        self.loaded = 0
+        self.doesnt_apply = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    def asdict(self) -> tp.Dict[str, tp.Any]:
+        return {
+            "fetcher": self.fetcher,
+            "calls": self.calls,
+            "loaded": self.loaded,
+            "doesnt_apply": self.doesnt_apply,
+            "errors": self.errors,
+            "seconds": self.seconds,
+        }
+
+
+class FetcherRegistry(tp.List[hip.ExperimentFetcher]):
+    """
+    List of fetchers that knows which ones apply to an URI without calling them all.
+    Fetchers can declare the URIs they apply to with `uri_prefixes` (eg `("fairseq://",)`) and/or
+    `uri_suffixes` (eg `(".csv",)`) attributes, or with :func:`uri_patterns`: they are then only called for URIs
+    that match (suffixes are matched against the first line of the URI, with or without its `?query` part).
+    Other fetchers are called for every URI, as with a plain list. In any case, fetchers are tried in order.
+
+    The registry also records how many times each fetcher was called, and how long it took (see :meth:`stats`).
+    """
+
+    def __init__(self, fetchers: tp.Iterable[hip.ExperimentFetcher] = ()) -> None:
+        super().__init__(fetchers)
+        self._index: tp.Optional[tp.Tuple[tp.Dict[str, tp.List[int]], tp.Dict[str, tp.List[int]], tp.List[int]]] = None
+        self._stats: tp.Dict[int, _FetcherStats] = {}
+        self._stats_lock = threading.Lock()
+
+    def __reduce__(self) -> tp.Tuple[tp.Any, ...]:  # Sent to a process pool
+        return (FetcherRegistry, (list(self),))
+
+    def _build_index(self) -> tp.Tuple[tp.Dict[str, tp.List[int]], tp.Dict[str, tp.List[int]], tp.List[int]]:
+        by_prefix: tp.Dict[str, tp.List[int]] = {}
+        by_suffix: tp.Dict[str, tp.List[int]] = {}
+        fallback: tp.List[int] = []
+        for i, f in enumerate(self):
+            prefixes = getattr(f, "uri_prefixes", None)
+            suffixes = getattr(f, "uri_suffixes", None)
+            if prefixes is None and suffixes is None:
+                fallback.append(i)
+                continue
+            for prefix in prefixes or ():
+                by_prefix.setdefault(prefix, []).append(i)
+            for suffix in suffixes or ():
+                by_suffix.setdefault(suffix, []).append(i)
+        return by_prefix, by_suffix, fallback
+
+    def candidates(self, uri: str) -> tp.List[hip.ExperimentFetcher]:
+        """
+        Returns the fetchers that may apply to `uri`, in order
+        """
+        index = self._index
+        if index is None:
+            index = self._index = self._build_index()
+        by_prefix, by_suffix, fallback = index
+        positions = list(fallback)
+        # There are only a few different lengths of prefixes and suffixes
+        for length in {len(p) for p in by_prefix}:
+            positions += by_prefix.get(uri[:length], [])
+        eol = uri.find("\n")
+        first_line = uri if eol == -1 else uri[:eol]
+        paths = {first_line, first_line.partition("?")[0]}  # eg `xp.parquet?columns=a,b`
+        for length in {len(s) for s in by_suffix}:
+            for path in paths:
+                if len(path) >= length:
+                    positions += by_suffix.get(path[len(path) - length:], [])
+        return [self[i] for i in sorted(set(positions))]
+
+    def call(self, fetcher: tp.Callable[..., hip.Experiment], uri: str, **kwargs: tp.Any) -> hip.Experiment:
+        """
+        Calls `fetcher`, and records how long it took
+        """
+        start = time.perf_counter()
+        outcome = "errors"
+        try:
+            xp = fetcher(uri, **kwargs)
+            outcome = "loaded"
+            return xp
+        except hip.ExperimentFetcherDoesntApply:
+            outcome = "doesnt_apply"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                stats = self._stats.get(id(fetcher))
+                if stats is None:
+                    stats = self._stats[id(fetcher)] = _FetcherStats(fetcher)
+                stats.calls += 1
+                stats.seconds += elapsed
+                setattr(stats, outcome, getattr(stats, outcome) + 1)
+
+    def stats(self) -> tp.List[tp.Dict[str, tp.Any]]:
+        """
+        Returns, for every fetcher called so far: the number of calls, experiments loaded,
+        calls that raised `ExperimentFetcherDoesntApply` or another exception, and the total time spent in the fetcher
+        """
+        with self._stats_lock:
+            return [stats.asdict() for stats in self._stats.values()]
+
+
+def _invalidate_index(name: str) -> tp.Callable[..., tp.Any]:
+    method = getattr(list, name)
+
+    @functools.wraps(method)
+    def wrapper(self: FetcherRegistry, *args: tp.Any, **kwargs: tp.Any) -> tp.Any:
+        self._index = None
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+for _method in ["append", "extend", "insert", "remove", "pop", "clear", "sort", "reverse", "__setitem__", "__delitem__", "__iadd__"]:
+    setattr(FetcherRegistry, _method, _invalidate_index(_method))
+
+
+def get_fetchers_id(fetchers: tp.List[hip.ExperimentFetcher]) -> str:
+    """
+    Identifies a list of fetchers by their names (eg to cache the experiments they load, see `disk_cache.py`)
+    """
+    return ";".join(_fetcher_name(f) for f in fetchers)
+
+
+def _candidates(fetchers: tp.List[hip.ExperimentFetcher], uri: str) -> tp.List[hip.ExperimentFetcher]:
+    return fetchers.candidates(uri) if isinstance(fetchers, FetcherRegistry) else fetchers
+
+
+def _call_fetcher(fetchers: tp.List[hip.ExperimentFetcher], fetcher: tp.Callable[..., hip.Experiment],
+                  uri: str, **kwargs: tp.Any) -> hip.Experiment:
+    if isinstance(fetchers, FetcherRegistry):
+        return fetchers.call(fetcher, uri, **kwargs)
+    return fetcher(uri, **kwargs)
 
 
 def load_xp_with_fetchers_partial(fetchers: tp.List[hip.ExperimentFetcher], uri: str) -> tp.Tuple[hip.Experiment, int]:
@@ -38,49 +219,257 @@ def load_xp_with_fetchers_partial(fetchers: tp.List[hip.ExperimentFetcher], uri:
     eol = uri.find("\n")
     if eol == -1:
         eol = len(uri)
-    for f in fetchers:
+    for f in _candidates(fetchers, uri):
         try:
             endoffetcher = eol
             if hasattr(f, "get_uri_length"):
                 endoffetcher = f.get_uri_length(uri)  # type: ignore
-            return f(uri[:endoffetcher]), endoffetcher
+            return _call_fetcher(fetchers, f, uri[:endoffetcher]), endoffetcher
         except hip.ExperimentFetcherDoesntApply:
             continue
     raise NoFetcherFound(uri)
 
 
-def load_xps_with_fetchers(fetchers: tp.List[hip.ExperimentFetcher], uri: str) -> tp.List[hip.Experiment]:
+_pool_lock = threading.Lock()
+_pool_config: tp.Tuple[tp.Optional[int], bool] = (None, False)
+_pool: tp.Optional[concurrent.futures.Executor] = None
+_worker_state = threading.local()
+
+
+def set_load_workers(max_workers: tp.Optional[int] = None, processes: bool = False) -> None:
+    """
+    Configures the pool used to load the experiments of multi-URIs (one per line, or `multi://`) concurrently.
+
+    :param max_workers: Number of experiments loaded at the same time (`None` for Python's default, 0 to load them one after another)
+    :param processes: Use a pool of processes instead of threads (fetchers and experiments need to be picklable)
+    """
+    global _pool, _pool_config  # pylint: disable=global-statement
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+        _pool_config = (max_workers, processes)
+
+
+def _get_pool() -> tp.Optional[concurrent.futures.Executor]:
+    global _pool  # pylint: disable=global-statement
+    max_workers, processes = _pool_config
+    if max_workers == 0 or getattr(_worker_state, "active", False):
+        return None  # Loading sub-experiments from a worker could deadlock the pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = concurrent.futures.ProcessPoolExecutor(max_workers) if processes else \
+                concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix="hiplot-load")
+        return _pool
+
+
+def _run_in_worker(fn: tp.Callable[[str], tp.Any], uri: str) -> tp.Any:
+    _worker_state.active = True
+    try:
+        return fn(uri)
+    finally:
+        _worker_state.active = False
+
+
+def _map_uris(fn: tp.Callable[[str], tp.Any], uris: tp.List[str]) -> tp.List[tp.Tuple[tp.Any, tp.Optional[Exception]]]:
+    """
+    Calls `fn` on every URI, concurrently if possible. Returns the results in order, with the exception raised if any
+    """
+    pool = _get_pool() if len(uris) > 1 else None
+    results: tp.List[tp.Tuple[tp.Any, tp.Optional[Exception]]] = []
+    if pool is None:
+        for uri in uris:
+            try:
+                results.append((fn(uri), None))
+            except Exception as e:  # pylint: disable=broad-except
+                results.append((None, e))
+        return results
+    futures = [pool.submit(_run_in_worker, fn, uri) for uri in uris]
+    for future in futures:
+        try:
+            results.append((future.result(), None))
+        except Exception as e:  # pylint: disable=broad-except
+            results.append((None, e))
+    return results
+
+
+def _split_uri(fetchers: tp.List[hip.ExperimentFetcher], uri: str) -> tp.List[str]:
     uri = uri.lstrip()
-    xps: tp.List[hip.Experiment] = []
+    parts: tp.List[str] = []
     while uri:
-        xp, endfetcher = load_xp_with_fetchers_partial(fetchers, uri)
-        uri = uri[endfetcher:].lstrip()
-        xps.append(xp)
-    assert xps, uri  # If URI is empty, we should raise in `load_xp_with_fetchers_partial`
-    return xps
+        end = _split_uri_part(fetchers, uri)
+        parts.append(uri[:end])
+        uri = uri[end:].lstrip()
+    return parts
+
+
+def _load_uri(fetchers: tp.List[hip.ExperimentFetcher], uri: str) -> tp.Tuple[hip.Experiment, tp.Dict[str, str]]:
+    errors: tp.Dict[str, str] = {}
+    for f in _candidates(fetchers, uri):
+        try:
+            if isinstance(f, MultipleFetcher):
+                return _call_fetcher(fetchers, f, uri, errors=errors), errors
+            return _call_fetcher(fetchers, f, uri), errors
+        except hip.ExperimentFetcherDoesntApply:
+            continue
+    raise NoFetcherFound(uri)
 
 
-def load_xp_with_fetchers(fetchers: tp.List[hip.ExperimentFetcher], uri: str) -> hip.Experiment:
-    xps = load_xps_with_fetchers(fetchers, uri)
+def _load_uris(fetchers: tp.List[hip.ExperimentFetcher], uris: tp.List[str],
+               errors: tp.Optional[tp.Dict[str, str]]) -> tp.List[tp.Tuple[int, hip.Experiment]]:
+    """
+    Loads experiments concurrently. Returns them with their index in `uris`.
+    Failures are reported in `errors` (unless they all fail), or raised if `errors` is `None`.
+    """
+    results = _map_uris(functools.partial(_load_uri, fetchers), uris)
+    failures = [e for _, e in results if e is not None]
+    if failures and (errors is None or len(failures) == len(results)):
+        raise failures[0]
+    loaded: tp.List[tp.Tuple[int, hip.Experiment]] = []
+    for i, (uri, (result, exception)) in enumerate(zip(uris, results)):
+        if exception is not None:
+            assert errors is not None
+            errors[uri] = str(exception) or repr(exception)
+            continue
+        xp, sub_errors = result
+        if errors is not None:
+            errors.update(sub_errors)
+        loaded.append((i, xp))
+    return loaded
+
+
+def load_xps_with_fetchers(fetchers: tp.List[hip.ExperimentFetcher], uri: str,
+                           errors: tp.Optional[tp.Dict[str, str]] = None) -> tp.List[hip.Experiment]:
+    """
+    Loads the experiments of a multi-line URI, concurrently (see :func:`set_load_workers`), in order.
+
+    :param errors: If provided, experiments that fail to load are skipped, and their errors are stored in this dictionary
+        (an exception is still raised if none can be loaded)
+    """
+    uris = _split_uri(fetchers, uri)
+    if not uris:
+        raise NoFetcherFound(uri)
+    return [xp for _, xp in _load_uris(fetchers, uris, errors)]
+
+
+def load_xp_with_fetchers(fetchers: tp.List[hip.ExperimentFetcher], uri: str,
+                          errors: tp.Optional[tp.Dict[str, str]] = None) -> hip.Experiment:
+    uris = _split_uri(fetchers, uri)
+    if not uris:
+        raise NoFetcherFound(uri)
+    xps = _load_uris(fetchers, uris, errors)
+    # Keep the index of each URI in the uids, even if some fail to load
     return hip.Experiment.merge({
         f"{i}": xp
-        for i, xp in enumerate(xps)
-    }) if len(xps) > 1 else xps[0]
+        for i, xp in xps
+    }) if len(uris) > 1 else xps[0][1]
+
+
+def _split_uri_part(fetchers: tp.List[hip.ExperimentFetcher], uri: str) -> int:
+    for f in _candidates(fetchers, uri):
+        if hasattr(f, "get_uri_length"):
+            try:
+                return f.get_uri_length(uri)  # type: ignore
+            except (hip.ExperimentFetcherDoesntApply, ValueError):
+                continue
+    eol = uri.find("\n")
+    return eol if eol != -1 else len(uri)
+
+
+def _file_version(uri: str) -> tp.Optional[tp.Tuple[tp.Any, ...]]:
+    path = uri.split("://", 1)[-1]  # eg `fairseq://path`
+    try:
+        st = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    version: tp.List[tp.Tuple[str, int, int]] = [(path, st.st_mtime_ns, st.st_size)]
+    if stat.S_ISDIR(st.st_mode):
+        # Fetchers may read any file in the directory (eg `train.log` for fairseq)
+        with os.scandir(path) as entries:
+            for e in entries:
+                try:
+                    est = e.stat()
+                except OSError:  # eg broken symlink
+                    continue
+                version.append((e.name, est.st_mtime_ns, est.st_size))
+        version.sort()
+    return tuple(version)
+
+
+def get_uri_version(fetchers: tp.List[hip.ExperimentFetcher], uri: str) -> tp.Optional[tp.Tuple[tp.Any, ...]]:
+    """
+    Returns a token that changes when the experiment behind `uri` changes, or `None` if we can't know.
+    Fetchers can provide one with a `get_version(uri)` method, otherwise we use the modification time
+    and size of the file (or directory content) the URI points to.
+    """
+    uri = uri.lstrip()
+    versions: tp.List[tp.Any] = []
+    while uri:
+        end = _split_uri_part(fetchers, uri)
+        part = uri[:end]
+        version: tp.Any = None
+        for f in _candidates(fetchers, part):
+            if hasattr(f, "get_version"):
+                try:
+                    version = f.get_version(part)
+                except hip.ExperimentFetcherDoesntApply:
+                    continue
+                break
+        if version is None:
+            version = _file_version(part)
+        if version is None:
+            return None
+        versions.append(version)
+        uri = uri[end:].lstrip()
+    return tuple(versions)
+
+
+def get_tail_reader(fetchers: tp.List[hip.ExperimentFetcher], uri: str) -> tp.Optional[TailReader]:
+    """
+    Returns a reader for the datapoints appended to the file behind `uri` (see :class:`hiplot.tail.TailReader`),
+    or `None` if no fetcher can follow this experiment. Fetchers can provide one with a `get_tail_reader(uri)` method.
+    """
+    for f in _candidates(fetchers, uri):
+        if hasattr(f, "get_tail_reader"):
+            try:
+                return f.get_tail_reader(uri)  # type: ignore
+            except hip.ExperimentFetcherDoesntApply:
+                continue
+    return None
 
 
 class MultipleFetcher:
     MULTI_PREFIX = "multi://"
+    uri_prefixes = (MULTI_PREFIX,)
 
     def __init__(self, fetchers: tp.List[hip.ExperimentFetcher]) -> None:
-        self.fetchers: tp.List[hip.ExperimentFetcher] = fetchers + [self]
+        self.fetchers: tp.List[hip.ExperimentFetcher] = FetcherRegistry(fetchers + [self])
 
-    def __call__(self, uri: str) -> hip.Experiment:
+    def __call__(self, uri: str, errors: tp.Optional[tp.Dict[str, str]] = None) -> hip.Experiment:
         if not uri.startswith(self.MULTI_PREFIX):
             raise hip.ExperimentFetcherDoesntApply()
         defs = json.loads(uri[len(self.MULTI_PREFIX):])
-        if isinstance(defs, list):
-            return hip.Experiment.merge({v: load_xp_with_fetchers(self.fetchers, v) for v in defs})
-        return hip.Experiment.merge({k: load_xp_with_fetchers(self.fetchers, v) for k, v in defs.items()})
+        names = defs if isinstance(defs, list) else list(defs.keys())
+        uris = defs if isinstance(defs, list) else list(defs.values())
+        results = _map_uris(functools.partial(self._load, errors is not None), uris)
+        failures = [e for _, e in results if e is not None]
+        if failures and (errors is None or len(failures) == len(results)):
+            raise failures[0]
+        xps: tp.Dict[str, hip.Experiment] = {}
+        for name, sub_uri, (result, exception) in zip(names, uris, results):
+            if exception is not None:
+                assert errors is not None
+                errors[sub_uri] = str(exception) or repr(exception)
+                continue
+            xp, sub_errors = result
+            if errors is not None:
+                errors.update(sub_errors)
+            xps[name] = xp
+        return hip.Experiment.merge(xps)
+
+    def _load(self, collect_errors: bool, uri: str) -> tp.Tuple[hip.Experiment, tp.Dict[str, str]]:
+        errors: tp.Optional[tp.Dict[str, str]] = {} if collect_errors else None
+        return load_xp_with_fetchers(self.fetchers, uri, errors=errors), errors or {}
 
     def get_uri_length(self, uri: str) -> int:
         """
@@ -92,9 +481,17 @@ class MultipleFetcher:
         _, current_read_offset = decoder.raw_decode(uri[len(self.MULTI_PREFIX):])
         return len(self.MULTI_PREFIX) + current_read_offset
 
+    def get_version(self, uri: str) -> tp.Optional[tp.Tuple[tp.Any, ...]]:
+        if not uri.startswith(self.MULTI_PREFIX):
+            raise hip.ExperimentFetcherDoesntApply()
+        defs = json.loads(uri[len(self.MULTI_PREFIX):])
+        versions = [get_uri_version(self.fetchers, v) for v in (defs if isinstance(defs, list) else defs.values())]
+        return None if None in versions else tuple(versions)
+
 
 class InlineJsonFetcher:
     URI_PREFIX = "json://"
+    uri_prefixes = (URI_PREFIX,)
 
     def __call__(self, uri: str) -> hip.Experiment:
         if not uri.startswith(self.URI_PREFIX):
@@ -113,133 +510,522 @@ class InlineJsonFetcher:
         _, current_read_offset = decoder.raw_decode(uri[len(self.URI_PREFIX):])
         return len(self.URI_PREFIX) + current_read_offset
 
+    def get_version(self, uri: str) -> str:
+        if not uri.startswith(self.URI_PREFIX):
+            raise hip.ExperimentFetcherDoesntApply()
+        return ""  # The experiment is in the URI
 
+
+@uri_patterns(prefixes=["demo"])
 def load_demo(uri: str) -> hip.Experiment:
     if uri in README_DEMOS:
         return README_DEMOS[uri]()
     raise hip.ExperimentFetcherDoesntApply()
 
 
-def load_csv(uri: str) -> hip.Experiment:
-    if not uri.endswith(".csv"):
-        raise hip.ExperimentFetcherDoesntApply(f"Not a CSV file: {uri}")
+class _CSVTailReader(LineTailReader):
+    def __init__(self, path: Path) -> None:
+        super().__init__(path)
+        self.header: tp.Optional[tp.List[str]] = None
+        self.kinds: tp.Dict[str, tp.Optional[str]] = {}
+        self.num_rows = 0
+
+    def reset(self) -> None:
+        super().reset()
+        self.header = None
+        self.kinds = {}
+        self.num_rows = 0
+
+    def record_end(self, data: bytes) -> int:
+        # A newline inside a quoted field doesn't end the record: records end after an even number of quotes
+        end = data.rfind(b"\n")
+        quotes = data.count(b'"', 0, max(end, 0))
+        while end != -1 and quotes % 2:
+            previous = data.rfind(b"\n", 0, end)
+            quotes -= data.count(b'"', previous + 1, end)
+            end = previous
+        return end + 1
+
+    def restore(self, xp: hip.Experiment) -> bool:
+        from .typed_csv import column_kinds
+
+        with self.path.open(newline="", encoding="utf-8") as f:
+            self.header = next(csv.reader(f), None)
+        self.kinds = column_kinds(xp)
+        self.num_rows = len(xp._get_columns())
+        return self.header is not None
+
+    def parse_lines(self, lines: tp.List[str]) -> ColumnStore:
+        from .typed_csv import convert_rows
+
+        # Keep the newlines of quoted fields
+        rows = list(csv.reader(l + "\n" for l in lines))
+        if self.header is None and rows:
+            self.header = rows.pop(0)
+        if self.header is None or not rows:
+            return ColumnStore([], [])
+        store = convert_rows(self.header, rows, self.kinds, row_offset=self.num_rows)
+        self.num_rows += len(store)
+        return store
+
+
+class CSVLoader:
+    """
+    Loads CSV files. Files larger than `parallel_min_bytes` are parsed on several processes
+    (see :func:`hiplot.parallel_csv.read_csv_parallel`). Compressed files (`.csv.gz`, `.csv.bz2`, `.csv.xz`)
+    are decompressed on the fly, while they are parsed.
+    """
+    uri_suffixes = with_compressed_suffixes([".csv"])
+
+    def __init__(self, parallel_min_bytes: tp.Optional[int] = 256 << 20) -> None:
+        self.parallel_min_bytes = parallel_min_bytes
+
+    def __call__(self, uri: str) -> hip.Experiment:
+        if not strip_compressed_suffix(uri).endswith(".csv"):
+            raise hip.ExperimentFetcherDoesntApply(f"Not a CSV file: {uri}")
+        try:
+            # Compressed files can't be split in chunks
+            if not is_compressed(uri) and self.parallel_min_bytes is not None and os.path.getsize(uri) >= self.parallel_min_bytes:
+                from .parallel_csv import read_csv_parallel
+
+                return read_csv_parallel(uri)
+            with open_text(uri, newline="") as csvfile:
+                return hip.Experiment.from_csv(csvfile)
+        except FileNotFoundError:
+            raise hip.ExperimentFetcherDoesntApply(f"No such file: {uri}")
+
+    def get_tail_reader(self, uri: str) -> TailReader:
+        if not uri.endswith(".csv") or not Path(uri).is_file():
+            raise hip.ExperimentFetcherDoesntApply()
+        return _CSVTailReader(Path(uri))
+
+
+load_csv = CSVLoader()
+
+
+def _nevergrad_record(j: tp.Dict[str, tp.Any]) -> tp.Dict[str, tp.Any]:
+    return {
+        "id": j["job_id"],
+        **{param_name: str(param_val) for param_name, param_val in j["kwargs"].items()},
+        **{score_name: score_val for score_name, score_val in j["results"]["scores"].items()},
+    }
+
+
+class JSONLoader:
+    """
+    Loads JSON files with a list of records. Files larger than `incremental_min_bytes` are parsed incrementally,
+    one record at a time, so that we don't hold the whole document in memory (see :func:`hiplot.json_records.iter_json_array`).
+    Compressed files (`.json.gz`, `.json.bz2`, `.json.xz`) are always parsed incrementally, as they are decompressed.
+    """
+    uri_suffixes = with_compressed_suffixes([".json"])
+
+    def __init__(self, incremental_min_bytes: tp.Optional[int] = 64 << 20) -> None:
+        self.incremental_min_bytes = incremental_min_bytes
+
+    def __call__(self, uri: str) -> hip.Experiment:
+        if not strip_compressed_suffix(uri).endswith(".json"):
+            raise hip.ExperimentFetcherDoesntApply(f"Not a JSON file: {uri}")
+        with open_text(uri) as f:
+            if not is_compressed(uri) and (self.incremental_min_bytes is None or os.fstat(f.fileno()).st_size < self.incremental_min_bytes):
+                records: tp.Iterator[tp.Any] = iter(json.load(f))
+            else:
+                records = iter_json_array(f)
+            first = next(records, None)
+            if first is None:
+                return hip.Experiment()
+            dat = itertools.chain([first], records)
+            if "job_id" in first and "kwargs" in first and "results" in first:
+                # Nevergrad JSON
+                return experiment_from_records(_nevergrad_record(j) for j in dat)
+            return experiment_from_records(dat)
+
+
+load_json = JSONLoader()
+
+
+class _JSONLinesTailReader(LineTailReader):
+    def __init__(self, path: Path) -> None:
+        super().__init__(path)
+        self.num_rows = 0
+
+    def reset(self) -> None:
+        super().reset()
+        self.num_rows = 0
+
+    def restore(self, xp: hip.Experiment) -> bool:
+        self.num_rows = len(xp._get_columns())
+        return True
+
+    def parse_lines(self, lines: tp.List[str]) -> ColumnStore:
+        store = columns_from_records(iter_json_lines(lines), row_offset=self.num_rows)
+        self.num_rows += len(store)
+        return store
+
+
+class JSONLinesLoader:
+    """
+    Loads JSON Lines (aka NDJSON) files, one record per line. Records are streamed into columns,
+    and files that are still being written are followed live (unless they are compressed).
+    """
+    uri_suffixes = with_compressed_suffixes([".jsonl", ".ndjson"])
+
+    def __call__(self, uri: str) -> hip.Experiment:
+        if not uri.endswith(self.uri_suffixes):
+            raise hip.ExperimentFetcherDoesntApply(f"Not a JSON Lines file: {uri}")
+        try:
+            with open_text(uri) as f:
+                return experiment_from_records(iter_json_lines(f))
+        except FileNotFoundError:
+            raise hip.ExperimentFetcherDoesntApply(f"No such file: {uri}")
+
+    def get_tail_reader(self, uri: str) -> TailReader:
+        if not uri.endswith(self.uri_suffixes) or is_compressed(uri) or not Path(uri).is_file():
+            raise hip.ExperimentFetcherDoesntApply()
+        return _JSONLinesTailReader(Path(uri))
+
+
+load_jsonl = JSONLinesLoader()
+
+
+@uri_patterns(suffixes=[".hiplot"])
+def load_hiplot(uri: str) -> hip.Experiment:
+    if not uri.endswith(".hiplot"):
+        raise hip.ExperimentFetcherDoesntApply(f"Not a .hiplot file: {uri}")
     try:
-        with open(uri, newline="") as csvfile:
-            return hip.Experiment.from_iterable(csv.DictReader(csvfile))
+        return hip.Experiment.load(uri)
     except FileNotFoundError:
         raise hip.ExperimentFetcherDoesntApply(f"No such file: {uri}")
 
 
-def load_json(uri: str) -> hip.Experiment:
-    if not uri.endswith(".json"):
-        raise hip.ExperimentFetcherDoesntApply(f"Not a JSON file: {uri}")
-    dat = json.load(Path(uri).open())
-    if "job_id" in dat[0] and "kwargs" in dat[0] and "results" in dat[0]:
-        # Nevergrad JSON
-        return hip.Experiment.from_iterable(
-            [
-                {
-                    "id": j["job_id"],
-                    **{param_name: str(param_val) for param_name, param_val in j["kwargs"].items()},
-                    **{score_name: score_val for score_name, score_val in j["results"]["scores"].items()},
-                }
-                for j in dat
-            ]
-        )
-    return hip.Experiment.from_iterable(dat)
+class ParquetLoader:
+    """
+    Loads Parquet and Feather files, optionally with a selection of columns and rows (see `parquet.py`):
+    `sweep.parquet?columns=lr,loss&where=loss<1`
+    """
+    uri_suffixes = tuple(parquet.SUFFIXES)
+
+    def __call__(self, uri: str) -> hip.Experiment:
+        query = parquet.parse_uri(uri)
+        if query is None:
+            raise hip.ExperimentFetcherDoesntApply(f"Not a Parquet or Feather file: {uri}")
+        if not Path(query.path).exists():
+            raise hip.ExperimentFetcherDoesntApply(f"No such file: {query.path}")
+        return parquet.load(query)
+
+    def get_version(self, uri: str) -> tp.Optional[tp.Tuple[tp.Any, ...]]:
+        path, _, _ = uri.partition("?")
+        if not path.endswith(self.uri_suffixes):
+            raise hip.ExperimentFetcherDoesntApply()
+        return _file_version(path)
+
+
+load_parquet = ParquetLoader()
+
+
+class SQLiteLoader:
+    """
+    Runs a query on a SQLite database (see `sqlite.py`): `sqlite://optuna.db?watermark=trial_id&query=SELECT * FROM trials`.
+    With a `watermark` column, the experiment is followed live.
+    """
+    uri_prefixes = (sqlite.PREFIX,)
 
+    def _parse(self, uri: str) -> sqlite.SQLiteQuery:
+        query = sqlite.parse_uri(uri)
+        if query is None:
+            raise hip.ExperimentFetcherDoesntApply(f"Not a SQLite URI: {uri}")
+        return query
+
+    def __call__(self, uri: str) -> hip.Experiment:
+        query = self._parse(uri)
+        try:
+            return sqlite.load(query)
+        except FileNotFoundError:
+            raise hip.ExperimentFetcherDoesntApply(f"No such file: {query.path}")
+
+    def get_version(self, uri: str) -> tp.Optional[tp.Tuple[tp.Any, ...]]:
+        try:
+            return sqlite.get_version(self._parse(uri).path) or None
+        except ValueError:
+            return None  # Invalid URI: the error is reported when loading it
+
+    def get_tail_reader(self, uri: str) -> TailReader:
+        query = self._parse(uri)
+        if query.watermark is None or not Path(query.path).is_file():
+            raise hip.ExperimentFetcherDoesntApply()
+        return sqlite.SQLiteTailReader(query)
 
-def _load_fairseq_metrics_inline(l: str) -> tp.Dict[str, tp.Any]:
-    l = l.lstrip('| epoch ')
-    epoch = int(l[:3])
-    values: tp.Dict[str, tp.Any] = {"epoch": epoch}
+
+load_sqlite = SQLiteLoader()
+
+
+_FAIRSEQ_VALID_SUBSET_RE = re.compile(r"valid on '([a-zA-Z0-9]*)' subset")
+# Epoch summaries only: progress lines within an epoch (eg "| epoch 001:    100 / 4431 loss=12.833, ...") are skipped
+_FAIRSEQ_EPOCH_RE = re.compile(r"\| epoch (\d+) *(?:\||$)")
+
+
+def _load_fairseq_metrics_inline(l: str) -> tp.Optional[tp.Dict[str, tp.Any]]:
     # | epoch 002 | loss 8.413 | ...
     # | epoch 002 | valid on 'valid' subset | loss 7.599 | nll_loss 7.599 | ...
-    parts = l.split('|')[1:]
+    m = _FAIRSEQ_EPOCH_RE.match(l)
+    if m is None:
+        return None
+    values: tp.Dict[str, tp.Any] = {"epoch": int(m.group(1))}
     prefix = ''
-    for p in parts:
+    for p in l[m.end():].split('|'):
         p = p.strip()
-        match_ds = re.match(r"valid on '([a-zA-Z0-9]*)' subset", p)
-        if match_ds is not None:
-            prefix = match_ds.group(1) + '_'
+        if not p:  # eg trailing '|'
             continue
-        key = prefix + p[::-1].split(' ', 1)[1][::-1].strip()
-        value = p[::-1].split(' ', 1)[0][::-1].strip()
+        if p.startswith("valid on '"):
+            match_ds = _FAIRSEQ_VALID_SUBSET_RE.match(p)
+            if match_ds is not None:
+                prefix = match_ds.group(1) + '_'
+                continue
+        key, _, value = p.rpartition(' ')
         try:
-            values[key] = float(value)
+            values[prefix + key.strip()] = float(value)
         except ValueError:
-            values[key] = value
+            values[prefix + key.strip()] = value
     return values
 
 
-def load_fairseq(uri: str) -> hip.Experiment:
-    # pylint:disable=too-many-locals
-    # pylint:disable=too-many-branches
-    # pylint:disable=too-many-statements
+class _FairseqLogParser:
+    """
+    Parses a fairseq training log, possibly a few lines at a time
+    """
+
+    LOGS_PREFIX_RE = r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} \| [A-Z]* \| )"
+    _LOGS_PREFIX = re.compile(LOGS_PREFIX_RE)
+    # Only lines that start with one of these (after the log prefix) contain parameters or metrics
+    _PARSED_LINES = ('Namespace(', 'valid | {', '| epoch ')
+
+    def __init__(self) -> None:
+        self.datapoints: tp.List[tp.Dict[str, tp.Any]] = []
+        self.params: tp.Dict[str, tp.Any] = {}
+
+    def copy(self) -> "_FairseqLogParser":
+        """
+        Feeding lines to the copy leaves this parser untouched (they only modify the last datapoint, or add new ones)
+        """
+        parser = _FairseqLogParser()
+        parser.params = self.params
+        parser.datapoints = self.datapoints[:-1] + [dict(d) for d in self.datapoints[-1:]]
+        return parser
+
+    def feed(self, lines: tp.Iterable[str]) -> int:
+        """
+        Returns the index of the first datapoint that was added or modified
+        """
+        first_changed = len(self.datapoints)
+        logs_prefix_match = self._LOGS_PREFIX.match
+        parsed_lines = self._PARSED_LINES
+        for l in lines:
+            # Strip log prefix
+            # eg "2020-03-08 16:48:16 | INFO | "
+            if l[:1].isdigit():
+                m = logs_prefix_match(l)
+                if m is not None:
+                    l = l[m.end():]
+            if not l.startswith(parsed_lines):
+                continue
+            # Arguments: Namespace(...)
+            if l.startswith('Namespace('):
+                # format: Namespace(activation_dropout=0.1, activation_fn='relu', ...)
+                # Ideally we want to do: `eval("dict(activation_dropout=0.1, activation_fn='relu', ...)")`
+                # But as it's user input, we want to have something safe.
+                # (it's still possible to crash the python interpreter with a too complex string due to stack depth limitations)
+                node = ast.parse(l)
+                self.params = {
+                    kw.arg: ast.literal_eval(kw.value)
+                    for kw in node.body[0].value.keywords  # type: ignore
+                }
+                continue
+            # Results in JSON format
+            # valid | {"epoch": 33, "valid_loss": "0.723", "valid_ppl": "1.65", ...}
+            if l.startswith("valid | {"):
+                json_string = l.split('|', 1)[-1].lstrip()
+                valid_metrics = json.loads(json_string)
+                self.datapoints.append(valid_metrics)
+                continue
+            # For older version of fairseq
+            values = _load_fairseq_metrics_inline(l)
+            if values is None:
+                continue
+            if self.datapoints and self.datapoints[-1]['epoch'] == values['epoch']:
+                self.datapoints[-1].update(values)
+                first_changed = min(first_changed, len(self.datapoints) - 1)
+            else:
+                self.datapoints.append(values)
+        return first_changed
+
+    def feed_file(self, f: tp.BinaryIO) -> int:
+        """
+        Parses the lines of a file opened in binary mode, from its current position, without reading it entirely in memory.
+        Returns the number of bytes parsed: a last line without a newline might still be being written, and is left out.
+        """
+        parsed = 0
+
+        def complete_lines() -> tp.Iterator[str]:
+            nonlocal parsed
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return
+                parsed += len(line)
+                yield line.decode("utf-8").rstrip("\r\n")
+
+        self.feed(complete_lines())
+        return parsed
+
+    def get_values(self, index: int) -> tp.Dict[str, tp.Any]:
+        return {
+            **self.params,
+            **self.datapoints[index],  # overrides 'learning rate' for instance
+        }
+
+
+class _FairseqLogState:
+    """
+    What we parsed of a log: when it is loaded again, we only parse the lines appended since then
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.file_id: tp.Optional[tp.Tuple[int, int]] = None
+        self.offset = 0
+        self.parser = _FairseqLogParser()
+
+
+def _find_fairseq_log(uri: str) -> Path:
     PREFIX = 'fairseq://'
     if not uri.startswith(PREFIX):
         raise hip.ExperimentFetcherDoesntApply()
     uri = uri[len(PREFIX):]
     train_log = Path(uri)
     if train_log.is_dir():
-        found = False
-        try_files = [train_log / f for f in ["train.log", "process.out", "process_0.out"]] + \
-            [Path(f) for f in glob.glob(str(train_log / "*.log")) + glob.glob(str(train_log / "slurm_logs" / "*.log"))]
+        try_files = [train_log / f for f in with_compressed_suffixes(["train.log", "process.out", "process_0.out"])] + \
+            [Path(f) for pattern in with_compressed_suffixes(["*.log", str(Path("slurm_logs", "*.log"))])
+             for f in glob.glob(str(train_log / pattern))]
         for try_log_file in try_files:
             if try_log_file.is_file():
-                found = True
-                train_log = try_log_file
-                break
-        if not found:
-            raise hip.ExperimentFetcherDoesntApply("No log file found")
-    lines = train_log.read_text(encoding="utf-8").split('\n')
-
-    datapoints: tp.List[tp.Dict[str, tp.Any]] = []
-    params: tp.Dict[str, tp.Any] = {}
-    logs_prefix_re = r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} \| [A-Z]* \| )"
-    for l in lines:
-        # Strip log prefix
-        # eg "2020-03-08 16:48:16 | INFO | "
-        m = re.match(logs_prefix_re, l)
-        if m is not None:
-            l = l[m.span()[1]:]
-        # Arguments: Namespace(...)
-        if l.startswith('Namespace('):
-            # format: Namespace(activation_dropout=0.1, activation_fn='relu', ...)
-            # Ideally we want to do: `eval("dict(activation_dropout=0.1, activation_fn='relu', ...)")`
-            # But as it's user input, we want to have something safe.
-            # (it's still possible to crash the python interpreter with a too complex string due to stack depth limitations)
-            node = ast.parse(l)
-            params = {
-                kw.arg: ast.literal_eval(kw.value)
-                for kw in node.body[0].value.keywords  # type: ignore
-            }
-            continue
-        # Results in JSON format
-        # valid | {"epoch": 33, "valid_loss": "0.723", "valid_ppl": "1.65", ...}
-        if l.startswith("valid | {"):
-            json_string = l.split('|', 1)[-1].lstrip()
-            valid_metrics = json.loads(json_string)
-            datapoints.append(valid_metrics)
-        # For older version of fairseq
-        if l.startswith('| epoch '):
-            values = _load_fairseq_metrics_inline(l)
-            if datapoints and datapoints[-1]['epoch'] == values['epoch']:
-                datapoints[-1].update(values)
-            else:
-                datapoints.append(values)
-    datapoints = [{
-        **params,
-        **values,  # overrides 'learning rate' for instance
-    } for values in datapoints]
-    datapoints.sort(key=lambda d: float(d["epoch"]))
-    xp = hip.Experiment.from_iterable(datapoints)
-    for dp, next_dp in zip(xp.datapoints, xp.datapoints[1:]):
-        next_dp.from_uid = dp.uid
-    return xp
+                return try_log_file
+        raise hip.ExperimentFetcherDoesntApply("No log file found")
+    return train_log
+
+
+class _FairseqTailReader(LineTailReader):
+    # Datapoints are in the order of the log, while `load_fairseq` sorts them by epoch:
+    # both are the same as long as epochs are logged in increasing order.
+    # The parsing state (eg the parameters) can't be restored from an experiment: logs are always read from the beginning
+    def __init__(self, path: Path) -> None:
+        super().__init__(path)
+        self.parser = _FairseqLogParser()
+
+    def reset(self) -> None:
+        super().reset()
+        self.parser = _FairseqLogParser()
+
+    def parse_lines(self, lines: tp.List[str]) -> ColumnStore:
+        first_changed = self.parser.feed(l.rstrip("\r") for l in lines)
+        return ColumnStore.from_values(
+            [str(i) for i in range(first_changed, len(self.parser.datapoints))],
+            [str(i - 1) if i > 0 else None for i in range(first_changed, len(self.parser.datapoints))],
+            [self.parser.get_values(i) for i in range(first_changed, len(self.parser.datapoints))],
+        )
+
+
+class FairseqLoader:
+    """
+    Loads fairseq training logs. Logs are parsed line by line as they are read, and the parsing state of the
+    last `max_cached_logs` logs is kept: when a log is loaded again, only the lines appended since then are parsed.
+    """
+    uri_prefixes = ("fairseq://",)
+
+    def __init__(self, max_cached_logs: int = 16) -> None:
+        self.max_cached_logs = max_cached_logs
+        self._states: "OrderedDict[Path, _FairseqLogState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __reduce__(self) -> tp.Tuple[tp.Any, ...]:  # Sent to a process pool
+        return (FairseqLoader, (self.max_cached_logs,))
+
+    def _read_datapoints(self, train_log: Path) -> tp.List[tp.Dict[str, tp.Any]]:
+        if is_compressed(train_log):
+            parser = _FairseqLogParser()
+            with open_text(train_log) as text:
+                parser.feed(l.rstrip('\n') for l in text)
+            return [parser.get_values(i) for i in range(len(parser.datapoints))]
+        with self._lock:
+            state = self._states.pop(train_log, None) or _FairseqLogState()
+            self._states[train_log] = state
+            while len(self._states) > self.max_cached_logs:
+                self._states.popitem(last=False)
+        with state.lock, train_log.open("rb") as f:
+            st = os.fstat(f.fileno())
+            file_id = (st.st_dev, st.st_ino)
+            if file_id != state.file_id or st.st_size < state.offset:  # New or replaced log
+                state.file_id, state.offset, state.parser = file_id, 0, _FairseqLogParser()
+            f.seek(state.offset)
+            state.offset += state.parser.feed_file(f)
+            parser = state.parser
+            f.seek(state.offset)
+            partial_line = f.read()
+            if partial_line:
+                # Also parse the last line, but not in the state: we'll parse it again once it's complete
+                parser = parser.copy()
+                parser.feed(partial_line.decode("utf-8").splitlines())
+            return [parser.get_values(i) for i in range(len(parser.datapoints))]
+
+    def __call__(self, uri: str) -> hip.Experiment:
+        datapoints = self._read_datapoints(_find_fairseq_log(uri))
+        datapoints.sort(key=lambda d: float(d["epoch"]))
+        xp = hip.Experiment.from_iterable(datapoints)
+        for dp, next_dp in zip(xp.datapoints, xp.datapoints[1:]):
+            next_dp.from_uid = dp.uid
+        return xp
+
+    def get_version(self, uri: str) -> tp.Optional[tp.Tuple[tp.Any, ...]]:
+        # The log can be in a sub-directory (eg `slurm_logs/`), where `_file_version` doesn't look
+        train_log = _find_fairseq_log(uri)
+        directory = _file_version(uri)
+        log = _file_version(str(train_log))
+        if directory is None or log is None:
+            return None
+        return directory + log
+
+    def get_tail_reader(self, uri: str) -> TailReader:
+        train_log = _find_fairseq_log(uri)
+        if is_compressed(train_log):
+            raise hip.ExperimentFetcherDoesntApply()
+        return _FairseqTailReader(train_log)
+
+
+load_fairseq = FairseqLoader()
+
+
+def _float_or_str(value: str) -> tp.Union[float, str]:
+    try:
+        return float(value)
+    except ValueError:
+        return value
 
 
 class Wav2letterLoader:
+    """
+    Loads the `*_perf` files of a wav2letter training directory, one datapoint per line, each one following the previous one.
+    Files are read concurrently, and the metrics of each file are cached until it changes (see `max_cached_files`),
+    so that reloading a directory only parses the files that were added or modified.
+    """
+    uri_prefixes = ("w2l://",)
+
+    def __init__(self, max_workers: tp.Optional[int] = 8, max_cached_files: int = 10000) -> None:
+        self.max_workers = max_workers
+        self.max_cached_files = max_cached_files
+        self._cache: "OrderedDict[str, tp.Tuple[tp.Tuple[int, int], tp.List[tp.Dict[str, tp.Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: tp.Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+    def __reduce__(self) -> tp.Tuple[tp.Any, ...]:  # Sent to a process pool
+        return (Wav2letterLoader, (self.max_workers, self.max_cached_files))
+
     def _parse_metrics(self, file: Path) -> tp.List[tp.Dict[str, tp.Any]]:
         # 001_perf:
         '''
@@ -247,38 +1033,82 @@ class Wav2letterLoader:
 2019-09-30\tval1\tval2...
 '''
         PERF_PREFIX = 'perf_'
-        lines = file.read_text(encoding="utf-8").split('\n')
+        with open_text(file) as f:
+            lines = f.read().split('\n')
+        names = [PERF_PREFIX + name for name in lines[0].split()[1:]]
+        text_columns: tp.Set[int] = set()  # eg the date: only try to convert those one value at a time
         metrics: tp.List[tp.Dict[str, tp.Any]] = []
-        for _, l in enumerate(lines[1:]):
+        for l in lines[1:]:
             if l == '':
                 continue
-            epoch_metrics: tp.Dict[str, tp.Any] = {}
-            for name, val in zip(lines[0].split()[1:], l.split()):
-                try:
-                    epoch_metrics[PERF_PREFIX + name] = float(val)
-                except ValueError:
-                    epoch_metrics[PERF_PREFIX + name] = val
-            metrics.append(epoch_metrics)
+            values = l.split()
+            try:
+                row = [_float_or_str(val) if i in text_columns else float(val) for i, val in enumerate(values)]
+            except ValueError:
+                row = [_float_or_str(val) for val in values]
+                text_columns.update(i for i, val in enumerate(row) if isinstance(val, str))
+            metrics.append(dict(zip(names, row)))
         return metrics
 
-    def __call__(self, uri: str) -> hip.Experiment:
+    def _get_metrics(self, file: str) -> tp.List[tp.Dict[str, tp.Any]]:
+        st = os.stat(file)
+        key = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._cache.get(file)
+            if cached is not None and cached[0] == key:
+                self._cache.move_to_end(file)
+                return cached[1]
+        metrics = self._parse_metrics(Path(file))
+        with self._lock:
+            self._cache[file] = (key, metrics)
+            self._cache.move_to_end(file)
+            while len(self._cache) > self.max_cached_files:
+                self._cache.popitem(last=False)
+        return metrics
+
+    def _map(self, files: tp.List[str]) -> tp.Iterable[tp.List[tp.Dict[str, tp.Any]]]:
+        if self.max_workers == 0 or len(files) <= 1:
+            return map(self._get_metrics, files)
+        with self._lock:
+            if self._pool is None:
+                self._pool = concurrent.futures.ThreadPoolExecutor(self.max_workers, thread_name_prefix="hiplot-w2l")
+            pool = self._pool
+        return pool.map(self._get_metrics, files)
+
+    def _find_perfs(self, uri: str) -> tp.Tuple[str, tp.List[str]]:
         PREFIX = 'w2l://'
         if not uri.startswith(PREFIX):
             raise hip.ExperimentFetcherDoesntApply()
         uri = uri[len(PREFIX):]
-        perfs = list(glob.glob(str(Path(uri) / '*_perf')))
+        perfs = [f for pattern in with_compressed_suffixes(['*_perf']) for f in glob.glob(str(Path(uri) / pattern))]
         perfs.sort()
+        return uri, perfs
+
+    def get_version(self, uri: str) -> tp.Optional[tp.Tuple[tp.Any, ...]]:
+        # Only the files we read: the directory can contain many large checkpoints
+        path, perfs = self._find_perfs(uri)
+        version: tp.List[tp.Tuple[str, int, int]] = []
+        for p in [path] + perfs:
+            try:
+                st = os.stat(p)
+            except OSError:  # Removed in the meantime
+                return None
+            version.append((p, st.st_mtime_ns, st.st_size))
+        return tuple(version)
+
+    def __call__(self, uri: str) -> hip.Experiment:
+        uri, perfs = self._find_perfs(uri)
 
         prev_ckpt_name: tp.Optional[str] = None
         xp = hip.Experiment()
-        for p in perfs:
-            mtrics = self._parse_metrics(Path(p))
+        # Results come in the order of the files, so that each checkpoint follows the previous one
+        for mtrics in self._map(perfs):
             for m in mtrics:
                 ckpt_name = uri[-5:] + "_" + str(len(xp.datapoints))
                 xp.datapoints.append(hip.Datapoint(
                     uid=ckpt_name,
                     from_uid=prev_ckpt_name,
-                    values=m))
+                    values=dict(m)))  # The cached metrics must not be modified
                 prev_ckpt_name = ckpt_name
         return xp
 
@@ -309,9 +1139,22 @@ def get_fetcher(fetcher_spec: str) -> hip.ExperimentFetcher:
     return getattr(module, parts[-1])  # type: ignore
 
 
-def get_fetchers(add_fetchers: tp.List[str]) -> tp.List[hip.ExperimentFetcher]:
-    xp_fetchers: tp.List[hip.ExperimentFetcher] = [load_demo, load_csv, load_json, load_fairseq, load_wav2letter, InlineJsonFetcher()]
+def get_fetchers(add_fetchers: tp.List[str], isolate: bool = False, timeout: tp.Optional[float] = None,
+                 max_memory_mb: tp.Optional[int] = None) -> tp.List[hip.ExperimentFetcher]:
+    """
+    Returns the default fetchers, followed by `add_fetchers` and `multi://`, in a :class:`FetcherRegistry`
+
+    :param isolate: Run the additional fetchers in worker processes, with the given `timeout` (in seconds)
+        and `max_memory_mb` limits (see :class:`hiplot.isolation.IsolatedFetcher`)
+    """
+    xp_fetchers: tp.List[hip.ExperimentFetcher] = [load_demo, load_csv, load_json, load_jsonl, load_hiplot, load_parquet,
+                                                   load_sqlite, load_fairseq, load_wav2letter, InlineJsonFetcher()]
     for fetcher_spec in add_fetchers:
-        xp_fetchers.append(get_fetcher(fetcher_spec))
-    xp_fetchers.append(MultipleFetcher(xp_fetchers))
-    return xp_fetchers
+        if isolate:
+            from .isolation import IsolatedFetcher
+
+            xp_fetchers.append(IsolatedFetcher(fetcher_spec, timeout=timeout, max_memory_mb=max_memory_mb))
+        else:
+            xp_fetchers.append(get_fetcher(fetcher_spec))
+    # The multi fetcher loads sub-experiments with the same registry
+    return MultipleFetcher(xp_fetchers).fetchers
@@ -0,0 +1,290 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Runs fetchers in separate worker processes, so that a fetcher that hangs or uses too much memory
+can be stopped without taking the whole server down (see :class:`IsolatedFetcher`).
+
+Experiments are sent back to the server in columnar form: numeric columns go through shared memory as raw buffers,
+and only the rest of the experiment (uids, non-numeric columns, settings) is pickled.
+Before Python 3.8 (no `multiprocessing.shared_memory`), numeric columns are pickled too.
+"""
+
+import array
+import multiprocessing
+import multiprocessing.connection
+import os
+import pickle
+import secrets
+import threading
+import time
+import types
+import typing as tp
+
+from . import experiment as hip
+from .columns import ColumnBuilder, ColumnStore, column_typecode
+
+
+class FetcherProcessError(Exception):
+    """
+    Raised when an isolated fetcher times out, exceeds its memory limit, or when its process dies
+    """
+
+
+_SHM_PREFIX = "hiplot_"
+
+
+def _shared_memory() -> tp.Optional[types.ModuleType]:
+    try:
+        import multiprocessing.shared_memory  # Python 3.8+
+    except ImportError:
+        return None
+    return multiprocessing.shared_memory
+
+
+def _export_experiment(xp: hip.Experiment, shm_name: str) -> bytes:
+    """
+    Writes the numeric columns of the experiment in a new shared memory segment named `shm_name`.
+    The server chooses the name, so that it can unlink the segment if the worker is killed before it replies.
+    """
+    shared_memory = _shared_memory()
+    store = xp._get_columns()
+    numeric: tp.Dict[str, memoryview] = {}
+    others: tp.Dict[str, ColumnBuilder] = {}
+    for name, col in store.columns.items():
+        if isinstance(col, list):
+            others[name] = col
+        elif shared_memory is None:  # Pickled as bytes
+            typecode = column_typecode(col)
+            assert typecode is not None
+            others[name] = array.array(typecode, col.tobytes()) if isinstance(col, memoryview) else col
+        else:
+            numeric[name] = memoryview(col).cast("B")
+    layout: tp.Dict[str, tp.Tuple[str, int, int]] = {}
+    total_bytes = sum(len(col) for col in numeric.values())
+    if total_bytes:
+        assert shared_memory is not None
+        shm = shared_memory.SharedMemory(name=shm_name, create=True, size=total_bytes)
+        # The server process unlinks the segment once it has copied the buffers, or after killing the worker
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+        buf = shm.buf
+        assert buf is not None
+        offset = 0
+        for name, col in numeric.items():
+            typecode = column_typecode(store.columns[name])
+            assert typecode is not None
+            buf[offset:offset + len(col)] = col
+            layout[name] = (typecode, offset, len(col) // array.array(typecode).itemsize)
+            offset += len(col)
+        shm.close()
+    # Only the settings of the experiment are pickled with it
+    xp._columns, xp._datapoints = None, []
+    return pickle.dumps((xp, store.uids, store.from_uids, others, layout, shm_name if total_bytes else None),
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _unlink_shared_memory(shm_name: str) -> None:
+    shared_memory = _shared_memory()
+    if shared_memory is None:
+        return
+    try:
+        shm = shared_memory.SharedMemory(name=shm_name)
+    except FileNotFoundError:  # The worker didn't create it, or the server already unlinked it
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _import_experiment(payload: bytes) -> hip.Experiment:
+    xp, uids, from_uids, columns, layout, shm_name = pickle.loads(payload)
+    if shm_name is not None:
+        shared_memory = _shared_memory()
+        assert shared_memory is not None
+        shm = shared_memory.SharedMemory(name=shm_name)
+        buf = shm.buf
+        assert buf is not None
+        try:
+            for name, (typecode, offset, length) in layout.items():
+                col = array.array(typecode)
+                col.frombytes(buf[offset:offset + length * col.itemsize])
+                columns[name] = col
+        finally:
+            shm.close()
+            shm.unlink()
+    xp._columns = ColumnStore(uids, from_uids, columns)
+    return tp.cast(hip.Experiment, xp)
+
+
+def _set_memory_limit(max_bytes: tp.Optional[int]) -> None:
+    try:
+        import resource
+    except ModuleNotFoundError:  # Windows: no memory limit
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (max_bytes if max_bytes is not None else hard, hard))
+    except (ValueError, OSError):  # Not supported on this platform (eg macOS)
+        pass
+
+
+def _worker_main(conn: multiprocessing.connection.Connection) -> None:
+    from .fetchers import get_fetcher
+
+    fetchers: tp.Dict[str, hip.ExperimentFetcher] = {}
+    while True:
+        try:
+            spec, uri, max_memory, shm_name = conn.recv()
+        except EOFError:
+            return
+        response: tp.Tuple[str, tp.Any]
+        try:
+            _set_memory_limit(max_memory)
+            if spec not in fetchers:
+                fetchers[spec] = get_fetcher(spec)
+            response = ("ok", _export_experiment(fetchers[spec](uri), shm_name))
+        except hip.ExperimentFetcherDoesntApply:
+            response = ("doesnt_apply", None)
+        except MemoryError:
+            limit = f" ({max_memory >> 20}MB)" if max_memory is not None else ""
+            response = ("exit", FetcherProcessError(f"Fetcher ran out of memory{limit} while loading '{uri}'"))
+        except Exception as e:  # pylint: disable=broad-except
+            try:
+                pickle.dumps(e)
+                response = ("error", e)
+            except Exception:  # pylint: disable=broad-except
+                response = ("error", FetcherProcessError(str(e) or repr(e)))
+        finally:
+            _set_memory_limit(None)
+        conn.send(response)
+        if response[0] == "exit":
+            return  # The process might be in a bad state, the server starts a new one
+
+
+class _Worker:
+    def __init__(self, ctx: tp.Any) -> None:
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True, name="hiplot-fetcher")
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class _WorkerPool:
+    def __init__(self, max_workers: int) -> None:
+        self._ctx = multiprocessing.get_context("spawn")  # Forking a multi-threaded server is unsafe
+        self._slots = threading.Semaphore(max_workers)
+        self._idle: tp.List[_Worker] = []
+        self._lock = threading.Lock()
+
+    def run(self, spec: str, uri: str, timeout: tp.Optional[float], max_memory: tp.Optional[int]) -> hip.Experiment:
+        # The timeout includes the time spent waiting for a worker process
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        if not self._slots.acquire(timeout=timeout):
+            raise FetcherProcessError(f"Fetcher took more than {timeout}s to load '{uri}' (no worker process available)")
+        shm_name = f"{_SHM_PREFIX}{secrets.token_hex(8)}"
+        status: tp.Optional[str] = None
+        result: tp.Any = None
+        try:
+            with self._lock:
+                worker = self._idle.pop() if self._idle else None
+            if worker is None or not worker.process.is_alive():
+                worker = _Worker(self._ctx)
+            keep_worker = False
+            try:
+                worker.conn.send((spec, uri, max_memory, shm_name))
+                if not worker.conn.poll(max(deadline - time.monotonic(), 0) if deadline is not None else None):
+                    raise FetcherProcessError(f"Fetcher took more than {timeout}s to load '{uri}'")
+                try:
+                    status, result = worker.conn.recv()
+                except EOFError:
+                    worker.process.join()
+                    raise FetcherProcessError(f"Fetcher process died while loading '{uri}' (exit code {worker.process.exitcode})")
+                keep_worker = status != "exit"
+            finally:
+                if keep_worker:
+                    with self._lock:
+                        self._idle.append(worker)
+                else:
+                    worker.kill()
+        finally:
+            self._slots.release()
+            if status != "ok":  # The worker might have created the segment before it failed or was killed
+                _unlink_shared_memory(shm_name)
+        if status == "ok":
+            return _import_experiment(result)
+        if status == "doesnt_apply":
+            raise hip.ExperimentFetcherDoesntApply()
+        raise result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for worker in self._idle:
+                worker.kill()
+            self._idle = []
+
+
+_pool_lock = threading.Lock()
+_pool_workers: int = os.cpu_count() or 1
+_pool: tp.Optional[_WorkerPool] = None
+
+
+def set_isolation_workers(max_workers: int) -> None:
+    """
+    Sets the number of worker processes that run isolated fetchers (by default, the number of CPUs)
+    """
+    global _pool, _pool_workers  # pylint: disable=global-statement
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
+        _pool_workers = max_workers
+
+
+def _get_pool() -> _WorkerPool:
+    global _pool  # pylint: disable=global-statement
+    with _pool_lock:
+        if _pool is None:
+            _pool = _WorkerPool(_pool_workers)
+        return _pool
+
+
+class IsolatedFetcher:
+    """
+    Runs a fetcher in a pool of worker processes (see :func:`set_isolation_workers`) instead of the server process.
+    The fetcher is given by its specification (eg `my_module.my_fetcher`, see :func:`hiplot.fetchers.get_fetcher`),
+    so that worker processes can import it.
+
+    Only loading experiments happens in worker processes: `get_version` and `get_uri_length`, if the fetcher has them,
+    still run in the server.
+
+    :param timeout: Maximum time to load an experiment, in seconds. The worker process is killed when it's exceeded
+    :param max_memory_mb: Maximum memory (address space) of a worker process while it loads an experiment.
+        Not supported on Windows and macOS
+    """
+
+    def __init__(self, fetcher_spec: str, timeout: tp.Optional[float] = None, max_memory_mb: tp.Optional[int] = None) -> None:
+        from .fetchers import get_fetcher
+
+        self.fetcher_spec = fetcher_spec
+        self.timeout = timeout
+        self.max_memory_mb = max_memory_mb
+        fetcher = get_fetcher(fetcher_spec)
+        for attr in ["uri_prefixes", "uri_suffixes", "get_uri_length", "get_version"]:
+            if hasattr(fetcher, attr):
+                setattr(self, attr, getattr(fetcher, attr))
+
+    def __call__(self, uri: str) -> hip.Experiment:
+        max_memory = self.max_memory_mb << 20 if self.max_memory_mb is not None else None
+        return _get_pool().run(self.fetcher_spec, uri, self.timeout, max_memory)
+
+    def __reduce__(self) -> tp.Tuple[tp.Any, ...]:
+        return (IsolatedFetcher, (self.fetcher_spec, self.timeout, self.max_memory_mb))
+
+    def __repr__(self) -> str:
+        return f"IsolatedFetcher({self.fetcher_spec!r})"
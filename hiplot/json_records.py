@@ -0,0 +1,106 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Streaming readers for JSON files made of records (one dictionary per datapoint): JSON arrays,
+and JSON Lines / NDJSON files. Records are parsed one at a time and converted to typed columns by chunks,
+so that we never hold the whole text of the file, or all the records as dictionaries, in memory.
+"""
+
+import itertools
+import json
+import re
+import typing as tp
+
+from .columns import ColumnStore
+from .experiment import Experiment
+
+_READ_SIZE = 1 << 20
+# C scanner of the `json` module, without the overhead of `JSONDecoder.raw_decode`
+_scan_once = json.JSONDecoder().scan_once  # type: ignore
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def _skip_whitespace(data: str, pos: int) -> int:
+    match = _WHITESPACE.match(data, pos)
+    assert match is not None  # Always matches
+    return match.end()
+
+
+def iter_json_array(f: tp.TextIO) -> tp.Iterator[tp.Any]:
+    """
+    Yields the elements of a JSON array one by one, reading the file by chunks.
+    If the document is not an array, it is yielded as a whole.
+    """
+    data = f.read(_READ_SIZE)
+    eof = False
+    pos = _skip_whitespace(data, 0)
+    if data[pos:pos + 1] != "[":
+        yield json.loads(data + f.read())
+        return
+    pos += 1
+    first = True
+    while True:
+        pos = _skip_whitespace(data, pos)
+        if first and data[pos:pos + 1] == "]":
+            return
+        try:
+            value, end = _scan_once(data, pos)
+            separator_pos = _skip_whitespace(data, end)
+            separator = data[separator_pos:separator_pos + 1]
+        except (StopIteration, json.JSONDecodeError) as e:
+            separator = ""
+            if eof:
+                if isinstance(e, StopIteration):
+                    raise json.JSONDecodeError("Expecting value", data, e.value) from None
+                raise
+        if separator == ",":
+            pos = separator_pos + 1
+            first = False
+            yield value
+        elif separator == "]":
+            yield value
+            return
+        elif eof:
+            raise json.JSONDecodeError("Expecting ',' delimiter", data, separator_pos)
+        else:
+            # The element might continue in the next chunk (eg `2.` then `5e3`)
+            chunk = f.read(max(_READ_SIZE, len(data) - pos))
+            data = data[pos:] + chunk
+            pos = 0
+            eof = not chunk
+
+
+def iter_json_lines(f: tp.Iterable[str]) -> tp.Iterator[tp.Any]:
+    """
+    Yields the records of a JSON Lines file. Empty lines are skipped.
+    """
+    for lineno, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {lineno}: {e}") from e
+
+
+def columns_from_records(records: tp.Iterable[tp.Dict[str, tp.Any]], chunk_size: int = 10000, row_offset: int = 0) -> ColumnStore:
+    """
+    Converts records to columns by chunks of `chunk_size` records, with the same semantics as :meth:`hiplot.Experiment.from_iterable`
+    """
+    it = iter(records)
+    chunks: tp.List[ColumnStore] = []
+    while True:
+        chunk = ColumnStore.from_rows(itertools.islice(it, chunk_size), row_offset=row_offset)
+        if not len(chunk):
+            break
+        chunks.append(chunk)
+        row_offset += len(chunk)
+    if len(chunks) == 1:
+        return chunks[0]
+    return ColumnStore.concat(chunks)
+
+
+def experiment_from_records(records: tp.Iterable[tp.Dict[str, tp.Any]], chunk_size: int = 10000) -> Experiment:
+    return Experiment._from_columns(columns_from_records(records, chunk_size=chunk_size))
@@ -0,0 +1,149 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+JSON encoding of experiments for the browser.
+Python's `json` writes special floats as `NaN`, `Infinity` and `-Infinity`, which are not valid JSON:
+we write them as sentinel strings instead, that `src/lib/json.ts` converts back to numbers.
+Strings that start like a sentinel (with `__hip_`) are escaped with another `__hip_` prefix.
+
+Experiments are encoded with `orjson <https://github.com/ijl/orjson>`_ if it's installed (`pip install orjson`),
+which is about 10 times faster than Python's `json`.
+"""
+
+import json
+import math
+import typing as tp
+
+SENTINEL_PREFIX = "__hip_"
+NAN = "__hip_NaN__"
+INFINITY = "__hip_Inf__"
+NEG_INFINITY = "__hip_-Inf__"
+_SENTINELS: tp.Dict[str, float] = {NAN: math.nan, INFINITY: math.inf, NEG_INFINITY: -math.inf}
+_QUOTED_PREFIX = f'"{SENTINEL_PREFIX}'
+
+_ENCODER = json.JSONEncoder(allow_nan=True, check_circular=False, separators=(",", ":"))
+_STRICT_ENCODER = json.JSONEncoder(allow_nan=False, check_circular=False, separators=(",", ":"))
+_SCALARS = {str, int, bool, type(None)}
+_INF = math.inf
+_isfinite = math.isfinite
+
+
+class _Replacer:
+    """
+    Replaces special floats in an object with sentinels, and escapes strings that start with the sentinel prefix if `escape_strings`.
+    Returns the object itself when there is nothing to replace, so that we only copy the parts of an experiment that change.
+    """
+
+    def __init__(self, escape_strings: bool) -> None:
+        self.escape_strings = escape_strings
+        self.num_replaced = 0
+        # Values of these types are never replaced (checks are inlined since this is called on every datapoint)
+        self._skipped = _SCALARS - {str} if escape_strings else _SCALARS
+
+    def replace(self, obj: tp.Any) -> tp.Any:
+        # pylint: disable=unidiomatic-typecheck
+        skipped = self._skipped
+        if isinstance(obj, str):
+            if self.escape_strings and obj.startswith(SENTINEL_PREFIX):
+                return SENTINEL_PREFIX + obj
+            return obj
+        if isinstance(obj, float):  # Also float subclasses (eg `numpy.float64`)
+            if -_INF < obj < _INF:
+                return obj
+            self.num_replaced += 1
+            if obj != obj:  # pylint: disable=comparison-with-itself
+                return NAN
+            return INFINITY if obj > 0 else NEG_INFINITY
+        if isinstance(obj, dict):
+            new_dict: tp.Optional[tp.Dict[tp.Any, tp.Any]] = None
+            for k, v in obj.items():
+                t = type(v)
+                if t is float and -_INF < v < _INF or t in skipped:
+                    continue
+                new_v = self.replace(v)
+                if new_v is not v:
+                    if new_dict is None:
+                        new_dict = dict(obj)
+                    new_dict[k] = new_v
+            return obj if new_dict is None else new_dict
+        if isinstance(obj, (list, tuple)):
+            if not self.escape_strings:
+                # Lists of numbers are checked without a Python loop
+                try:
+                    if all(map(_isfinite, obj)):
+                        return obj
+                except TypeError:
+                    pass
+            new_list: tp.Optional[tp.List[tp.Any]] = None
+            for i, v in enumerate(obj):
+                t = type(v)
+                if t is float and -_INF < v < _INF or t in skipped:
+                    continue
+                new_v = self.replace(v)
+                if new_v is not v:
+                    if new_list is None:
+                        new_list = list(obj)
+                    new_list[i] = new_v
+            return obj if new_list is None else new_list
+        return obj
+
+
+def _orjson_default(obj: tp.Any) -> tp.Any:
+    if isinstance(obj, float):
+        return float(obj)
+    raise TypeError
+
+
+def _orjson_dumps(obj: tp.Any) -> tp.Optional[str]:
+    import orjson
+
+    try:
+        return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    except TypeError:  # Integers larger than 64 bits, invalid unicode...
+        return None
+
+
+def dumps(obj: tp.Any) -> str:
+    """
+    Serializes `obj` to strict JSON, that can be parsed with `JSON.parse` in the browser.
+    Special floats are replaced with sentinel strings.
+    """
+    try:
+        import orjson  # pylint: disable=unused-import
+    except ModuleNotFoundError:
+        pass
+    else:
+        # orjson writes special floats as `null`, so we replace them before encoding
+        replacer = _Replacer(escape_strings=False)
+        data = _orjson_dumps(replacer.replace(obj))
+        # Every sentinel appears once in the output: anything else that looks like one is a user string
+        if data is not None and data.count(_QUOTED_PREFIX) == replacer.num_replaced:
+            return data
+        data = _orjson_dumps(_Replacer(escape_strings=True).replace(obj))
+        if data is not None:
+            return data
+    data = _ENCODER.encode(obj)
+    if "NaN" not in data and "Infinity" not in data and _QUOTED_PREFIX not in data:
+        return data
+    return _STRICT_ENCODER.encode(_Replacer(escape_strings=True).replace(obj))
+
+
+def _revive_special_floats(obj: tp.Any) -> tp.Any:
+    if isinstance(obj, str):
+        if not obj.startswith(SENTINEL_PREFIX):
+            return obj
+        return _SENTINELS.get(obj, obj[len(SENTINEL_PREFIX):])
+    if isinstance(obj, dict):
+        return {k: _revive_special_floats(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_revive_special_floats(v) for v in obj]
+    return obj
+
+
+def loads(data: tp.Union[str, bytes]) -> tp.Any:
+    """
+    Reference decoder, mirrors `parse_json` in `src/lib/json.ts`
+    """
+    return _revive_special_floats(json.loads(data))
@@ -0,0 +1,136 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Parses large CSV files on several CPU cores (see :func:`read_csv_parallel`).
+
+The file is memory-mapped and split in chunks of about `chunk_bytes`. A chunk can only end at a newline
+that is not inside a quoted field, ie after an even number of `"` since the beginning of the file:
+worker processes first count the quotes of every chunk, so that we know the parity at the start of each chunk.
+Chunks are then converted to typed columns in parallel (see :func:`hiplot.typed_csv.read_records`), and merged.
+Chunks where a column has a more specific type than in the whole file (eg integers in a column of strings)
+are converted again from their text, so that values are the same as when the file is read sequentially.
+"""
+
+import concurrent.futures
+import csv
+import io
+import mmap
+import multiprocessing
+import os
+import threading
+import typing as tp
+from pathlib import Path
+
+from .columns import ColumnStore
+from .experiment import Experiment
+from .typed_csv import experiment_from_columns, merge_kinds, merge_records, read_csv, read_records
+
+_NEWLINE = ord("\n")
+
+
+def _open_mmap(path: str) -> mmap.mmap:
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _count_quotes(path: str, start: int, end: int) -> int:
+    mapped = _open_mmap(path)
+    try:
+        return mapped[start:end].count(b'"')
+    finally:
+        mapped.close()
+
+
+def _read_chunk(path: str, start: int, end: int, header: tp.List[str],
+                kinds: tp.Optional[tp.Dict[str, tp.Optional[str]]] = None) -> tp.Tuple[ColumnStore, tp.Dict[str, tp.Optional[str]]]:
+    mapped = _open_mmap(path)
+    try:
+        text = mapped[start:end].decode("utf-8")
+    finally:
+        mapped.close()
+    return read_records(header, csv.reader(io.StringIO(text, newline="")), kinds=kinds)
+
+
+def _find_record_end(mapped: mmap.mmap, pos: int, in_quotes: bool) -> int:
+    """
+    Returns the position after the first newline at or after `pos` that ends a record
+    """
+    while True:
+        eol = mapped.find(b"\n", pos)
+        if eol == -1:
+            return len(mapped)
+        in_quotes ^= mapped[pos:eol].count(b'"') % 2 == 1
+        if not in_quotes:
+            return eol + 1
+        pos = eol + 1
+
+
+_pool_lock = threading.Lock()
+_pool_workers: int = os.cpu_count() or 1
+_pool: tp.Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+
+def set_csv_workers(max_workers: int) -> None:
+    """
+    Sets the number of processes that parse large CSV files (by default, the number of CPUs)
+    """
+    global _pool, _pool_workers  # pylint: disable=global-statement
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+        _pool_workers = max_workers
+
+
+def _get_pool() -> concurrent.futures.ProcessPoolExecutor:
+    global _pool  # pylint: disable=global-statement
+    with _pool_lock:
+        if _pool is None:
+            # Forking a multi-threaded server is unsafe
+            _pool = concurrent.futures.ProcessPoolExecutor(_pool_workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def read_csv_parallel(path: tp.Union[str, Path], chunk_bytes: int = 64 << 20) -> Experiment:
+    """
+    Reads a CSV file into an :class:`hiplot.Experiment` with typed columns, like :func:`hiplot.typed_csv.read_csv`,
+    but parses chunks of the file in a pool of processes (see :func:`set_csv_workers`).
+    Files smaller than `chunk_bytes` are parsed in the current process.
+    """
+    path = str(path)
+    size = os.path.getsize(path)
+    if _pool_workers <= 1 or size <= chunk_bytes:
+        with open(path, newline="", encoding="utf-8") as csvfile:
+            return read_csv(csvfile)
+    mapped = _open_mmap(path)
+    try:
+        header_end = _find_record_end(mapped, 0, False)
+        header = next(csv.reader(io.StringIO(mapped[:header_end].decode("utf-8"), newline="")), [])
+        starts = list(range(header_end, size, chunk_bytes))
+        pool = _get_pool()
+        quotes = list(pool.map(_count_quotes, [path] * len(starts), starts, starts[1:] + [size]))
+        bounds = [header_end]
+        total_quotes = 0
+        for start, count in zip(starts[1:], quotes):
+            total_quotes += count
+            end = _find_record_end(mapped, start, total_quotes % 2 == 1) if mapped[start - 1] != _NEWLINE or total_quotes % 2 else start
+            bounds.append(max(end, bounds[-1]))
+        bounds.append(size)
+    finally:
+        mapped.close()
+    ranges = [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+    chunks = list(pool.map(_read_chunk, [path] * len(ranges), [s for s, _ in ranges], [e for _, e in ranges], [header] * len(ranges)))
+    if not chunks:  # Only a header
+        chunks = [read_records(header, iter([]))]
+    # Chunks whose columns have more specific types than the whole file are read again with the types of the file
+    kinds = merge_kinds([k for store, k in chunks if len(store)])
+    reread = [i for i, (store, k) in enumerate(chunks) if len(store) and k != kinds]
+    for i, chunk in zip(reread, pool.map(_read_chunk, [path] * len(reread), [ranges[i][0] for i in reread],
+                                         [ranges[i][1] for i in reread], [header] * len(reread), [kinds] * len(reread))):
+        chunks[i] = chunk
+    store, kinds = merge_records(chunks)
+    if "uid" not in header:
+        store.uids = [str(k) for k in range(len(store))]
+    return experiment_from_columns(store, kinds)
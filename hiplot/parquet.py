@@ -0,0 +1,178 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Loads Parquet and Feather (Arrow IPC) files with `pyarrow` (`pip install pyarrow`).
+
+The URI can select columns and filter rows, eg `sweep.parquet?columns=lr,loss&where=loss<1&where=opt==adam`.
+Both are given to pyarrow, so that it only decodes the columns we need, and skips Parquet row groups
+that can't match the filters. Arrow columns are converted to typed columns directly, without creating a dict per row.
+"""
+
+import array
+import math
+import operator
+import re
+import typing as tp
+import urllib.parse
+
+from .columns import ColumnData, ColumnStore, MISSING, RESERVED_COLUMNS
+from .experiment import Displays, Experiment, ValueType
+
+if tp.TYPE_CHECKING:
+    import pyarrow as pa
+
+
+SUFFIXES = {".parquet": "parquet", ".pq": "parquet", ".feather": "feather", ".arrow": "feather"}
+
+_OPERATORS: tp.Dict[str, tp.Callable[[tp.Any, tp.Any], tp.Any]] = {
+    "==": operator.eq, "=": operator.eq, "!=": operator.ne,
+    "<=": operator.le, ">=": operator.ge, "<": operator.lt, ">": operator.gt,
+}
+_CONDITION_RE = re.compile(r"^\s*(.+?)\s*(==|!=|<=|>=|=|<|>)\s*(.*?)\s*$")
+_LITERALS = {"true": True, "false": False, "True": True, "False": False}
+
+
+class ArrowQuery(tp.NamedTuple):
+    path: str
+    format: str  # "parquet" or "feather"
+    columns: tp.Optional[tp.List[str]]
+    filters: tp.List[tp.Tuple[str, str, str]]  # (column, operator, value), all of them must match
+
+
+def _parse_value(value: str, pa_type: "pa.DataType") -> tp.Any:
+    import pyarrow as pa
+
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        return value[1:-1]
+    if pa.types.is_dictionary(pa_type):
+        pa_type = pa_type.value_type
+    if pa.types.is_string(pa_type) or pa.types.is_large_string(pa_type):
+        return value
+    if value in _LITERALS:
+        return _LITERALS[value]
+    for convert in [int, float]:
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+
+def parse_uri(uri: str) -> tp.Optional[ArrowQuery]:
+    """
+    Parses `path?columns=a,b&where=a<1&where=b==x`, or returns `None` if the path isn't a Parquet or Feather file.
+    Raises `ValueError` if the query is invalid.
+    """
+    path, _, query = uri.partition("?")
+    fmt = next((fmt for suffix, fmt in SUFFIXES.items() if path.endswith(suffix)), None)
+    if fmt is None:
+        return None
+    columns: tp.Optional[tp.List[str]] = None
+    filters: tp.List[tp.Tuple[str, str, str]] = []
+    for key, value in urllib.parse.parse_qsl(query, keep_blank_values=True, strict_parsing=bool(query)):
+        if key == "columns":
+            columns = (columns or []) + [c.strip() for c in value.split(",") if c.strip()]
+        elif key == "where":
+            match = _CONDITION_RE.match(value)
+            if match is None:
+                raise ValueError(f"Invalid condition '{value}', expected eg `where=loss<1`")
+            filters.append((match.group(1), match.group(2), match.group(3)))
+        else:
+            raise ValueError(f"Unknown parameter '{key}' in '{uri}' (expected `columns` or `where`)")
+    return ArrowQuery(path, fmt, columns, filters)
+
+
+def _numeric_column(col: "pa.ChunkedArray", pa_type: "pa.DataType", typecode: str, fill: tp.Any = None) -> ColumnData:
+    col = col.cast(pa_type)
+    if fill is not None:
+        col = col.fill_null(fill)
+    typed = array.array(typecode)
+    for chunk in col.chunks:
+        typed.frombytes(chunk.to_numpy(zero_copy_only=False).tobytes())
+    return typed
+
+
+def _column_from_arrow(col: "pa.ChunkedArray") -> tp.Tuple[ColumnData, bool]:
+    """
+    Returns the column, and whether it contains timestamps (converted to seconds)
+    """
+    import pyarrow as pa
+
+    pa_type = col.type
+    if pa.types.is_floating(pa_type) or (pa.types.is_integer(pa_type) and col.null_count):
+        # As in CSV files, missing numbers are NaNs
+        return _numeric_column(col, pa.float64(), "d", fill=math.nan), False
+    if pa.types.is_integer(pa_type) and not pa.types.is_uint64(pa_type):
+        return _numeric_column(col, pa.int64(), "q"), False
+    is_timestamp = pa.types.is_timestamp(pa_type) or pa.types.is_date(pa_type)
+    if is_timestamp:
+        col = col.cast(pa.timestamp("s"), safe=False).cast(pa.int64())
+        if not col.null_count:
+            return _numeric_column(col, pa.int64(), "q"), True
+    values: tp.List[tp.Any] = []
+    for chunk in col.chunks:
+        if pa.types.is_dictionary(chunk.type):
+            # Categorical column: only convert each distinct value once
+            dictionary = chunk.dictionary.to_pylist()
+            values.extend(dictionary[i] if i is not None else MISSING for i in chunk.indices.to_pylist())
+        else:
+            values.extend(v if v is not None else MISSING for v in chunk.to_pylist())
+    return values, is_timestamp
+
+
+def experiment_from_arrow(table: "pa.Table") -> Experiment:
+    """
+    Creates an experiment from a pyarrow Table. `uid` and `from_uid` columns are used as in :meth:`hiplot.Experiment.from_dataframe`
+    """
+    names = table.column_names
+    if "uid" in names:
+        uids = ["" if v is None else str(v) for v in table.column("uid").to_pylist()]
+    else:
+        uids = [str(k) for k in range(table.num_rows)]
+    from_uids: tp.List[tp.Optional[str]] = [None] * table.num_rows
+    if "from_uid" in names:
+        from_uids = [None if v is None or v == "" else str(v) for v in table.column("from_uid").to_pylist()]
+    columns: tp.Dict[str, ColumnData] = {}
+    timestamps: tp.List[str] = []
+    for name in names:
+        if name in RESERVED_COLUMNS:
+            continue
+        columns[name], is_timestamp = _column_from_arrow(table.column(name))
+        if is_timestamp:
+            timestamps.append(name)
+    xp = Experiment._from_columns(ColumnStore(uids, from_uids, columns))
+    for name in timestamps:
+        xp.parameters_definition[name].type = ValueType.TIMESTAMP
+    xp.display_data(Displays.PARALLEL_PLOT)["order"] = list(names)
+    xp.display_data(Displays.TABLE)["order"] = list(names)
+    return xp
+
+
+def load(query: ArrowQuery) -> Experiment:
+    """
+    Reads the selected columns and rows of a Parquet or Feather file
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(query.path, format=query.format)
+    schema_names = dataset.schema.names
+    columns = query.columns
+    if columns is not None:
+        unknown = [c for c in columns if c not in schema_names]
+        if unknown:
+            raise ValueError(f"Unknown columns {unknown} in '{query.path}' (available: {schema_names})")
+        # Keep the lineage of datapoints
+        columns = [c for c in RESERVED_COLUMNS if c in schema_names and c not in columns] + columns
+    expression: tp.Any = None
+    for name, op, value in query.filters:
+        if name not in schema_names:
+            raise ValueError(f"Unknown column '{name}' in condition (available: {schema_names})")
+        condition = _OPERATORS[op](ds.field(name), _parse_value(value, dataset.schema.field(name).type))
+        expression = condition if expression is None else expression & condition
+    xp = experiment_from_arrow(dataset.to_table(columns=columns, filter=expression))
+    if expression is not None:
+        # The parents of some datapoints might have been filtered out
+        xp.remove_missing_parents()
+    return xp
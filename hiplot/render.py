@@ -12,6 +12,7 @@ from pathlib import Path
 import codecs
 
 from . import fetchers
+from . import jsonenc
 
 
 def escapejs(val: Any) -> str:
@@ -87,7 +88,7 @@ def make_experiment_standalone_page(options: Dict[str, Any]) -> str:
     index_html = index_html.replace(
         "/*ON_LOAD_SCRIPT_INJECT*/",
         f"""/*ON_LOAD_SCRIPT_INJECT*/
-        Object.assign(options, eval('(' + {escapejs(json.dumps(hiplot_options))} + ')'));
+        Object.assign(options, hiplot.parse_json({escapejs(jsonenc.dumps(hiplot_options))}));
         """)
     return index_html
 
@@ -3,25 +3,328 @@
 # LICENSE file in the root directory of this source tree.
 
 import argparse
+import functools
 import importlib
 import json
 import copy
-from typing import List, Any, Dict
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Any, Callable, Dict, Iterator, Optional, Tuple
 
 from . import experiment as exp
-from .fetchers import get_fetchers, MultipleFetcher, NoFetcherFound, load_xp_with_fetchers
+from .cache import CacheEntry, EncodedResponse, ExperimentCache, SingleFlight, available_encodings
+from .compress import compress
+from .disk_cache import DiskCache
+from .fetchers import (get_fetchers, get_fetchers_id, get_tail_reader, get_uri_version, set_load_workers, FetcherRegistry,
+                       MultipleFetcher, NoFetcherFound, load_xp_with_fetchers)
+from .isolation import set_isolation_workers
 from .render import get_index_html_template, html_inlinize
 from . import pkginfo
+from . import binary_format
+from . import jsonenc
+from . import stream_format
+from .tail import LiveExperiment, TailReader
 
+_PREFERRED_ENCODINGS = ["br", "gzip"]
+_MIME_TYPES = {"binary": binary_format.MIME_TYPE, "stream": stream_format.MIME_TYPE}
 
-def run_server(fetchers: List[exp.ExperimentFetcher], host: str = '127.0.0.1', port: int = 5005, debug: bool = False) -> None:
+
+def _serialize(xp: exp.Experiment, extra: Dict[str, Any], data_format: str) -> bytes:
+    if data_format == "binary":
+        return binary_format.dumps(xp, extra=extra)
+    if data_format == "stream":
+        return b"".join(stream_format.iter_lines(xp, extra=extra))
+    return jsonenc.dumps({**extra, "experiment": xp._asdict()}).encode("utf-8")
+
+
+def _gzip_stream(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    # Flush after every chunk, so that the browser can decompress it right away
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def _stat(path: Path) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {jsonenc.dumps(data)}\n\n".encode("utf-8")
+
+
+HTTPResponse = Tuple[int, Dict[str, str], bytes]
+StreamingHTTPResponse = Tuple[int, Dict[str, str], Iterator[bytes]]
+
+LIVE_POLL_INTERVAL = 1.0  # Seconds between checks for new datapoints in live experiments
+LIVE_KEEPALIVE_INTERVAL = 15.0
+_MAX_LIVE_EXPERIMENTS = 64
+MAX_LIVE_CLIENTS = 32  # Each client following a live experiment holds a thread of the Flask server (see `DataService.get_live_events`)
+
+
+class DataService:
     """
-    Runs the HiPlot server, given a list of ExperimentFetchers - functions that convert a URI into a :class:`hiplot.Experiment`
+    Implements the `/data` endpoint independently of the web framework (Flask in :func:`create_app`,
+    or ASGI in :func:`hiplot.asgi.create_asgi_app`). Requests are blocking, and can be handled in several threads.
     """
-    from flask import Flask, render_template, jsonify, request
-    from flask_compress import Compress
+
+    def __init__(self, fetchers: List[exp.ExperimentFetcher], cache_entries: int = 16, cache_bytes: int = 1 << 30,
+                 disk_cache: Optional[DiskCache] = None) -> None:
+        self.fetchers = fetchers
+        self.cache = ExperimentCache(max_entries=cache_entries, max_bytes=cache_bytes) if cache_entries > 0 else None
+        self.disk_cache = disk_cache
+        self._fetchers_id = get_fetchers_id(fetchers)
+        self._in_flight = SingleFlight()
+        self._live: "OrderedDict[str, LiveExperiment]" = OrderedDict()
+        self._live_lock = threading.Lock()
+        self._live_clients = 0
+
+    def get_data(self, uri: str, data_format: str = "json",
+                 accept_encoding: Optional[str] = None, if_none_match: Optional[str] = None) -> HTTPResponse:
+        try:
+            version, entry = self._lookup(uri)
+            encoded, cache_status = self._get_encoded(uri, version, entry, data_format)
+        except NoFetcherFound as e:
+            return 200, {"Content-Type": "application/json"}, \
+                jsonenc.dumps({"error": f"No fetcher found for this experiment: {e}"}).encode("utf-8")
+        return self._respond(encoded, cache_status, _MIME_TYPES.get(data_format, "application/json"), accept_encoding, if_none_match)
+
+    def _respond(self, encoded: EncodedResponse, cache_status: str, mimetype: str,
+                 accept_encoding: Optional[str], if_none_match: Optional[str]) -> HTTPResponse:
+        from werkzeug.http import parse_accept_header, parse_etags
+
+        # Bodies are already compressed, so `flask_compress` leaves them alone
+        encoding = parse_accept_header(accept_encoding).best_match([e for e in _PREFERRED_ENCODINGS if e in available_encodings()])
+        headers = {
+            "Content-Type": mimetype,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": "no-cache",  # Always revalidate with the ETag
+            "X-HiPlot-Cache": cache_status,
+        }
+        etag = f"{encoded.etag}-{encoding}" if encoding is not None else encoded.etag
+        headers["ETag"] = f'"{etag}"'
+        if parse_etags(if_none_match).contains(etag):
+            return 304, headers, b""
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+            return 200, headers, encoded.compressed(encoding)
+        return 200, headers, encoded.body
+
+    def get_data_stream(self, uri: str, accept_encoding: Optional[str] = None,
+                        if_none_match: Optional[str] = None) -> StreamingHTTPResponse:
+        """
+        Same as :meth:`get_data`, but sends the experiment progressively (see `stream_format.py`).
+        The experiment is fully loaded before this function returns, so that loading errors are raised here.
+        Cached experiments are sent in one piece, from their cached response, with an ETag.
+        """
+        from werkzeug.http import parse_accept_header
+
+        try:
+            version, entry = self._lookup(uri)
+            if entry is not None:
+                encoded, cache_status = self._get_encoded(uri, version, entry, "stream")
+                status, cached_headers, cached_body = self._respond(encoded, cache_status, stream_format.MIME_TYPE,
+                                                                    accept_encoding, if_none_match)
+                return status, cached_headers, iter([cached_body])
+            (xp, load_errors, _), shared = self._in_flight.do((uri, version, None), functools.partial(self._load, uri, version))
+        except NoFetcherFound as e:
+            return 200, {"Content-Type": "application/json"}, \
+                iter([jsonenc.dumps({"error": f"No fetcher found for this experiment: {e}"}).encode("utf-8")])
+        body = stream_format.iter_lines(xp, extra=self._get_extra(uri, load_errors))
+        headers = {
+            "Content-Type": stream_format.MIME_TYPE,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": "no-cache",
+            "X-HiPlot-Cache": "COALESCED" if shared else "MISS",
+        }
+        if parse_accept_header(accept_encoding).best_match(["gzip"]) is not None:
+            headers["Content-Encoding"] = "gzip"
+            body = _gzip_stream(body)
+        return 200, headers, body
+
+    def _lookup(self, uri: str) -> Tuple[Any, Optional[CacheEntry]]:
+        """
+        Returns the version of the experiment (see :func:`hiplot.fetchers.get_uri_version`), and its cache entry if we have one.
+        Called once per request, so that the cache statistics count requests.
+        """
+        if self.cache is None and self.disk_cache is None:
+            return None, None
+        version = get_uri_version(self.fetchers, uri)
+        if self.cache is None or version is None:
+            return version, None
+        return version, self.cache.get(uri, version)
+
+    def _load(self, uri: str, version: Any) -> Tuple[exp.Experiment, Dict[str, str], Optional[CacheEntry]]:
+        load_errors: Dict[str, str] = {}
+        disk_key = DiskCache.key(uri, self._fetchers_id, version) if self.disk_cache is not None and version is not None else None
+        xp = self.disk_cache.get(disk_key) if self.disk_cache is not None and disk_key is not None else None
+        if xp is None:
+            reader = get_tail_reader(self.fetchers, uri)
+            st = _stat(reader.path) if reader is not None else None
+            xp = load_xp_with_fetchers(self.fetchers, uri, errors=load_errors)
+            xp.validate()
+            if reader is not None and st is not None:
+                self._start_live(uri, reader, xp, st)
+            if self.disk_cache is not None and disk_key is not None and not load_errors:
+                self.disk_cache.put(disk_key, uri, xp)
+        entry = None
+        if self.cache is not None and version is not None and not load_errors:
+            entry = self.cache.put(uri, version, xp)
+        return xp, load_errors, entry
+
+    def _get_encoded(self, uri: str, version: Any, entry: Optional[CacheEntry], data_format: str) -> Tuple[EncodedResponse, str]:
+        if entry is not None and data_format in entry.responses:
+            return entry.responses[data_format], "HIT"
+        # Concurrent requests for the same experiment wait for the first one, instead of loading it again
+        encoded, shared = self._in_flight.do(
+            (uri, version, data_format),
+            functools.partial(self._load_and_encode, uri, version, data_format, entry),
+        )
+        if shared:
+            return encoded, "COALESCED"
+        return encoded, "HIT" if entry is not None else "MISS"
+
+    def _load_and_encode(self, uri: str, version: Any, data_format: str, entry: Optional[CacheEntry]) -> EncodedResponse:
+        load_errors: Dict[str, str] = {}
+        if entry is None:
+            xp, load_errors, entry = self._load(uri, version)
+        else:
+            xp = entry.experiment
+        encoded = EncodedResponse(_serialize(xp, self._get_extra(uri, load_errors), data_format))
+        if self.cache is not None and entry is not None:
+            self.cache.add_response(uri, entry, data_format, encoded)
+        return encoded
+
+    def _get_extra(self, uri: str, load_errors: Dict[str, str]) -> Dict[str, Any]:
+        extra: Dict[str, Any] = {"query": uri}
+        if load_errors:
+            extra["load_errors"] = load_errors
+        if get_tail_reader(self.fetchers, uri) is not None:
+            extra["live"] = True  # The browser can follow new datapoints (see `get_data_delta`)
+        return extra
+
+    def get_data_delta(self, uri: str, watermark: str) -> HTTPResponse:
+        """
+        Returns the datapoints added to a live experiment since the client's `watermark` (see :class:`hiplot.tail.LiveExperiment`),
+        along with the new watermark - or `{"reset": true}` if the client needs to load the experiment again.
+        """
+        live = self._get_live(uri)
+        if live is None:
+            response: Dict[str, Any] = {"error": "Live updates are not supported for this experiment"}
+        else:
+            delta, new_watermark = live.delta(watermark)
+            if delta is None:
+                response = {"reset": True}
+            else:
+                response = {"watermark": new_watermark, "datapoints_compressed": compress(delta)}
+        return 200, {"Content-Type": "application/json", "Cache-Control": "no-cache"}, jsonenc.dumps(response).encode("utf-8")
+
+    def poll_live(self, uri: str, watermark: str) -> Optional[str]:
+        """
+        Returns the watermark of a live experiment if it changed since `watermark`, or None.
+        The experiment is read at most once every `LIVE_POLL_INTERVAL` seconds, however many clients poll it.
+        """
+        live = self._get_live(uri, max_age=LIVE_POLL_INTERVAL)
+        if live is None or live.is_up_to_date(watermark):
+            return None
+        return live.watermark
+
+    def get_live_events(self, uri: str, watermark: str, sleep: Callable[[float], None] = time.sleep) -> StreamingHTTPResponse:
+        """
+        Server-sent events that notify the client when datapoints are added to a live experiment.
+        Every `update` event comes with the new watermark, and the client can then request the new datapoints
+        with :meth:`get_data_delta`. This response never ends, until the client disconnects.
+
+        Every client holds a thread until it disconnects, so at most `MAX_LIVE_CLIENTS` clients are served at once
+        (the ASGI server in :mod:`hiplot.asgi` waits in its event loop instead, and has no such limit).
+        """
+        if get_tail_reader(self.fetchers, uri) is None:
+            return 404, {"Content-Type": "text/plain"}, iter([b"Live updates are not supported for this experiment"])
+        with self._live_lock:
+            if self._live_clients >= MAX_LIVE_CLIENTS:
+                return 503, {"Content-Type": "text/plain"}, iter([b"Too many clients follow live experiments"])
+
+        def events() -> Iterator[bytes]:
+            nonlocal watermark
+            with self._live_lock:
+                self._live_clients += 1
+            try:
+                yield f"retry: {int(LIVE_POLL_INTERVAL * 5000)}\n\n".encode("utf-8")
+                last_event = time.time()
+                while True:
+                    new_watermark = self.poll_live(uri, watermark)
+                    if new_watermark is not None:
+                        watermark = new_watermark
+                        yield sse_event("update", {"watermark": watermark})
+                        last_event = time.time()
+                    elif time.time() - last_event > LIVE_KEEPALIVE_INTERVAL:
+                        yield b": keepalive\n\n"
+                        last_event = time.time()
+                    sleep(LIVE_POLL_INTERVAL)
+            finally:
+                # When the client disconnects, the server closes this generator
+                with self._live_lock:
+                    self._live_clients -= 1
+        return 200, {"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}, events()
+
+    def _start_live(self, uri: str, reader: TailReader, xp: exp.Experiment, st: os.stat_result) -> None:
+        """
+        Follows the file of an experiment that was just loaded from where loading it stopped, instead of reading it again
+        when the client asks for new datapoints. Only if the file didn't change while we loaded it.
+        """
+        after = _stat(reader.path)
+        if after is None or (after.st_dev, after.st_ino, after.st_size, after.st_mtime_ns) != (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns):
+            return
+        live = LiveExperiment(reader)
+        if not live.start_after(xp, st):
+            return
+        with self._live_lock:
+            if uri not in self._live:
+                self._live[uri] = live
+                while len(self._live) > _MAX_LIVE_EXPERIMENTS:
+                    self._live.popitem(last=False)
+
+    def _get_live(self, uri: str, max_age: float = 0.0) -> Optional[LiveExperiment]:
+        with self._live_lock:
+            live = self._live.get(uri)
+            if live is not None:
+                self._live.move_to_end(uri)
+        if live is None:
+            reader = get_tail_reader(self.fetchers, uri)
+            if reader is None:
+                return None
+            with self._live_lock:
+                live = self._live.setdefault(uri, LiveExperiment(reader))
+                while len(self._live) > _MAX_LIVE_EXPERIMENTS:
+                    self._live.popitem(last=False)
+        live.refresh(max_age=max_age)
+        return live
+
+    def get_cache_stats(self) -> HTTPResponse:
+        stats: Dict[str, Any] = dict(self.cache.stats()) if self.cache is not None else {}
+        if self.disk_cache is not None:
+            stats["disk"] = self.disk_cache.stats()
+        if isinstance(self.fetchers, FetcherRegistry):
+            stats["fetchers"] = self.fetchers.stats()
+        return 200, {"Content-Type": "application/json"}, jsonenc.dumps(stats).encode("utf-8")
+
+
+def create_app(fetchers: List[exp.ExperimentFetcher], cache_entries: int = 16, cache_bytes: int = 1 << 30,
+               disk_cache: Optional[DiskCache] = None) -> Any:
+    """
+    Creates the HiPlot Flask application (see :func:`run_server`)
+    """
+    from flask import Flask, Response, request
 
     app = Flask(__name__)
+    service = DataService(fetchers, cache_entries=cache_entries, cache_bytes=cache_bytes, disk_cache=disk_cache)
 
     @app.route("/")
     def index() -> Any:  # pylint: disable=unused-variable
@@ -32,13 +335,53 @@ def run_server(fetchers: List[exp.ExperimentFetcher], host: str = '127.0.0.1', p
     def data() -> Any:  # pylint: disable=unused-variable
         uri = request.args.get("uri", type=str)
         assert uri is not None
-        try:
-            xp = load_xp_with_fetchers(fetchers, uri)
-            xp.validate()
-            return jsonify({"query": uri, "experiment": xp._asdict()})
-        except NoFetcherFound as e:
-            return jsonify({"error": f"No fetcher found for this experiment: {e}"})
+        data_format = request.args.get("format", default="json", type=str)
+        if data_format == "delta":
+            status, headers, body = service.get_data_delta(uri, request.args.get("watermark", default="0", type=str))
+            return Response(body, status=status, headers=headers)
+        if data_format == "stream":
+            status, headers, chunks = service.get_data_stream(
+                uri,
+                accept_encoding=request.headers.get("Accept-Encoding"),
+                if_none_match=request.headers.get("If-None-Match"),
+            )
+            return Response(chunks, status=status, headers=headers)
+        status, headers, body = service.get_data(
+            uri,
+            data_format=data_format,
+            accept_encoding=request.headers.get("Accept-Encoding"),
+            if_none_match=request.headers.get("If-None-Match"),
+        )
+        return Response(body, status=status, headers=headers)
+
+    @app.route("/data_events")
+    def data_events() -> Any:  # pylint: disable=unused-variable
+        uri = request.args.get("uri", type=str)
+        assert uri is not None
+        status, headers, chunks = service.get_live_events(uri, request.args.get("watermark", default="0", type=str))
+        return Response(chunks, status=status, headers=headers)
+
+    @app.route("/cache_stats")
+    def cache_stats() -> Any:  # pylint: disable=unused-variable
+        status, headers, body = service.get_cache_stats()
+        return Response(body, status=status, headers=headers)
+
+    return app
+
 
+def run_server(fetchers: List[exp.ExperimentFetcher], host: str = '127.0.0.1', port: int = 5005, debug: bool = False,
+               cache_entries: int = 16, cache_bytes: int = 1 << 30, disk_cache: Optional[DiskCache] = None) -> None:
+    """
+    Runs the HiPlot server, given a list of ExperimentFetchers - functions that convert a URI into a :class:`hiplot.Experiment`
+
+    Loaded experiments are kept in an LRU cache of at most `cache_entries` experiments and `cache_bytes` bytes,
+    as long as the files they were loaded from don't change (see :func:`hiplot.fetchers.get_uri_version`).
+    Set `cache_entries` to 0 to disable the cache.
+    Experiments are also stored in `disk_cache` if provided, so that they are loaded faster after a restart.
+    """
+    from flask_compress import Compress
+
+    app = create_app(fetchers, cache_entries=cache_entries, cache_bytes=cache_bytes, disk_cache=disk_cache)
     Compress(app)
     app.run(debug=debug, host=host, port=port)
 
@@ -49,7 +392,39 @@ def run_server_main() -> int:
     parser.add_argument("--host", type=str, default="127.0.0.1")
     parser.add_argument("--port", type=int, default=5005)
     parser.add_argument("--dev", action='store_true', help="Enable Flask Debug mode (watches for files modifications, etc..)")
+    parser.add_argument("--cache-entries", type=int, default=16, help="Maximum number of experiments to keep in memory (0 to disable)")
+    parser.add_argument("--cache-mb", type=int, default=1024, help="Maximum size of experiments kept in memory, in MB")
+    parser.add_argument("--disk-cache", type=str, default=None,
+                        help="Directory where parsed experiments are stored, to load them faster after a restart (see `hiplot-cache`)")
+    parser.add_argument("--disk-cache-mb", type=int, default=4096, help="Maximum size of the disk cache, in MB")
+    parser.add_argument("--load-workers", type=int, default=None,
+                        help="Number of experiments loaded concurrently for multi-URIs (0 to load them one after another)")
+    parser.add_argument("--load-processes", action='store_true', help="Load experiments in processes instead of threads")
+    parser.add_argument("--fetcher-processes", type=int, default=0,
+                        help="Run the additional fetchers in this many worker processes, isolated from the server (0 to disable)")
+    parser.add_argument("--fetcher-timeout", type=float, default=None, help="Maximum time to load an experiment with an isolated fetcher, in seconds")
+    parser.add_argument("--fetcher-memory-mb", type=int, default=None, help="Maximum memory of an isolated fetcher process, in MB")
+    parser.add_argument("--async", dest="use_async", action='store_true',
+                        help="Run the asynchronous (ASGI) server with uvicorn, for production use")
+    parser.add_argument("--workers", type=int, default=1, help="Number of server processes (implies --async if more than 1)")
     parser.add_argument("fetchers", nargs="*", type=str)
     args = parser.parse_args()
-    run_server(fetchers=get_fetchers(args.fetchers), host=args.host, port=args.port, debug=args.dev)
+    if args.use_async or args.workers > 1:
+        from .asgi import run_asgi_server
+
+        run_asgi_server(fetchers=args.fetchers, host=args.host, port=args.port, workers=args.workers,
+                        cache_entries=args.cache_entries, cache_bytes=args.cache_mb * (1 << 20),
+                        load_workers=args.load_workers, load_processes=args.load_processes,
+                        fetcher_processes=args.fetcher_processes, fetcher_timeout=args.fetcher_timeout,
+                        fetcher_memory_mb=args.fetcher_memory_mb, disk_cache=args.disk_cache,
+                        disk_cache_bytes=args.disk_cache_mb * (1 << 20))
+        return 0
+    set_load_workers(args.load_workers, processes=args.load_processes)
+    if args.fetcher_processes > 0:
+        set_isolation_workers(args.fetcher_processes)
+    fetchers = get_fetchers(args.fetchers, isolate=args.fetcher_processes > 0, timeout=args.fetcher_timeout,
+                            max_memory_mb=args.fetcher_memory_mb)
+    run_server(fetchers=fetchers, host=args.host, port=args.port, debug=args.dev,
+               cache_entries=args.cache_entries, cache_bytes=args.cache_mb * (1 << 20),
+               disk_cache=DiskCache(args.disk_cache, max_bytes=args.disk_cache_mb * (1 << 20)) if args.disk_cache is not None else None)
     return 0
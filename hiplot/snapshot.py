@@ -0,0 +1,194 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Binary columnar format of `.hiplot` files (see :meth:`hiplot.Experiment.save`), also used by the disk cache (see `disk_cache.py`).
+Contrary to `binary_format.py`, which is meant for the browser, it keeps everything the python :class:`hiplot.Experiment`
+has: int64 columns, missing values, and the keys of categorical colors.
+Numeric columns can be memory-mapped when the file is loaded, so that they are only read from disk when used.
+
+Layout (all integers are little-endian):
+- 4 bytes: magic string `HIPS`
+- 4 bytes: uint32, version of the format
+- 4 bytes: uint32, length of the JSON header in bytes (including padding)
+- JSON header, padded with spaces so that buffers start on an 8-bytes boundary
+- Buffers of numeric columns, each one aligned on 8 bytes (offsets are relative to the end of the header)
+
+The header contains:
+- `extra`: arbitrary data stored along with the experiment (eg the URI it was loaded from)
+- `experiment`: settings of the experiment, without its datapoints
+- `num_rows`, `uid`, `from_uid`: number of datapoints, and their uids/parents encoded as in `compress.py`
+- `columns`: for each column its name, and either a `dtype` ("float64" or "int64") with an `offset` in the buffers,
+    or a `dtype` "json" with `values` encoded as in `compress.py` and the indices of the rows where the value is `missing`
+"""
+
+import array
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import typing as tp
+from pathlib import Path
+
+from . import jsonenc
+from .columns import ColumnStore, MISSING, column_typecode
+from .compress import encode_column, encode_from_uids, encode_uids, decode_column, decode_from_uids
+from .experiment import Experiment, ValueType
+
+MAGIC = b"HIPS"
+VERSION = 1
+_PREFIX = struct.Struct("<4sII")
+PREFIX_SIZE = _PREFIX.size
+_ALIGNMENT = 8
+_DTYPES = {"d": "float64", "q": "int64"}
+_TYPECODES = {dtype: typecode for typecode, dtype in _DTYPES.items()}
+
+
+def _settings_asdict(xp: Experiment) -> tp.Dict[str, tp.Any]:
+    settings = xp._settings_asdict()
+    # JSON only has string keys
+    settings["parameters_definition"] = {
+        name: {**d, "colors": list(d["colors"].items()) if d["colors"] is not None else None}
+        for name, d in settings["parameters_definition"].items()
+    }
+    return settings
+
+
+def _load_settings(xp: Experiment, settings: tp.Dict[str, tp.Any]) -> None:
+    for name, d in settings["parameters_definition"].items():
+        valuedef = xp.parameters_definition[name]
+        valuedef.type = ValueType(d["type"]) if d["type"] is not None else None
+        valuedef.colors = {k: v for k, v in d["colors"]} if d["colors"] is not None else None
+        valuedef.colormap = d["colormap"]
+        valuedef.force_value_min = d["force_value_min"]
+        valuedef.force_value_max = d["force_value_max"]
+        valuedef.label_css = d["label_css"]
+        valuedef.label_html = d["label_html"]
+    xp.colormap = settings["colormap"]
+    xp.colorby = settings["colorby"]
+    xp.weightcolumn = settings["weightcolumn"]
+    xp._display_data = settings["display_data"]
+    xp.enabledDisplays = settings["enabled_displays"]
+
+
+def dumps(xp: Experiment, extra: tp.Optional[tp.Dict[str, tp.Any]] = None) -> bytes:
+    """
+    Serializes an experiment. Raises a `TypeError` if some values can't be represented in JSON
+    """
+    store = xp._get_columns()
+    columns: tp.List[tp.Dict[str, tp.Any]] = []
+    buffers: tp.List[bytes] = []
+    offset = 0
+    for name, col in store.columns.items():
+        typecode = column_typecode(col)
+        if typecode in _DTYPES:
+            assert not isinstance(col, list)
+            if sys.byteorder == "big":
+                swapped = array.array(typecode)
+                swapped.frombytes(memoryview(col).cast("B"))
+                swapped.byteswap()
+                col = swapped
+            buf = col.tobytes()
+            columns.append({"name": name, "dtype": _DTYPES[typecode], "offset": offset})
+            buffers.append(buf + b"\0" * (-len(buf) % _ALIGNMENT))
+            offset += len(buffers[-1])
+            continue
+        columns.append({
+            "name": name,
+            "dtype": "json",
+            "values": encode_column(col),
+            "missing": [row for row, v in enumerate(col) if v is MISSING],
+        })
+    header = jsonenc.dumps({
+        "extra": extra if extra is not None else {},
+        "experiment": _settings_asdict(xp),
+        "num_rows": len(store),
+        "uid": encode_uids(store.uids),
+        "from_uid": encode_from_uids(store.uids, store.from_uids),
+        "columns": columns,
+    }).encode("utf-8")
+    header += b" " * (-(_PREFIX.size + len(header)) % _ALIGNMENT)
+    return b"".join([_PREFIX.pack(MAGIC, VERSION, len(header)), header] + buffers)
+
+
+def loads_header(data: tp.Union[bytes, memoryview]) -> tp.Dict[str, tp.Any]:
+    """
+    Returns the header of a serialized experiment (`data` only needs to contain the header)
+    """
+    magic, version, header_len = _PREFIX.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not an HiPlot experiment snapshot")
+    if version != VERSION:
+        raise ValueError(f"Unsupported experiment snapshot version {version}")
+    return tp.cast(tp.Dict[str, tp.Any], jsonenc.loads(bytes(data[_PREFIX.size:_PREFIX.size + header_len])))
+
+
+def header_size(data: tp.Union[bytes, memoryview]) -> int:
+    """
+    Returns the size of the header (prefix included), given at least its first `PREFIX_SIZE` bytes
+    """
+    return _PREFIX.size + int(_PREFIX.unpack_from(data)[2])
+
+
+def loads(data: tp.Union[bytes, memoryview], copy: bool = True) -> Experiment:
+    """
+    :param copy: If `False`, numeric columns are views of `data` instead of copies (only on little-endian machines)
+    """
+    copy = copy or sys.byteorder == "big"
+    header = loads_header(data)
+    buffers_start = header_size(data)
+    num_rows = header["num_rows"]
+    uids = decode_column(header["uid"], num_rows)
+    store = ColumnStore(uids, decode_from_uids(header["from_uid"], uids))
+    for col in header["columns"]:
+        if col["dtype"] == "json":
+            values = decode_column(col["values"], num_rows)
+            for row in col["missing"]:
+                values[row] = MISSING
+            store.columns[col["name"]] = values
+            continue
+        typecode = _TYPECODES[col["dtype"]]
+        start = buffers_start + col["offset"]
+        buf = memoryview(data)[start:start + num_rows * array.array(typecode).itemsize]
+        if not copy:
+            store.columns[col["name"]] = buf.cast(typecode)  # type: ignore
+            continue
+        typed = array.array(typecode)
+        typed.frombytes(buf)
+        if sys.byteorder == "big":
+            typed.byteswap()
+        store.columns[col["name"]] = typed
+    xp = Experiment._from_columns(store)
+    _load_settings(xp, header["experiment"])
+    return xp
+
+
+def save(xp: Experiment, path: tp.Union[str, Path]) -> None:
+    """
+    Writes a `.hiplot` file. The file is replaced atomically, so that experiments memory-mapped from it stay valid
+    """
+    data = dumps(xp)
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load(path: tp.Union[str, Path], use_mmap: bool = True) -> Experiment:
+    """
+    Reads a `.hiplot` file. With `use_mmap`, numeric columns are read from the file when they are used
+    (the file must not be modified in place in the meantime)
+    """
+    with open(path, "rb") as f:
+        if not use_mmap:
+            return loads(f.read())
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    # Memoryviews of the columns keep the mapping open
+    return loads(memoryview(mapped), copy=False)
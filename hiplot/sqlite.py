@@ -0,0 +1,226 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Loads experiments from SQLite databases (eg Optuna storage), with URIs such as
+`sqlite://path/to/db.sqlite?watermark=trial_id&query=SELECT * FROM trials`.
+
+`query` must come last, and is used as is (it is not URL-decoded). Each row of the results is a datapoint,
+and `uid` / `from_uid` columns are used as in CSV files. With a `watermark` column, whose value increases
+for new rows (an autoincrement id, a timestamp...), the experiment is followed live: only rows with a larger watermark
+than the last one read are queried again (see :class:`SQLiteTailReader`). Rows updated in place (eg Optuna trials
+going from RUNNING to COMPLETE) are not picked up until the experiment is loaded again.
+"""
+
+import array
+import math
+import os
+import sqlite3
+import typing as tp
+import urllib.request
+from pathlib import Path
+
+from .columns import ColumnData, ColumnStore, MISSING, RESERVED_COLUMNS, column_typecode
+from .experiment import Experiment, ValueType
+from .tail import TailReader
+from .typed_csv import _TIMESTAMP_RE, _parse_timestamp
+
+PREFIX = "sqlite://"
+_FETCH_SIZE = 10000
+
+
+class SQLiteQuery(tp.NamedTuple):
+    path: str
+    query: str
+    watermark: tp.Optional[str]  # Column that increases for new rows
+
+
+def parse_uri(uri: str) -> tp.Optional[SQLiteQuery]:
+    """
+    Parses `sqlite://path?watermark=col&query=SELECT ...`, or returns `None` if it isn't a SQLite URI.
+    Raises `ValueError` if the URI is invalid.
+    """
+    if not uri.startswith(PREFIX):
+        return None
+    path, _, params = uri[len(PREFIX):].partition("?")
+    query: tp.Optional[str] = None
+    watermark: tp.Optional[str] = None
+    while params:
+        if params.startswith("query="):
+            query = params[len("query="):].strip()
+            break
+        param, _, params = params.partition("&")
+        key, _, value = param.partition("=")
+        if key != "watermark":
+            raise ValueError(f"Unknown parameter '{key}' in '{uri}' (expected `watermark` or `query`)")
+        watermark = value
+    if not query:
+        raise ValueError(f"Missing `query` in '{uri}', eg `{PREFIX}{path}?query=SELECT * FROM trials`")
+    return SQLiteQuery(path, query, watermark)
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    if not Path(path).is_file():
+        raise FileNotFoundError(path)
+    # Read-only: we never want to create or modify the database
+    return sqlite3.connect(f"file:{urllib.request.pathname2url(os.path.abspath(path))}?mode=ro", uri=True)
+
+
+def _column_from_sql(values: tp.List[tp.Any], is_timestamp: tp.Optional[bool]) -> tp.Tuple[ColumnData, bool]:
+    """
+    SQLite columns don't have a type (the cursor doesn't tell us either), so we look at the values.
+    Returns the column, and whether it contains timestamps (converted to seconds). If `is_timestamp` is given,
+    only tries to convert the values to timestamps when it's `True` (to keep the type of previous rows)
+    """
+    types = set(map(type, values))
+    if types == {int}:
+        try:
+            return array.array("q", values), False
+        except OverflowError:
+            pass
+    elif types and types <= {int, float, type(None)} and types != {type(None)}:
+        # As in CSV files, missing numbers are NaNs
+        return array.array("d", [math.nan if v is None else v for v in values]), False
+    elif types == {str} and is_timestamp is not False and all(map(_TIMESTAMP_RE.match, values)):
+        return array.array("q", map(_parse_timestamp, values)), True
+    return [MISSING if v is None else v for v in values], False
+
+
+def _read(connection: sqlite3.Connection, sql: str, params: tp.Sequence[tp.Any], watermark: tp.Optional[str],
+          timestamps: tp.Dict[str, bool], row_offset: int) -> tp.Tuple[ColumnStore, tp.Any]:
+    """
+    Runs a query and converts its results to columns. Returns the columns, and the watermark of the last row
+    """
+    cursor = connection.execute(sql, params)
+    names = [d[0] for d in cursor.description]
+    fields: tp.List[tp.List[tp.Any]] = [[] for _ in names]
+    while True:
+        rows = cursor.fetchmany(_FETCH_SIZE)
+        if not rows:
+            break
+        for field, values in zip(fields, zip(*rows)):
+            field.extend(values)
+    cursor.close()
+    by_name = dict(zip(names, fields))
+    num_rows = len(fields[0]) if fields else 0
+    if "uid" in by_name:
+        uids = ["" if v is None else str(v) for v in by_name["uid"]]
+    else:
+        uids = [str(k) for k in range(row_offset, row_offset + num_rows)]
+    from_uids: tp.List[tp.Optional[str]] = [None] * num_rows
+    if "from_uid" in by_name:
+        from_uids = [None if v is None or v == "" else str(v) for v in by_name["from_uid"]]
+    columns: tp.Dict[str, ColumnData] = {}
+    for name, values in by_name.items():
+        if name in RESERVED_COLUMNS:
+            continue
+        columns[name], is_timestamp = _column_from_sql(values, timestamps.get(name))
+        if values:
+            timestamps.setdefault(name, is_timestamp)
+    last_watermark = by_name[watermark][-1] if watermark is not None and num_rows else None
+    return ColumnStore(uids, from_uids, columns), last_watermark
+
+
+def _select(query: SQLiteQuery, after_watermark: bool) -> str:
+    if query.watermark is None:
+        return query.query
+    column = _quote(query.watermark)
+    where = f" WHERE {column} > ?" if after_watermark else ""
+    return f"SELECT * FROM ({query.query}){where} ORDER BY {column}"
+
+
+def load(query: SQLiteQuery) -> Experiment:
+    """
+    Runs the query of a SQLite URI. Rows are ordered by the watermark column if there is one
+    """
+    timestamps: tp.Dict[str, bool] = {}
+    connection = _connect(query.path)
+    try:
+        store, _ = _read(connection, _select(query, after_watermark=False), [], query.watermark, timestamps, 0)
+    finally:
+        connection.close()
+    xp = Experiment._from_columns(store)
+    for name, is_timestamp in timestamps.items():
+        if is_timestamp:
+            xp.parameters_definition[name].type = ValueType.TIMESTAMP
+    return xp
+
+
+def get_version(path: str) -> tp.Tuple[tp.Any, ...]:
+    """
+    Changes whenever the database is modified. In WAL mode, changes are first written to the `-wal` file
+    """
+    version: tp.List[tp.Any] = []
+    for p in [path, path + "-wal"]:
+        try:
+            st = os.stat(p)
+        except FileNotFoundError:
+            continue
+        version.append((p, st.st_mtime_ns, st.st_size))
+    return tuple(version)
+
+
+class SQLiteTailReader(TailReader):
+    """
+    Reads the rows added to the results of a query, using its watermark column as the checkpoint
+    instead of a byte offset. Only new rows are read: updates of rows that were already read are not picked up.
+    """
+
+    def __init__(self, query: SQLiteQuery) -> None:
+        assert query.watermark is not None
+        super().__init__(Path(query.path))
+        self.query = query
+        self.last_watermark: tp.Any = None
+        self.num_rows = 0
+        self.timestamps: tp.Dict[str, bool] = {}
+
+    def read(self) -> tp.Optional[ColumnStore]:
+        st = os.stat(self.path)
+        file_id = (st.st_dev, st.st_ino)
+        if self._file_id is None:
+            self._file_id = file_id
+        elif file_id != self._file_id:
+            return None  # Database replaced
+        connection = _connect(self.query.path)
+        try:
+            if self.last_watermark is None:
+                sql, params = _select(self.query, after_watermark=False), []
+            else:
+                sql, params = _select(self.query, after_watermark=True), [self.last_watermark]
+            store, last_watermark = _read(connection, sql, params, self.query.watermark, self.timestamps, self.num_rows)
+        finally:
+            connection.close()
+        if last_watermark is not None:
+            self.last_watermark = last_watermark
+        self.num_rows += len(store)
+        return store
+
+    def start_after(self, xp: Experiment, st: os.stat_result) -> bool:
+        assert self.query.watermark is not None
+        store = xp._get_columns()
+        watermarks = store.columns.get(self.query.watermark)
+        # Timestamps were converted to seconds: we can't compare them with the original values anymore
+        if not len(store) or watermarks is None or xp.parameters_definition[self.query.watermark].type == ValueType.TIMESTAMP:
+            return False
+        last_watermark = watermarks[-1]
+        if last_watermark is MISSING or (column_typecode(watermarks) == "d" and math.isnan(last_watermark)):
+            return False
+        current = os.stat(self.path)
+        if (current.st_dev, current.st_ino) != (st.st_dev, st.st_ino):
+            return False
+        self._file_id = (st.st_dev, st.st_ino)
+        self.last_watermark = last_watermark
+        self.num_rows = len(store)
+        self.timestamps = {name: xp.parameters_definition[name].type == ValueType.TIMESTAMP for name in store.columns}
+        return True
+
+    def reset(self) -> None:
+        super().reset()
+        self.last_watermark = None
+        self.num_rows = 0
+        self.timestamps = {}
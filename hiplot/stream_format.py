@@ -0,0 +1,83 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Streaming format to transmit an experiment to the browser, so that it can be displayed before it's fully received
+(see `loadURIStreamFromWebServer` in `src/dataproviders/webserver.tsx`).
+
+The stream is newline-delimited JSON (NDJSON), every line is a JSON object:
+- First line: the `extra` data sent along with the experiment (eg the query for the webserver), with the `experiment`
+    without its datapoints and the total number of datapoints `num_rows`
+- Then chunks of datapoints `{"datapoints_compressed": ...}`, encoded as in `compress.py`. The first chunk is small,
+    so that the first lines are plotted quickly, and chunks then get bigger
+- Last line: `{"done": true}`, so that the browser can tell a complete stream from a truncated one
+
+Errors are sent instead as a single line `{"error": ...}`.
+"""
+
+import typing as tp
+
+from . import jsonenc
+from .columns import RESERVED_COLUMNS
+from .compress import encode_column, encode_from_uids, encode_uids, uncompress
+from .experiment import Experiment
+
+MIME_TYPE = "application/x-ndjson"
+FIRST_CHUNK_ROWS = 1000
+MAX_CHUNK_ROWS = 100000
+_CHUNK_GROWTH = 4
+
+
+def iter_lines(xp: Experiment, extra: tp.Optional[tp.Dict[str, tp.Any]] = None,
+               first_chunk_rows: int = FIRST_CHUNK_ROWS, max_chunk_rows: int = MAX_CHUNK_ROWS) -> tp.Iterator[bytes]:
+    """
+    Serializes an experiment in streaming format, one line at a time
+    """
+    store = xp._get_columns()
+    yield _dumps_line({
+        **(extra if extra is not None else {}),
+        "experiment": xp._settings_asdict(),
+        "num_rows": len(store),
+    })
+    columns = [c for c in store.columns if c not in RESERVED_COLUMNS]
+    start = 0
+    chunk_rows = first_chunk_rows
+    while start < len(store):
+        chunk = store.slice(start, start + chunk_rows)
+        yield _dumps_line({"datapoints_compressed": {
+            "version": 2,
+            "num_rows": len(chunk),
+            "columns": columns,
+            "uid": encode_uids(chunk.uids, row_offset=start),
+            "from_uid": encode_from_uids(chunk.uids, chunk.from_uids),
+            "values": [encode_column(chunk.columns[c]) for c in columns],
+        }})
+        start += len(chunk)
+        chunk_rows = min(chunk_rows * _CHUNK_GROWTH, max_chunk_rows)
+    yield _dumps_line({"done": True})
+
+
+def _dumps_line(obj: tp.Dict[str, tp.Any]) -> bytes:
+    return jsonenc.dumps(obj).encode("utf-8") + b"\n"
+
+
+def loads(data: bytes) -> tp.Dict[str, tp.Any]:
+    """
+    Reference decoder, mirrors `src/dataproviders/webserver.tsx`. Returns the `extra` data, with an `experiment` key
+    that contains the experiment with its datapoints as they would be sent in JSON.
+    """
+    lines = [jsonenc.loads(line) for line in data.splitlines() if line]
+    header: tp.Dict[str, tp.Any] = lines[0]
+    if "error" in header:  # Errors are sent as a single JSON object
+        return header
+    assert lines[-1] == {"done": True}, "Truncated stream"
+    num_rows = header.pop("num_rows")
+    datapoints = [
+        dp._asdict()
+        for chunk in lines[1:-1]
+        for dp in uncompress(chunk["datapoints_compressed"])
+    ]
+    assert len(datapoints) == num_rows, (len(datapoints), num_rows)
+    header["experiment"]["datapoints"] = datapoints
+    return header
@@ -3,11 +3,11 @@
 # LICENSE file in the root directory of this source tree.
 
 import typing as tp
-import json
 import uuid
 import warnings
 from pathlib import Path
 
+from . import jsonenc
 from .experiment import Experiment, _is_running_ipython
 
 
@@ -49,7 +49,7 @@ class ExperimentStreamlitComponent:
             warnings.warn(r"""Creating a HiPlot component with key=None will make refreshes slower.
 Please use `experiment.to_streamlit(..., key=\"some_unique_key\")`""")
             key = f"hiplot_autogen_{str(uuid.uuid4())}"
-        self._exp_json = json.dumps(experiment._asdict())
+        self._exp_json = jsonenc.dumps(experiment._asdict())
         self._key = key
         self._ret = ret
         self._js_default_ret = tuple(self.get_default_return_for(experiment, ret=r) for r in self.js_ret_spec)
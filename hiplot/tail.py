@@ -0,0 +1,242 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Live updates of experiments whose files are still being written (training logs, CSV files...).
+Instead of loading the whole file again, a :class:`TailReader` only parses what was appended since the last read,
+starting from a byte-offset checkpoint - or from the end of the file when the experiment was loaded (see :meth:`LiveExperiment.start_after`).
+"""
+
+import os
+import threading
+import time
+import typing as tp
+from abc import ABCMeta, abstractmethod
+from pathlib import Path
+
+from .columns import ColumnStore
+from .experiment import Experiment
+
+
+def _append_batch(batches: tp.List[ColumnStore], store: ColumnStore) -> int:
+    """
+    Appends datapoints to `batches`. A datapoint with the same uid as the last datapoint replaces it.
+    Returns the number of datapoints added.
+    """
+    if not len(store):
+        return 0
+    if batches and batches[-1].uids[-1] == store.uids[0]:  # Update of the last datapoint
+        last = batches.pop()
+        if len(last) > 1:
+            batches.append(last.slice(0, len(last) - 1))
+        batches.append(store)
+        return len(store) - 1
+    batches.append(store)
+    return len(store)
+
+
+class TailReader(metaclass=ABCMeta):
+    """
+    Reads the datapoints appended to a file, or any other source of datapoints that grows over time
+    (see :class:`LineTailReader` for text files)
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._file_id: tp.Optional[tp.Tuple[int, int]] = None
+
+    @abstractmethod
+    def read(self) -> tp.Optional[ColumnStore]:
+        """
+        Returns the datapoints appended since the last call (or since the beginning of the file),
+        or `None` if the file was replaced or truncated in the meantime (see :meth:`reset`).
+        A datapoint with the same uid as the last datapoint returned before replaces it.
+        """
+
+    def reset(self) -> None:
+        """
+        Starts reading the file again from the beginning
+        """
+        self._file_id = None
+
+    def start_after(self, xp: Experiment, st: os.stat_result) -> bool:
+        """
+        Continues after the content of the file when it had the status `st`, from which `xp` was loaded,
+        instead of reading it again. Returns `False` if this reader can't (it then starts from the beginning).
+        """
+        return False
+
+
+class LineTailReader(TailReader):
+    """
+    Reads the datapoints appended to a text file, starting from a byte-offset checkpoint. The file is read
+    by chunks of about `read_size` bytes, and only up to the last complete record: it might still be being written.
+    Subclasses implement :meth:`parse_lines`, and keep whatever parsing state they need between calls
+    (CSV header, column types...)
+    """
+
+    def __init__(self, path: Path, read_size: int = 16 << 20) -> None:
+        super().__init__(path)
+        self.offset = 0  # Checkpoint: bytes before this offset were parsed already
+        self.read_size = read_size
+
+    def read(self) -> tp.Optional[ColumnStore]:
+        st = os.stat(self.path)
+        file_id = (st.st_dev, st.st_ino)
+        if self._file_id is None:
+            self._file_id = file_id
+        elif file_id != self._file_id or st.st_size < self.offset:
+            return None
+        batches: tp.List[ColumnStore] = []
+        with self.path.open("rb") as f:
+            f.seek(self.offset)
+            remaining = st.st_size - self.offset
+            pending = b""
+            while remaining > 0:
+                chunk = f.read(min(self.read_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                data = pending + chunk if pending else chunk
+                end = self.record_end(data)
+                pending = data[end:]
+                if end:
+                    self.offset += end
+                    # Only split on `\n`: `str.splitlines` also splits on other characters (eg `\x0b`, `\u2028`)
+                    _append_batch(batches, self.parse_lines(data[:end - 1].decode("utf-8").split("\n")))
+        if not batches:
+            return ColumnStore([], [])
+        return batches[0] if len(batches) == 1 else ColumnStore.concat(batches)
+
+    def record_end(self, data: bytes) -> int:
+        """
+        Returns the position after the last complete record of `data` (0 if there is none)
+        """
+        return data.rfind(b"\n") + 1
+
+    def reset(self) -> None:
+        super().reset()
+        self.offset = 0
+
+    def start_after(self, xp: Experiment, st: os.stat_result) -> bool:
+        if not st.st_size:
+            return False
+        with self.path.open("rb") as f:
+            current = os.fstat(f.fileno())
+            if (current.st_dev, current.st_ino) != (st.st_dev, st.st_ino) or current.st_size < st.st_size:
+                return False
+            f.seek(st.st_size - 1)
+            if f.read(1) != b"\n":  # `xp` contains the last record, but it might not be complete
+                return False
+        if not self.restore(xp):
+            return False
+        self.offset = st.st_size
+        self._file_id = (st.st_dev, st.st_ino)
+        return True
+
+    def restore(self, xp: Experiment) -> bool:
+        """
+        Restores the parsing state after the datapoints of `xp`, loaded from the beginning of the file.
+        Returns `False` if that's not possible.
+        """
+        return False
+
+    @abstractmethod
+    def parse_lines(self, lines: tp.List[str]) -> ColumnStore:
+        """
+        Parses complete lines, without their `\n`
+        """
+
+
+class LiveExperiment:
+    """
+    Datapoints of an experiment that grows over time, kept up to date with a :class:`TailReader`.
+    Only the last `max_buffered_rows` datapoints are kept in memory to compute deltas for clients.
+
+    Clients identify what they already have with a watermark `<generation>:<num_rows>`, or just `<num_rows>`
+    after they loaded the experiment. The generation changes whenever the file is replaced, in which case
+    clients need to load the experiment again.
+    """
+
+    def __init__(self, reader: TailReader, max_buffered_rows: int = 100000) -> None:
+        self.reader = reader
+        self.max_buffered_rows = max_buffered_rows
+        self.generation = 0
+        self.num_rows = 0
+        self._batches: tp.List[ColumnStore] = []
+        self._first_buffered_row = 0
+        self._started = False
+        self._last_refresh: tp.Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def watermark(self) -> str:
+        return f"{self.generation}:{self.num_rows}"
+
+    def start_after(self, xp: Experiment, st: os.stat_result) -> bool:
+        """
+        Follows the file from the end of the content `xp` was loaded from, when the file had the status `st`
+        (see :meth:`TailReader.start_after`), instead of reading it again. Clients that loaded `xp` have the watermark `len(xp)`.
+        Returns `False` if it's not possible, or if we already started reading the file.
+        """
+        with self._lock:
+            if self._started or not self.reader.start_after(xp, st):
+                return False
+            self._started = True
+            columns = xp._get_columns()
+            self.num_rows = len(columns)
+            if self.num_rows:
+                # The last datapoint is always sent to clients, as it might be updated
+                self._batches = [columns.slice(self.num_rows - 1, self.num_rows)]
+                self._first_buffered_row = self.num_rows - 1
+            return True
+
+    def refresh(self, max_age: float = 0.0) -> None:
+        """
+        Reads the new datapoints, unless we already did less than `max_age` seconds ago -
+        so that clients polling the same experiment share the result of a single read.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._last_refresh is not None and now - self._last_refresh < max_age:
+                return
+            self._last_refresh = now
+            self._started = True
+            new_rows = self.reader.read()
+            if new_rows is None:
+                self.reader.reset()
+                self.generation += 1
+                self.num_rows = self._first_buffered_row = 0
+                self._batches = []
+                new_rows = self.reader.read()
+                assert new_rows is not None
+            self.num_rows += _append_batch(self._batches, new_rows)
+            # Only drop whole batches, and always keep the last one
+            while len(self._batches) > 1 and self.num_rows - self._first_buffered_row - len(self._batches[0]) >= self.max_buffered_rows:
+                self._first_buffered_row += len(self._batches.pop(0))
+
+    def is_up_to_date(self, watermark: str) -> bool:
+        with self._lock:
+            return watermark == self.watermark
+
+    def delta(self, watermark: str) -> tp.Tuple[tp.Optional[ColumnStore], str]:
+        """
+        Returns the datapoints a client with this watermark doesn't have (or `None` if it needs to load the
+        experiment again), and the new watermark. The last datapoint the client has is always included,
+        as it might have been updated.
+        """
+        generation, _, num_rows = watermark.rpartition(":")
+        with self._lock:
+            if generation not in ["", str(self.generation)] or not num_rows.isdigit() or int(num_rows) > self.num_rows:
+                return None, self.watermark
+            start = max(0, int(num_rows) - 1)
+            if start < self._first_buffered_row:
+                return None, self.watermark
+            parts: tp.List[ColumnStore] = []
+            row = self._first_buffered_row
+            for batch in self._batches:
+                if row + len(batch) > start:
+                    parts.append(batch.slice(max(0, start - row), len(batch)))
+                row += len(batch)
+            return ColumnStore.concat(parts), self.watermark
@@ -0,0 +1,68 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import asyncio
+import json
+import tempfile
+import typing as tp
+from pathlib import Path
+
+from . import stream_format
+from .asgi import create_asgi_app
+from .fetchers import get_fetchers
+
+
+def _request(app: tp.Any, path: str, query: str = "", headers: tp.Optional[tp.Dict[str, str]] = None,
+             disconnect_after: float = 0) -> tp.Tuple[int, tp.Dict[str, str], bytes]:
+    messages: tp.List[tp.Dict[str, tp.Any]] = []
+
+    async def receive() -> tp.Dict[str, tp.Any]:
+        if disconnect_after:
+            await asyncio.sleep(disconnect_after)
+            return {"type": "http.disconnect"}
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: tp.Dict[str, tp.Any]) -> None:
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [(k.encode(), v.encode()) for k, v in (headers or {}).items()],
+    }
+    asyncio.run(app(scope, receive, send))
+    start, *bodies = messages
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, b"".join(m["body"] for m in bodies)
+
+
+def test_asgi_app() -> None:
+    app = create_asgi_app(get_fetchers([]))
+    status, headers, body = _request(app, "/data", "uri=demo")
+    assert status == 200 and headers["content-type"] == "application/json"
+    assert json.loads(body)["experiment"]["datapoints"]
+    status, headers, body = _request(app, "/data", "uri=demo&format=stream")
+    assert headers["content-type"] == stream_format.MIME_TYPE and "content-length" not in headers
+    assert stream_format.loads(body)["experiment"]["datapoints"]
+    status, _, body = _request(app, "/data", "uri=not_an_experiment")
+    assert "error" in json.loads(body)
+    status, _, body = _request(app, "/")
+    assert status == 200 and b"hiplot" in body
+    assert _request(app, "/static/../server.py")[0] == 404
+    assert _request(app, "/something")[0] == 404
+
+
+def test_asgi_live_events() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = Path(tmpdir) / "xp.csv"
+        csv_path.write_text("a\n1\n2\n")
+        app = create_asgi_app(get_fetchers([]))
+        status, headers, body = _request(app, "/data_events", f"uri={csv_path}&watermark=0:2", disconnect_after=0.2)
+        assert status == 200 and headers["content-type"] == "text/event-stream"
+        assert body.startswith(b"retry: ") and b"event: update" not in body
+        status, _, body = _request(app, "/data_events", f"uri={csv_path}&watermark=1", disconnect_after=0.2)
+        assert b'event: update\ndata: {"watermark":"0:2"}' in body
+        assert _request(app, "/data_events", "uri=demo")[0] == 404
+        status, _, body = _request(app, "/data", f"uri={csv_path}&format=delta&watermark=2")
+        assert json.loads(body)["watermark"] == "0:2"
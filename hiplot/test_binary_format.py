@@ -0,0 +1,56 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import math
+import typing as tp
+
+import hiplot as hip
+from . import binary_format
+from .fetchers_demo import README_DEMOS
+from .test_compress import ROWS
+
+
+def _normalize(datapoints: tp.List[tp.Dict[str, tp.Any]], columns: tp.List[str]) -> tp.List[tp.Any]:
+    # Missing values are sent as `null`, and NaN != NaN
+    return [
+        (dp["uid"], dp["from_uid"], {
+            c: "nan" if isinstance(dp["values"].get(c), float) and math.isnan(dp["values"][c]) else dp["values"].get(c)
+            for c in columns
+        })
+        for dp in datapoints
+    ]
+
+
+def _check_roundtrip(xp: hip.Experiment) -> tp.Dict[str, tp.Any]:
+    expected = xp._asdict()
+    decoded = binary_format.loads(binary_format.dumps(xp, extra={"query": "test"}))
+    assert decoded["query"] == "test"
+    assert {k: v for k, v in decoded["experiment"].items() if k != "datapoints"} == \
+        {k: v for k, v in expected.items() if k != "datapoints"}
+    columns = list(xp._get_columns().columns)
+    assert _normalize(decoded["experiment"]["datapoints"], columns) == _normalize(expected["datapoints"], columns)
+    return decoded
+
+
+def test_binary_roundtrip() -> None:
+    xp = hip.Experiment.from_iterable(ROWS + [{"epoch": 2 ** 40}, {"epoch": 2 ** 60, "huge": 2 ** 70}])
+    for dp, next_dp in zip(xp.datapoints, xp.datapoints[1:]):
+        next_dp.from_uid = dp.uid
+    _check_roundtrip(xp)
+
+
+def test_binary_numeric_buffers() -> None:
+    xp = hip.Experiment.from_iterable(ROWS)
+    data = binary_format.dumps(xp)
+    assert data[:4] == binary_format.MAGIC
+    decoded = _check_roundtrip(xp)
+    values = decoded["experiment"]["datapoints"][3]["values"]
+    assert type(values["epoch"]) is int  # pylint: disable=unidiomatic-typecheck
+    assert type(values["loss"]) is float  # pylint: disable=unidiomatic-typecheck
+
+
+def test_binary_demos() -> None:
+    for v in README_DEMOS.values():
+        _check_roundtrip(v())
+
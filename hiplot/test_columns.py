@@ -0,0 +1,51 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import array
+import pickle
+
+from .columns import ColumnStore, MISSING, pack_column, compact_uid
+
+
+def test_pack_column() -> None:
+    assert isinstance(pack_column([1.0, 2.0, float("nan")]), array.array)
+    assert isinstance(pack_column([1, 2, 3]), array.array)
+    assert isinstance(pack_column([True, False]), list)
+    assert isinstance(pack_column([1, 2.0]), list)
+    assert isinstance(pack_column([1, MISSING]), list)
+    assert isinstance(pack_column([2 ** 70]), list)
+
+
+def test_from_rows_missing_values() -> None:
+    store = ColumnStore.from_rows([{"a": 1}, {"b": "x", "uid": "u"}, {"a": 2, "from_uid": "u"}])
+    assert store.uids == ["0", "u", "2"]
+    assert store.from_uids == [None, None, "u"]
+    assert list(store.iter_values()) == [{"a": 1}, {"b": "x"}, {"a": 2}]
+    assert store.values_at(1) == {"b": "x"}
+    assert store.column_values("a") == [1, None, 2]
+
+
+def test_concat() -> None:
+    s1 = ColumnStore.from_rows([{"a": 1.0}, {"a": 2.0}])
+    s2 = ColumnStore.from_rows([{"a": 3.0, "b": "x"}])
+    merged = ColumnStore.concat([s1, s2])
+    assert isinstance(merged.columns["a"], array.array)
+    assert list(merged.iter_values()) == [{"a": 1.0}, {"a": 2.0}, {"a": 3.0, "b": "x"}]
+
+
+def test_pickle() -> None:
+    store = pickle.loads(pickle.dumps(ColumnStore.from_rows([{"a": 1}, {"b": 2}])))
+    assert store.columns["a"][1] is MISSING
+
+
+def test_compact_uid() -> None:
+    assert [compact_uid(i) for i in [0, 9, 10, 61, 62, 62 * 62]] == ["0", "9", "a", "Z", "10", "100"]
+    assert len({compact_uid(i) for i in range(10000)}) == 10000
+
+
+def test_compact_uids() -> None:
+    store = ColumnStore.from_rows([{"uid": "parent"}, {"uid": "child", "from_uid": "parent"}, {"uid": "orphan", "from_uid": "x"}])
+    store.compact_uids(offset=62)
+    assert store.uids == ["10", "11", "12"]
+    assert store.from_uids == [None, "10", None]
@@ -0,0 +1,51 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import json
+import typing as tp
+
+import pytest
+
+import hiplot as hip
+from .compress import compress, uncompress
+from .fetchers_demo import README_DEMOS
+
+
+def _as_tuples(datapoints: tp.List[hip.Datapoint]) -> tp.List[tp.Any]:
+    return [(dp.uid, dp.from_uid, dp.values) for dp in datapoints]
+
+
+ROWS = [
+    {"epoch": i, "lr": 0.1, "opt": ["sgd", "adam"][i % 2], "loss": 1.0 / (i + 1), "flag": i < 50, "mixed": [1, True, 1.0][i % 3]}
+    for i in range(100)
+]
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_compress_roundtrip(version: int) -> None:
+    xp = hip.Experiment.from_iterable(ROWS)
+    for dp, next_dp in zip(xp.datapoints, xp.datapoints[1:]):
+        next_dp.from_uid = dp.uid
+    xp.datapoints[5].values["extra"] = "x"
+    decoded = uncompress(json.loads(json.dumps(compress(xp.datapoints, version=version))))
+    expected = [(dp.uid, dp.from_uid, {**dp.values, "extra": dp.values.get("extra")}) for dp in xp.datapoints]
+    assert _as_tuples(decoded) == expected
+    for (_, _, values), (_, _, expected_values) in zip(_as_tuples(decoded), expected):
+        assert [type(v) for v in values.values()] == [type(v) for v in expected_values.values()]
+
+
+def test_compress_v2_encodings() -> None:
+    payload = compress(hip.Experiment.from_iterable(ROWS).compact_uids()._get_columns())
+    encodings = {col: enc["enc"] for col, enc in zip(payload["columns"], payload["values"])}
+    assert payload["uid"] == {"enc": "compact_index"}
+    assert encodings == {"epoch": "delta", "lr": "rle", "opt": "dict", "loss": "raw", "flag": "rle", "mixed": "raw"}
+    assert payload["values"][0]["values"]["enc"] == "rle"
+
+
+def test_compress_v2_demos() -> None:
+    for k, v in README_DEMOS.items():
+        xp = v()
+        # Compare JSON since NaN != NaN
+        v1 = json.dumps(_as_tuples(uncompress(compress(xp.datapoints, version=1))))
+        assert json.dumps(_as_tuples(uncompress(compress(xp.datapoints)))) == v1, k
@@ -0,0 +1,69 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import json
+import os
+import sys
+import tempfile
+import typing as tp
+import unittest.mock
+from pathlib import Path
+
+import hiplot as hip
+from .disk_cache import DiskCache, hiplot_cache_main
+from .fetchers import get_fetchers
+from .server import create_app
+
+
+def test_disk_cache() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = DiskCache(tmpdir, max_bytes=1 << 20)
+        xp = hip.Experiment.from_iterable([{"a": i, "b": str(i)} for i in range(1000)])
+        key = DiskCache.key("xp.csv", "fetchers", ("xp.csv", 1, 2))
+        assert key != DiskCache.key("xp.csv", "fetchers", ("xp.csv", 1, 3))
+        assert cache.get(key) is None
+        assert cache.put(key, "xp.csv", xp)
+        loaded = cache.get(key)
+        assert loaded is not None and loaded.datapoints[999].values == {"a": 999, "b": "999"}
+        assert not cache.put("unserializable", "xp2", hip.Experiment.from_iterable([{"a": object()}]))
+
+        # Least recently used entries are removed first, without reading the other entries
+        with unittest.mock.patch.object(DiskCache, "_scan", side_effect=AssertionError("The cache directory is only scanned once")):
+            for i in range(3):
+                cache.put(f"key{i}", f"xp{i}.csv", xp)
+            assert cache.get(key) is not None
+            assert [e.uri for e in cache.entries()] == ["xp0.csv", "xp1.csv", "xp2.csv", "xp.csv"]
+            assert [e.uri for e in cache.prune(max_bytes=cache.entries()[0].nbytes * 2)] == ["xp0.csv", "xp1.csv"]
+            assert cache.stats()["bytes"] == sum(e.nbytes for e in cache.entries())
+        # Entries are ordered by their last use when the cache is opened again
+        os.utime(Path(tmpdir) / "key2.hips", (0, 0))
+        reopened = DiskCache(tmpdir)
+        assert [e.uri for e in reopened.entries()] == ["xp2.csv", "xp.csv"]
+        assert [e.uri for e in reopened.prune(max_age=3600)] == ["xp2.csv"]
+        assert cache.get("key2") is None
+
+        # Corrupted entries are ignored
+        (Path(tmpdir) / f"{key}.hips").write_bytes(b"HIPS")
+        assert cache.get(key) is None
+        assert (cache.hits, cache.misses, cache.errors) == (2, 3, 2)
+
+
+def test_server_disk_cache() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "xp.csv"
+        path.write_text("a,b\n1,2\n3,4\n")
+        for restart in range(2):
+            client = create_app(get_fetchers([]), disk_cache=DiskCache(Path(tmpdir) / "cache")).test_client()
+            r = client.get("/data", query_string={"uri": str(path)})
+            assert len(json.loads(r.data)["experiment"]["datapoints"]) == 2
+            stats = json.loads(client.get("/cache_stats").data)["disk"]
+            assert (stats["entries"], stats["hits"]) == (1, restart)
+        # Changes of the file invalidate the entry
+        path.write_text("a,b\n1,2\n3,4\n5,6\n")
+        r = client.get("/data", query_string={"uri": str(path)})
+        assert len(json.loads(r.data)["experiment"]["datapoints"]) == 3
+
+        with unittest.mock.patch.object(sys, "argv", ["hiplot-cache", str(Path(tmpdir) / "cache"), "clear"]):
+            assert hiplot_cache_main() == 0
+        assert not DiskCache(Path(tmpdir) / "cache").entries()
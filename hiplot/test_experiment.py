@@ -196,3 +196,61 @@ def test_to_streamlit() -> None:
         assert filtered_uids
         assert isinstance(selected_uids[0], str)
         assert isinstance(filtered_uids[0], str)
+
+
+def test_columnar_matches_datapoints() -> None:
+    rows = [{"uid": 1, "k": "v", "x": 1.0}, {"uid": 2, "from_uid": "1", "k": "vk", "k2": None}]
+    xp = hip.Experiment.from_iterable(rows)
+    xp_rows = hip.Experiment(datapoints=[hip.Datapoint(uid=dp.uid, from_uid=dp.from_uid, values=dp.values)
+                                         for dp in hip.Experiment.from_iterable(rows).datapoints])
+    assert xp._columns is not None
+    assert xp._asdict() == xp_rows._asdict()
+    xp._compress = xp_rows._compress = True
+    assert xp._asdict() == xp_rows._asdict()
+    assert xp.datapoints[1].values == {"k": "vk", "k2": None}
+    assert xp._columns is None
+
+
+def test_columnar_validation() -> None:
+    xp = hip.Experiment.from_iterable([{"uid": 1, "from_uid": "2"}, {"uid": 2, "from_uid": "1"}])
+    with pytest.raises(hip.ExperimentValidationCircularRef):
+        xp.validate()
+    xp = hip.Experiment.from_iterable([{"uid": 1, "from_uid": "3"}])
+    with pytest.raises(hip.ExperimentValidationMissingParent):
+        xp.validate()
+    xp.remove_missing_parents().validate()
+    with pytest.raises(hip.ExperimentValidationError):
+        hip.Experiment.from_iterable([]).validate()
+
+
+def test_from_dataframe_columns() -> None:
+    df = pd.DataFrame(data={'uid': [1, 2, 3], 'from_uid': [None, 1, 2], 'f': [1.5, None, 2.0], 'i': [1, 2, 3], 's': ["a", "b", "c"]})
+    df_before = df.copy()
+    xp = hip.Experiment.from_dataframe(df)
+    pd.testing.assert_frame_equal(df, df_before)
+    assert xp._columns is not None
+    assert xp._columns.columns['i'].typecode == 'q'  # type: ignore
+    assert xp._columns.columns['f'].typecode == 'd'  # type: ignore
+    xp.validate()
+    dps = xp.datapoints
+    assert [dp.uid for dp in dps] == ["1.0", "2.0", "3.0"]
+    assert [dp.from_uid for dp in dps] == [None, "1.0", "2.0"]
+    assert dps[0].values == {"f": 1.5, "i": 1, "s": "a"}
+    assert isinstance(dps[0].values["i"], int)
+
+
+def test_compact_uids() -> None:
+    xp = hip.Experiment(datapoints=[hip.Datapoint(values={"a": 1}), hip.Datapoint(values={"a": 2})])
+    xp.datapoints[1].from_uid = xp.datapoints[0].uid
+    xp.compact_uids().validate()
+    assert [(dp.uid, dp.from_uid) for dp in xp.datapoints] == [("0", None), ("1", "0")]
+    merged = hip.Experiment.merge({"xp1": xp, "xp2": hip.Experiment.from_iterable([{"uid": "a"}, {"from_uid": "a"}])}, compact_uids=True)
+    merged.validate()
+    assert [(dp.uid, dp.from_uid, dp.values["exp"]) for dp in merged.datapoints] == [
+        ("0", None, "xp1"), ("1", "0", "xp1"), ("2", None, "xp2"), ("3", "2", "xp2")]
+
+
+def test_datapoint_slots() -> None:
+    dp = hip.Datapoint(uid="1", values={"a": 1})
+    assert not hasattr(dp, "__dict__")
+    assert dp._asdict() == {"uid": "1", "values": {"a": 1}, "from_uid": None}
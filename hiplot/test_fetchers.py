@@ -3,13 +3,22 @@
 # LICENSE file in the root directory of this source tree.
 
 from pathlib import Path
+import bz2
+import gzip
+import io
 import json
+import lzma
 import tempfile
 import shutil
+import time
+import typing as tp
 import pytest
 from . import experiment as exp
-from .fetchers import load_demo, load_csv, load_json, MultipleFetcher, get_fetchers, load_xps_with_fetchers
+from . import json_records
+from .fetchers import (load_demo, load_csv, load_json, load_jsonl, FairseqLoader, FetcherRegistry, JSONLoader, MultipleFetcher, NoFetcherFound, Wav2letterLoader,
+                       get_fetchers, get_tail_reader, load_xps_with_fetchers, load_xp_with_fetchers, uri_patterns)
 from .fetchers_demo import README_DEMOS
+from .tail import LiveExperiment
 
 
 def test_fetcher_demo() -> None:
@@ -50,6 +59,128 @@ def test_fetcher_json_doesnt_apply() -> None:
         load_json("something_else")
 
 
+def test_iter_json_array(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(json_records, "_READ_SIZE", 3)  # Elements span several reads
+    records = [{"id": i, "metric": i / 3, "name": "x" * i, "nested": [i, {"a": None}]} for i in range(50)]
+    assert list(json_records.iter_json_array(io.StringIO(json.dumps(records, indent=2)))) == records
+    assert list(json_records.iter_json_array(io.StringIO(" [ 1, 123456 ,2.5e3]"))) == [1, 123456, 2500.0]
+    assert list(json_records.iter_json_array(io.StringIO("[]"))) == []
+    assert list(json_records.iter_json_array(io.StringIO('{"a": 1}'))) == [{"a": 1}]
+    with pytest.raises(json.JSONDecodeError):
+        list(json_records.iter_json_array(io.StringIO("[1, 2")))
+    with pytest.raises(json.JSONDecodeError):
+        list(json_records.iter_json_array(io.StringIO("[1 2]")))
+
+
+def test_fetcher_json_nevergrad(tmp_path: Path) -> None:
+    path = tmp_path / "xp.json"
+    path.write_text(json.dumps([{"job_id": i, "kwargs": {"lr": i}, "results": {"scores": {"loss": 1 / (i + 1)}}} for i in range(25000)]))
+    xp = JSONLoader(incremental_min_bytes=0)(str(path))
+    assert len(xp.datapoints) == 25000
+    assert xp.datapoints[1].values == {"id": 1, "lr": "1", "loss": 0.5}
+    assert xp.datapoints[20000].uid == "20000"
+
+
+def test_fetcher_jsonl(tmp_path: Path) -> None:
+    path = tmp_path / "xp.jsonl"
+    path.write_text("\n".join(json.dumps({"epoch": i, "loss": 1 / (i + 1)}) for i in range(10)) + "\n\n")
+    xp = load_jsonl(str(path))
+    xp.validate()
+    assert [dp.values["epoch"] for dp in xp.datapoints] == list(range(10))
+    assert xp._get_columns().columns["loss"].typecode == "d"  # type: ignore
+    with pytest.raises(exp.ExperimentFetcherDoesntApply):
+        load_jsonl(str(tmp_path / "missing.ndjson"))
+    with path.open("a") as f:
+        f.write('{"epoch": 10, "opt": "sgd"}\nnot json\n')
+    with pytest.raises(ValueError, match="line 13"):
+        load_jsonl(str(path))
+
+    fetchers = get_fetchers([])
+    path.write_text('{"epoch": 0}\n')
+    reader = get_tail_reader(fetchers, str(path))
+    assert reader is not None
+    live = LiveExperiment(reader)
+    live.refresh()
+    with path.open("a") as f:
+        f.write('{"epoch": 1, "loss": 0.5}\n{"epoch": 2')
+    live.refresh()
+    delta, watermark = live.delta("1")
+    assert delta is not None and delta.uids == ["0", "1"] and watermark == "0:2"
+
+
+@pytest.mark.parametrize("compression,opener", [("gz", gzip.open), ("bz2", bz2.open), ("xz", lzma.open)])
+def test_fetcher_compressed(tmp_path: Path, compression: str, opener: tp.Callable[..., tp.Any]) -> None:
+    fetchers = get_fetchers([])
+    with opener(tmp_path / f"xp.csv.{compression}", "wt") as f:
+        f.write("uid,lr,opt\na,0.1,sgd\nb,0.01,adam\n")
+    with opener(tmp_path / f"xp.json.{compression}", "wt") as f:
+        json.dump([{"lr": 0.1}, {"lr": 0.01, "opt": "adam"}], f)
+    with opener(tmp_path / f"xp.jsonl.{compression}", "wt") as f:
+        f.write('{"lr": 0.1}\n{"lr": 0.01, "opt": "adam"}\n')
+    for name in ["xp.csv", "xp.json", "xp.jsonl"]:
+        uri = str(tmp_path / f"{name}.{compression}")
+        xp = load_xp_with_fetchers(fetchers, uri)
+        xp.validate()
+        assert [dp.values["lr"] for dp in xp.datapoints] == [0.1, 0.01], name
+        assert get_tail_reader(fetchers, uri) is None  # Can't follow compressed files
+    (tmp_path / "fairseq").mkdir()
+    with opener(tmp_path / "fairseq" / f"train.log.{compression}", "wt") as f:
+        f.write("Namespace(lr=[0.25], arch='lstm')\n")
+        f.write('valid | {"epoch": 1, "valid_loss": "0.9"}\nvalid | {"epoch": 2, "valid_loss": "0.7"}\n')
+    xp = load_xp_with_fetchers(fetchers, f"fairseq://{tmp_path / 'fairseq'}")
+    assert [dp.values["valid_loss"] for dp in xp.datapoints] == ["0.9", "0.7"]
+    assert xp.datapoints[0].values["arch"] == "lstm"
+    assert get_tail_reader(fetchers, f"fairseq://{tmp_path / 'fairseq'}") is None
+
+
+def test_fetcher_fairseq_resume(tmp_path: Path) -> None:
+    log = tmp_path / "train.log"
+    log.write_text("2020-03-08 16:48:16 | INFO | Namespace(lr=[0.25], arch='lstm')\n"
+                   "| epoch 001:    100 / 4431 loss=12.833, ppl=7297.97, wps=8915\n"
+                   "| epoch 001 | loss 8.4 | ppl 300.0\n| epoch 001 | valid on 'valid' subset | loss 7.6\n| epoch 002 | loss 6.2")
+    loader = FairseqLoader()
+    xp = loader(f"fairseq://{tmp_path}")
+    assert [dp.values["loss"] for dp in xp.datapoints] == [8.4, 6.2]
+    assert xp.datapoints[0].values["valid_loss"] == 7.6
+    assert loader._states[log].offset == log.stat().st_size - len("| epoch 002 | loss 6.2")
+    with log.open("a") as f:
+        f.write(" | ppl 100.0 |\n| epoch 002 | valid on 'valid' subset |  | loss 5.9 |\n")  # Empty segments are skipped
+    xp = loader(f"fairseq://{tmp_path}")
+    assert [dp.values for dp in xp.datapoints] == [dp.values for dp in FairseqLoader()(f"fairseq://{tmp_path}").datapoints]
+    assert xp.datapoints[1].values == {"lr": [0.25], "arch": "lstm", "epoch": 2, "loss": 6.2, "ppl": 100.0, "valid_loss": 5.9}
+    assert loader._states[log].offset == log.stat().st_size
+    log.write_text('valid | {"epoch": 1, "valid_loss": "0.9"}\n')  # Smaller: parsed again
+    assert [dp.values for dp in loader(f"fairseq://{tmp_path}").datapoints] == [{"epoch": 1, "valid_loss": "0.9"}]
+
+
+def test_fetcher_wav2letter(tmp_path: Path) -> None:
+    for i in range(20):
+        (tmp_path / f"{i:03d}_perf").write_text(f"# date\tloss\tWER\n2019-09-30\t{i}.5\t{i}\n2019-10-01\t{i}.25\tnan\n")
+    loader = Wav2letterLoader(max_workers=4)
+    parsed: tp.List[str] = []
+    parse_metrics = loader._parse_metrics
+
+    def _parse_metrics(file: Path) -> tp.List[tp.Dict[str, tp.Any]]:
+        parsed.append(file.name)
+        return parse_metrics(file)
+    loader._parse_metrics = _parse_metrics  # type: ignore
+
+    xp = loader(f"w2l://{tmp_path}")
+    xp.validate()
+    assert len(xp.datapoints) == 40 and len(parsed) == 20
+    assert xp.datapoints[2].values == {"perf_date": "2019-09-30", "perf_loss": 1.5, "perf_WER": 1.0}
+    assert [dp.from_uid for dp in xp.datapoints[1:]] == [dp.uid for dp in xp.datapoints[:-1]]
+
+    parsed.clear()
+    xp.datapoints[0].values["perf_loss"] = 42
+    (tmp_path / "007_perf").write_text("# date\tloss\tWER\n2019-09-30\t0.1\t3\n")
+    xp = loader(f"w2l://{tmp_path}")
+    assert parsed == ["007_perf"] and len(xp.datapoints) == 39
+    assert xp.datapoints[0].values["perf_loss"] == 0.5
+    assert xp.datapoints[14].values["perf_loss"] == 0.1
+    assert xp.datapoints[15].from_uid == xp.datapoints[14].uid
+
+
 def test_demo_from_readme() -> None:
     for k, v in README_DEMOS.items():
         print(k)
@@ -76,3 +207,90 @@ demo
 """
     fetchers = get_fetchers([])
     assert len(load_xps_with_fetchers(fetchers, test_uri)) == 3
+
+
+def test_fetcher_csv_typed() -> None:
+    xp = load_csv(str(Path(Path(__file__).parent.parent, ".circleci", "nutrients.csv")))
+    values = xp.datapoints[0].values
+    assert all(not isinstance(v, str) for k, v in values.items() if k not in ["name", "group"]), values
+
+
+def _slow_fetcher(uri: str) -> exp.Experiment:
+    if not uri.startswith("slow://"):
+        raise exp.ExperimentFetcherDoesntApply()
+    time.sleep(0.2)
+    return exp.Experiment.from_iterable([{"id": uri}])
+
+
+def test_fetcher_parallel_load() -> None:
+    fetchers: tp.List[exp.ExperimentFetcher] = [_slow_fetcher]
+    uris = [f"slow://{i}" for i in range(10)]
+    start = time.time()
+    xps = load_xps_with_fetchers(fetchers, "\n".join(uris))
+    assert time.time() - start < 1.0
+    assert [xp.datapoints[0].values["id"] for xp in xps] == uris
+
+    xp = MultipleFetcher(fetchers)("multi://" + json.dumps(uris))
+    assert [dp.values["id"] for dp in xp.datapoints] == uris
+
+
+def test_fetcher_load_errors() -> None:
+    fetchers: tp.List[exp.ExperimentFetcher] = [_slow_fetcher]
+    fetchers.append(MultipleFetcher(fetchers))
+    uri = "slow://0\nnot_an_experiment\nslow://2\n" + 'multi://["slow://3", "not_an_experiment_either"]'
+    with pytest.raises(NoFetcherFound):
+        load_xp_with_fetchers(fetchers, uri)
+    errors: tp.Dict[str, str] = {}
+    xp = load_xp_with_fetchers(fetchers, uri, errors=errors)
+    assert sorted(errors) == ["not_an_experiment", "not_an_experiment_either"]
+    assert [dp.uid for dp in xp.datapoints] == ["0_0", "2_0", "3_slow://3_0"]
+    with pytest.raises(NoFetcherFound):
+        load_xp_with_fetchers(fetchers, "not_an_experiment\nnot_an_experiment_either", errors={})
+
+
+def test_fetcher_registry() -> None:
+    calls: tp.List[str] = []
+
+    @uri_patterns(prefixes=["a://"])
+    def fetch_a(uri: str) -> exp.Experiment:
+        calls.append(f"a {uri}")
+        return exp.Experiment.from_iterable([{"a": 1}])
+
+    @uri_patterns(suffixes=[".b", ".tar.b"])
+    def fetch_b(uri: str) -> exp.Experiment:
+        calls.append(f"b {uri}")
+        raise exp.ExperimentFetcherDoesntApply()
+
+    def fetch_any(uri: str) -> exp.Experiment:
+        calls.append(f"any {uri}")
+        if uri == "a://not_a":
+            return exp.Experiment.from_iterable([{"any": 1}])
+        raise exp.ExperimentFetcherDoesntApply()
+
+    fetchers = FetcherRegistry([fetch_any, fetch_b])
+    fetchers.append(fetch_a)
+    assert fetchers.candidates("a://x") == [fetch_any, fetch_a]
+    assert fetchers.candidates("x.tar.b") == [fetch_any, fetch_b]
+    assert fetchers.candidates("c://x.b\nd://x") == [fetch_any, fetch_b]
+    # Fetchers are still called in order
+    assert load_xp_with_fetchers(fetchers, "a://not_a").datapoints[0].values == {"any": 1}
+    assert calls == ["any a://not_a"]
+    errors: tp.Dict[str, str] = {}
+    assert len(load_xp_with_fetchers(fetchers, "a://x\nx.b\na://y", errors=errors).datapoints) == 2
+    assert list(errors) == ["x.b"]
+    assert sorted(calls[1:]) == ["a a://x", "a a://y", "any a://x", "any a://y", "any x.b", "b x.b"]
+    stats = {s["fetcher"].split(".")[-1]: s for s in fetchers.stats()}
+    assert (stats["fetch_a"]["calls"], stats["fetch_a"]["loaded"]) == (2, 2)
+    assert (stats["fetch_b"]["calls"], stats["fetch_b"]["doesnt_apply"]) == (1, 1)
+    assert stats["fetch_any"]["calls"] == 4
+
+
+def test_default_fetchers_registry() -> None:
+    fetchers = get_fetchers([])
+    assert isinstance(fetchers, FetcherRegistry)
+    assert [type(f).__name__ for f in fetchers.candidates("fairseq://path")] == ["FairseqLoader"]
+    assert fetchers.candidates("xp.csv") == [load_csv]
+    assert fetchers.candidates("something_else") == []
+    xp = load_xp_with_fetchers(fetchers, 'multi://["demo", "json://[{\\"a\\": 1}]"]')
+    assert len(xp.datapoints) == len(load_demo("demo").datapoints) + 1
+    assert [s["loaded"] for s in fetchers.stats()] == [1, 1, 1]
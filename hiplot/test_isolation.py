@@ -0,0 +1,113 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import os
+import sys
+import threading
+import time
+import typing as tp
+import unittest.mock
+
+import pytest
+
+from . import experiment as exp
+from .fetchers import get_fetchers, load_xp_with_fetchers
+from .isolation import _SHM_PREFIX, FetcherProcessError, IsolatedFetcher, _WorkerPool, _export_experiment, _import_experiment
+
+
+class _SlowPickle:
+    def __reduce__(self) -> tp.Tuple[tp.Any, ...]:
+        time.sleep(30)
+        return (_SlowPickle, ())
+
+
+def isolation_test_fetcher(uri: str) -> exp.Experiment:
+    PREFIX = "isolated://"
+    if not uri.startswith(PREFIX):
+        raise exp.ExperimentFetcherDoesntApply()
+    command = uri[len(PREFIX):]
+    if command == "sleep":
+        time.sleep(30)
+    elif command == "allocate":
+        _ = bytearray(4 << 30)
+    elif command == "fail":
+        raise ValueError("Invalid experiment")
+    elif command == "exit":
+        sys.exit(3)
+    xp = exp.Experiment.from_iterable([{"a": i, "b": i * 0.5, "c": f"v{i}"} for i in range(1000)] + [{"a": 1000}])
+    if command == "slow_export":  # Hangs after numeric columns are written to shared memory
+        xp.slow = _SlowPickle()  # type: ignore
+    xp.parameters_definition["a"].type = exp.ValueType.NUMERIC_LOG
+    xp.colorby = "b"
+    return xp
+
+
+isolation_test_fetcher.uri_prefixes = ("isolated://",)  # type: ignore
+
+_SPEC = f"{__name__}.isolation_test_fetcher"
+
+
+def test_isolated_fetcher() -> None:
+    fetcher = IsolatedFetcher(_SPEC)
+    assert fetcher.uri_prefixes == ("isolated://",)  # type: ignore
+    xp = fetcher("isolated://xp")
+    expected = isolation_test_fetcher("isolated://xp")
+    assert xp._asdict() == expected._asdict()
+    assert xp.parameters_definition["a"].type == exp.ValueType.NUMERIC_LOG
+    assert xp.datapoints[-1].values == {"a": 1000}
+    with pytest.raises(exp.ExperimentFetcherDoesntApply):
+        fetcher("something_else")
+    with pytest.raises(ValueError, match="Invalid experiment"):
+        fetcher("isolated://fail")
+
+    fetchers = get_fetchers([_SPEC], isolate=True)
+    assert len(load_xp_with_fetchers(fetchers, "isolated://xp\ndemo").datapoints) == 1001 + len(load_xp_with_fetchers(fetchers, "demo").datapoints)
+
+
+def test_export_experiment_without_shared_memory() -> None:
+    expected = isolation_test_fetcher("isolated://xp")
+    # Python < 3.8
+    with unittest.mock.patch.dict(sys.modules, {"multiprocessing.shared_memory": None}):
+        xp = _import_experiment(_export_experiment(isolation_test_fetcher("isolated://xp"), f"{_SHM_PREFIX}test"))
+    assert xp._asdict() == expected._asdict()
+
+
+def test_isolated_fetcher_limits() -> None:
+    fetcher = IsolatedFetcher(_SPEC, timeout=1.0, max_memory_mb=1024)
+    start = time.time()
+    with pytest.raises(FetcherProcessError, match="more than 1.0s"):
+        fetcher("isolated://sleep")
+    assert time.time() - start < 5
+    with pytest.raises(FetcherProcessError, match="exit code 3"):
+        fetcher("isolated://exit")
+    if sys.platform.startswith("linux"):
+        with pytest.raises(FetcherProcessError, match="out of memory"):
+            fetcher("isolated://allocate")
+    # New worker processes replace the ones that failed
+    assert len(fetcher("isolated://xp").datapoints) == 1001
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="Shared memory segments are not listed in /dev/shm")
+def test_isolated_fetcher_timeout_unlinks_shared_memory() -> None:
+    def segments() -> tp.Set[str]:
+        return {f for f in os.listdir("/dev/shm") if f.startswith(_SHM_PREFIX)}
+
+    before = segments()
+    with pytest.raises(FetcherProcessError, match="more than 2.0s"):
+        IsolatedFetcher(_SPEC, timeout=2.0)("isolated://slow_export")
+    assert segments() == before
+
+
+def test_isolated_fetcher_queue_timeout() -> None:
+    pool = _WorkerPool(1)
+    busy = threading.Thread(target=lambda: pytest.raises(FetcherProcessError, pool.run, _SPEC, "isolated://sleep", 3.0, None))
+    busy.start()
+    time.sleep(0.5)
+    start = time.time()
+    with pytest.raises(FetcherProcessError, match="no worker process available"):
+        pool.run(_SPEC, "isolated://xp", 0.5, None)
+    assert time.time() - start < 2
+    busy.join()
+    assert len(pool.run(_SPEC, "isolated://xp", None, None).datapoints) == 1001
+    pool.shutdown()
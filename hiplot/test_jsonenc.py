@@ -0,0 +1,65 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import json
+import math
+import sys
+import typing as tp
+import unittest.mock
+
+import pytest
+
+from . import jsonenc
+from .experiment import Experiment
+from .fetchers_demo import README_DEMOS
+
+
+def test_jsonenc_special_floats() -> None:
+    obj = {
+        "a": [1.0, math.nan, math.inf, -math.inf, "NaN"],
+        "b": {"c": math.nan, "d": [{"e": -math.inf}]},
+        "rows": [{"x": float(i), "y": str(i)} for i in range(1000)] + [{"x": math.nan}],
+    }
+    data = jsonenc.dumps(obj)
+    json.loads(data, parse_constant=lambda c: 1 / 0)  # Strict JSON
+    decoded = jsonenc.loads(data)
+    assert json.dumps(decoded) == json.dumps(obj)
+
+
+def test_jsonenc_no_special_floats() -> None:
+    obj = {"a": [1, 2.5, None, True, "x"]}
+    assert jsonenc.dumps(obj) == json.dumps(obj, separators=(",", ":"))
+
+
+def test_jsonenc_demos() -> None:
+    for k, v in README_DEMOS.items():
+        xp = v()
+        xp._compress = k.endswith("big")
+        assert json.dumps(jsonenc.loads(jsonenc.dumps(xp._asdict()))) == json.dumps(xp._asdict()), k
+
+
+def test_jsonenc_numpy_special_floats() -> None:
+    np = pytest.importorskip("numpy")
+    xp = Experiment.from_iterable([{"a": np.float64("nan"), "b": 1}, {"a": np.float64("inf"), "b": np.float64("-inf")}])
+    decoded = jsonenc.loads(jsonenc.dumps(xp._asdict()))
+    assert json.dumps(decoded) == json.dumps(xp._asdict())
+    assert math.isinf(jsonenc.loads(jsonenc.dumps([np.float64("inf")]))[0])
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_jsonenc_sentinel_strings(use_orjson: bool) -> None:
+    if use_orjson:
+        pytest.importorskip("orjson")
+    obj: tp.Dict[str, tp.Any] = {
+        "a": [jsonenc.NAN, "__hip_", "__hip_x", '"__hip_NaN__', math.nan, 1.5],
+        "__hip_Inf__": {"b": jsonenc.NEG_INFINITY, "c": math.inf},
+        "d": jsonenc.INFINITY,
+        "e": 2 ** 70,
+    }
+    with unittest.mock.patch.dict(sys.modules, {} if use_orjson else {"orjson": None}):
+        for o in [obj, {k: v for k, v in obj.items() if k != "a"}, {"a": ["__hip_x", 1.0]}]:
+            data = jsonenc.dumps(o)
+            json.loads(data, parse_constant=lambda c: 1 / 0)  # Strict JSON
+            assert json.dumps(jsonenc.loads(data)) == json.dumps(o)
+        assert jsonenc.loads(jsonenc.dumps(["__hip_NaN__"])) == ["__hip_NaN__"]
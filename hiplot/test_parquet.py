@@ -0,0 +1,79 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import array
+import math
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from . import experiment as exp
+from . import parquet
+from .fetchers import get_fetchers, get_uri_version, load_parquet, load_xp_with_fetchers
+
+pa = pytest.importorskip("pyarrow")
+
+
+def _write_table(path: Path) -> None:
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    table = pa.table({
+        "uid": [f"r{i}" for i in range(100)],
+        "from_uid": [None] + [f"r{i}" for i in range(99)],
+        "lr": [10 ** -(i % 5) for i in range(100)],
+        "epoch": pa.array(range(100), pa.int32()),
+        "opt": pa.array(["adam" if i % 2 else "sgd" for i in range(100)]).dictionary_encode(),
+        "acc": [None if i == 3 else i / 100 for i in range(100)],
+        "note": [None if i == 4 else f"n{i}" for i in range(100)],
+        "date": pa.array([datetime(2020, 1, 1, tzinfo=timezone.utc)] * 100, pa.timestamp("ms", tz="UTC")),
+    })
+    if path.suffix == ".feather":
+        pyarrow.feather.write_feather(table, str(path))
+    else:
+        pyarrow.parquet.write_table(table, str(path), row_group_size=10)
+
+
+def test_parse_uri() -> None:
+    assert parquet.parse_uri("xp.csv") is None
+    assert parquet.parse_uri("xp.parquet") == parquet.ArrowQuery("xp.parquet", "parquet", None, [])
+    assert parquet.parse_uri("a/xp.feather?columns=a,b&where=a<1&where=b%20==%20x") == parquet.ArrowQuery(
+        "a/xp.feather", "feather", ["a", "b"], [("a", "<", "1"), ("b", "==", "x")])
+    with pytest.raises(ValueError):
+        parquet.parse_uri("xp.parquet?where=a")
+    with pytest.raises(ValueError):
+        parquet.parse_uri("xp.parquet?sort=a")
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_fetcher_parquet(tmp_path: Path, suffix: str) -> None:
+    path = tmp_path / f"xp{suffix}"
+    _write_table(path)
+    xp = load_parquet(str(path))
+    xp.validate()
+    assert len(xp.datapoints) == 100
+    assert xp.datapoints[5].uid == "r5" and xp.datapoints[5].from_uid == "r4"
+    assert xp.datapoints[5].values == {"lr": 1.0, "epoch": 5, "opt": "adam", "acc": 0.05, "note": "n5", "date": 1577836800}
+    store = xp._get_columns()
+    assert isinstance(store.columns["epoch"], array.array) and store.columns["epoch"].typecode == "q"
+    assert math.isnan(store.columns["acc"][3])
+    assert "note" not in xp.datapoints[4].values
+    assert xp.parameters_definition["date"].type == exp.ValueType.TIMESTAMP
+
+    xp = load_parquet(f"{path}?columns=epoch,opt&where=epoch>=40&where=opt==sgd")
+    assert [dp.values for dp in xp.datapoints] == [{"epoch": e, "opt": "sgd"} for e in range(40, 100, 2)]
+    xp.validate()
+    assert xp.datapoints[1].from_uid is None  # Parent filtered out
+    xp = load_parquet(f"{path}?where=acc<0.5&where=acc>0.1")
+    xp.validate()
+    assert [dp.from_uid for dp in xp.datapoints[:3]] == [None, "r11", "r12"]  # Lineage is kept
+    with pytest.raises(ValueError, match="Unknown columns"):
+        load_parquet(f"{path}?columns=nope")
+    with pytest.raises(exp.ExperimentFetcherDoesntApply):
+        load_parquet(str(tmp_path / "missing.parquet"))
+
+    fetchers = get_fetchers([])
+    assert len(load_xp_with_fetchers(fetchers, f"{path}?where=lr<=0.01").datapoints) == 60
+    assert get_uri_version(fetchers, f"{path}?where=lr<0.01") == get_uri_version(fetchers, str(path))
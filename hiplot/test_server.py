@@ -0,0 +1,359 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import types
+import typing as tp
+import unittest.mock
+from pathlib import Path
+
+import hiplot as hip
+from . import stream_format
+from . import tail
+from . import cache as cache_module
+from .cache import EncodedResponse, ExperimentCache, SingleFlight, available_encodings
+from .compress import uncompress
+from .fetchers import get_fetchers, get_uri_version
+from .server import MAX_LIVE_CLIENTS, DataService, create_app
+
+
+def test_server_cache() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = str(Path(tmpdir) / "xp.csv")
+        hip.Experiment.from_iterable([{"a": 1, "b": "x"}, {"a": 2, "b": "y"}]).to_csv(csv_path)
+        client = create_app(get_fetchers([])).test_client()
+
+        r = client.get("/data", query_string={"uri": csv_path})
+        assert r.headers["X-HiPlot-Cache"] == "MISS"
+        assert len(json.loads(r.data)["experiment"]["datapoints"]) == 2
+        r = client.get("/data", query_string={"uri": csv_path})
+        assert r.headers["X-HiPlot-Cache"] == "HIT"
+
+        hip.Experiment.from_iterable([{"a": 1, "b": "x"}]).to_csv(csv_path)
+        os.utime(csv_path, ns=(0, 0))
+        r = client.get("/data", query_string={"uri": csv_path})
+        assert r.headers["X-HiPlot-Cache"] == "MISS"
+        assert len(json.loads(r.data)["experiment"]["datapoints"]) == 1
+
+        # Demos don't have a version, so they are not cached
+        r = client.get("/data", query_string={"uri": "demo"})
+        assert r.headers["X-HiPlot-Cache"] == "MISS"
+        stats = json.loads(client.get("/cache_stats").data)
+        assert (stats["entries"], stats["hits"], stats["misses"], stats["evictions"]) == (1, 1, 2, 0)
+
+
+def test_uri_version() -> None:
+    fetchers = get_fetchers([])
+    assert get_uri_version(fetchers, "demo") is None
+    assert get_uri_version(fetchers, 'json://[{"a": 1}]') is not None
+    assert get_uri_version(fetchers, 'multi://["json://[]", "json://[]"]') is not None
+    assert get_uri_version(fetchers, 'multi://["json://[]", "demo"]') is None
+    with tempfile.TemporaryDirectory() as tmpdir:
+        v1 = get_uri_version(fetchers, f"fairseq://{tmpdir}")
+        (Path(tmpdir) / "train.log").write_text("")
+        assert get_uri_version(fetchers, f"fairseq://{tmpdir}") != v1
+
+
+def test_cache_eviction() -> None:
+    cache = ExperimentCache(max_entries=2)
+    for uri in ["a", "b", "c"]:
+        cache.put(uri, 0, hip.Experiment.from_iterable([{"x": 1}]))
+    assert cache.get("a", 0) is None
+    assert cache.get("b", 1) is None  # Outdated
+    assert cache.get("c", 0) is not None
+    assert len(cache) == 1
+    assert cache.stats()["evictions"] == 1
+
+    cache = ExperimentCache(max_bytes=1000)
+    entry = cache.put("a", 0, hip.Experiment.from_iterable([{"x": 1}]))
+    cache.add_response("a", entry, "json", EncodedResponse(b" " * 100))
+    assert cache.nbytes == entry.nbytes and entry.responses["json"]
+    cache.put("b", 0, hip.Experiment.from_iterable([{"x": 1}]))
+    cache.add_response("b", cache.get("b", 0), "json", EncodedResponse(b" " * 1000))  # type: ignore
+    assert cache.get("a", 0) is None
+
+
+def test_server_etag() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = str(Path(tmpdir) / "xp.csv")
+        hip.Experiment.from_iterable([{"a": i, "b": "x"} for i in range(100)]).to_csv(csv_path)
+        client = create_app(get_fetchers([])).test_client()
+
+        r = client.get("/data", query_string={"uri": csv_path}, headers={"Accept-Encoding": "gzip"})
+        assert r.status_code == 200
+        assert r.headers["Content-Encoding"] == "gzip"
+        assert len(json.loads(gzip.decompress(r.data))["experiment"]["datapoints"]) == 100
+        etag = r.headers["ETag"]
+
+        r = client.get("/data", query_string={"uri": csv_path}, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert r.status_code == 304
+        assert not r.data
+        r = client.get("/data", query_string={"uri": csv_path}, headers={"If-None-Match": etag})
+        assert r.status_code == 200  # Not the same encoding
+        assert len(json.loads(r.data)["experiment"]["datapoints"]) == 100
+
+
+def test_server_lazy_compression() -> None:
+    with unittest.mock.patch.object(cache_module, "_compress", wraps=cache_module._compress) as compress:
+        # Responses that aren't cached are only compressed with the encoding the client asked for
+        service = DataService(get_fetchers([]), cache_entries=0)
+        status, headers, body = service.get_data("demo", accept_encoding="gzip")
+        assert headers["Content-Encoding"] == "gzip" and json.loads(gzip.decompress(body))["experiment"]
+        assert [c[0][1] for c in compress.call_args_list] == ["gzip"]
+        service.get_data("demo")
+        assert compress.call_count == 1
+
+        # Cached responses are compressed with every encoding once, when they are cached
+        compress.reset_mock()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv_path = Path(tmpdir) / "xp.csv"
+            csv_path.write_text("a,b\n1,x\n2,y\n")
+            service = DataService(get_fetchers([]))
+            for encoding in [None, "gzip", "br", "gzip"]:
+                status, headers, body = service.get_data(str(csv_path), accept_encoding=encoding)
+                assert headers.get("Content-Encoding") == (encoding if encoding in available_encodings() else None)
+            assert sorted(c[0][1] for c in compress.call_args_list) == sorted(available_encodings())
+
+
+def test_server_load_errors() -> None:
+    client = create_app(get_fetchers([])).test_client()
+    r = json.loads(client.get("/data", query_string={"uri": "demo\nnot_an_experiment"}).data)
+    assert list(r["load_errors"]) == ["not_an_experiment"]
+    assert r["experiment"]["datapoints"]
+    r = json.loads(client.get("/data", query_string={"uri": "not_an_experiment"}).data)
+    assert "error" in r
+
+
+def test_single_flight() -> None:
+    single_flight = SingleFlight()
+    calls: tp.List[int] = []
+    results: tp.List[tp.Tuple[tp.Any, bool]] = []
+    started = threading.Event()
+
+    def slow_call() -> int:
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return 42
+
+    def call() -> None:
+        results.append(single_flight.do("key", slow_call))
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait()
+    threads += [threading.Thread(target=call) for _ in range(4)]
+    for t in threads[1:]:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert sorted(results) == [(42, False)] + [(42, True)] * 4
+    # Once done, the function is called again
+    assert single_flight.do("key", lambda: 43) == (43, False)
+
+
+def test_server_coalesced_loads() -> None:
+    calls: tp.List[str] = []
+    started = threading.Event()
+
+    def slow_fetcher(uri: str) -> hip.Experiment:
+        if not uri.startswith("slow://"):
+            raise hip.ExperimentFetcherDoesntApply()
+        calls.append(uri)
+        started.set()
+        time.sleep(0.2)
+        if uri == "slow://error":
+            raise ValueError("Failed to load")
+        return hip.Experiment.from_iterable([{"a": 1}])
+
+    def get_version(uri: str) -> str:
+        if not uri.startswith("slow://"):
+            raise hip.ExperimentFetcherDoesntApply()
+        return "v1"
+
+    slow_fetcher.get_version = get_version  # type: ignore
+    service = DataService([slow_fetcher])
+    for uri in ["slow://xp", "slow://error"]:
+        calls.clear()
+        started.clear()
+        responses: tp.List[tp.Any] = []
+
+        def request() -> None:
+            try:
+                responses.append(service.get_data(uri))
+            except ValueError as e:
+                responses.append(e)
+
+        threads = [threading.Thread(target=request)]
+        threads[0].start()
+        started.wait()
+        threads += [threading.Thread(target=request) for _ in range(4)]
+        for t in threads[1:]:
+            t.start()
+        for t in threads:
+            t.join()
+        assert calls == [uri]
+        assert len(responses) == 5
+        if uri == "slow://error":
+            assert all(isinstance(r, ValueError) for r in responses)
+        else:
+            assert sorted(r[1]["X-HiPlot-Cache"] for r in responses) == ["COALESCED"] * 4 + ["MISS"]
+            assert len({r[2] for r in responses}) == 1
+    assert service.get_data("slow://xp")[1]["X-HiPlot-Cache"] == "HIT"
+
+
+def test_server_stream() -> None:
+    client = create_app(get_fetchers([])).test_client()
+    expected = json.loads(client.get("/data", query_string={"uri": "demo"}).data)
+    for encoding in ["identity", "gzip"]:
+        r = client.get("/data", query_string={"uri": "demo", "format": "stream"}, headers={"Accept-Encoding": encoding})
+        assert r.headers["Content-Type"] == stream_format.MIME_TYPE
+        data = gzip.decompress(r.data) if encoding == "gzip" else r.data
+        assert r.headers.get("Content-Encoding") == (encoding if encoding == "gzip" else None)
+        decoded = stream_format.loads(data)
+        assert decoded["query"] == "demo"
+        assert len(decoded["experiment"]["datapoints"]) == len(expected["experiment"]["datapoints"])
+    r = client.get("/data", query_string={"uri": "not_an_experiment", "format": "stream"})
+    assert "error" in stream_format.loads(r.data)
+
+
+def test_server_stream_cached() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = Path(tmpdir) / "xp.csv"
+        csv_path.write_text("a,b\n1,x\n2,y\n")
+        client = create_app(get_fetchers([])).test_client()
+        query = {"uri": str(csv_path), "format": "stream"}
+        r = client.get("/data", query_string=query, headers={"Accept-Encoding": "gzip"})
+        assert r.headers["X-HiPlot-Cache"] == "MISS" and "ETag" not in r.headers
+        cold = stream_format.loads(gzip.decompress(r.data))
+        r = client.get("/data", query_string=query, headers={"Accept-Encoding": "gzip"})
+        assert r.headers["X-HiPlot-Cache"] == "HIT" and r.headers["Content-Type"] == stream_format.MIME_TYPE
+        assert stream_format.loads(gzip.decompress(r.data)) == cold
+        etag = r.headers["ETag"]
+        r = client.get("/data", query_string=query, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert r.status_code == 304 and r.data == b""
+        # One cache lookup per request
+        stats = json.loads(client.get("/cache_stats").data)
+        assert (stats["hits"], stats["misses"]) == (2, 1)
+        csv_path.write_text("a,b\n1,x\n2,y\n3,z\n")
+        r = client.get("/data", query_string=query, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert r.status_code == 200
+        assert len(stream_format.loads(gzip.decompress(r.data))["experiment"]["datapoints"]) == 3
+
+
+def test_server_live() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = Path(tmpdir) / "xp.csv"
+        csv_path.write_text("a,b\n1,x\n2,y\n")
+        client = create_app(get_fetchers([])).test_client()
+        r = json.loads(client.get("/data", query_string={"uri": str(csv_path)}).data)
+        assert r["live"]
+        assert "live" not in json.loads(client.get("/data", query_string={"uri": "demo"}).data)
+
+        with csv_path.open("a") as f:
+            f.write("3,z\n")
+        r = json.loads(client.get("/data", query_string={"uri": str(csv_path), "format": "delta", "watermark": "2"}).data)
+        assert r["watermark"] == "0:3"
+        assert [dp.values for dp in uncompress(r["datapoints_compressed"])] == [{"a": 2, "b": "y"}, {"a": 3, "b": "z"}]
+        r = json.loads(client.get("/data", query_string={"uri": str(csv_path), "format": "delta", "watermark": "1:3"}).data)
+        assert r == {"reset": True}
+        r = json.loads(client.get("/data", query_string={"uri": "demo", "format": "delta", "watermark": "2"}).data)
+        assert "error" in r
+
+        # Server-sent events
+        service = DataService(get_fetchers([]))
+        appended: tp.List[bool] = []
+        clock = [0.0]
+
+        def sleep(seconds: float) -> None:
+            clock[0] += seconds
+            if not appended:
+                with csv_path.open("a") as f:
+                    f.write("4,w\n")
+                appended.append(True)
+
+        with unittest.mock.patch.object(tail.time, "monotonic", lambda: clock[0]):
+            status, headers, events = service.get_live_events(str(csv_path), "3", sleep=sleep)
+            assert status == 200 and headers["Content-Type"] == "text/event-stream"
+            assert next(events).startswith(b"retry: ")
+            assert next(events) == b'event: update\ndata: {"watermark":"0:3"}\n\n'
+            assert next(events) == b'event: update\ndata: {"watermark":"0:4"}\n\n'
+        assert service.get_live_events("demo", "0")[0] == 404
+
+
+def test_server_live_clients() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = Path(tmpdir) / "xp.csv"
+        csv_path.write_text("a,b\n1,x\n2,y\n")
+        service = DataService(get_fetchers([]))
+        clock = [0.0]
+        with unittest.mock.patch.object(tail.time, "monotonic", lambda: clock[0]):
+            assert service.poll_live(str(csv_path), "0") == "0:2"
+            live = service._live[str(csv_path)]
+            with unittest.mock.patch.object(live.reader, "read", wraps=live.reader.read) as read:
+                # Clients polling within the same interval share a single read
+                for _ in range(5):
+                    assert service.poll_live(str(csv_path), "0:2") is None
+                assert read.call_count == 0
+                clock[0] += 1.0
+                with csv_path.open("a") as f:
+                    f.write("3,z\n")
+                assert [service.poll_live(str(csv_path), "0:2") for _ in range(5)] == ["0:3"] * 5
+                assert read.call_count == 1
+                # Deltas are always up to date
+                with csv_path.open("a") as f:
+                    f.write("4,w\n")
+                assert json.loads(service.get_data_delta(str(csv_path), "0:3")[2])["watermark"] == "0:4"
+
+        # Flask serves a limited number of clients at once, with a thread each
+        streams = [service.get_live_events(str(csv_path), "0:4", sleep=lambda _: None)[2] for _ in range(MAX_LIVE_CLIENTS)]
+        for stream in streams:
+            next(stream)
+        assert service.get_live_events(str(csv_path), "0:4")[0] == 503
+        stream = streams.pop()
+        assert isinstance(stream, types.GeneratorType)
+        stream.close()
+        assert service.get_live_events(str(csv_path), "0:4")[0] == 200
+
+
+def test_server_live_starts_after_load() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = Path(tmpdir) / "xp.csv"
+        csv_path.write_text('a,b\n1,"x\ny"\n2,y\n')
+        service = DataService(get_fetchers([]))
+        assert service.get_data(str(csv_path))[0] == 200
+        # The file isn't read again when the client starts following it
+        live = service._live[str(csv_path)]
+        assert live.reader.offset == csv_path.stat().st_size  # type: ignore
+        with csv_path.open("a") as f:
+            f.write("3.5,z\n")
+        r = json.loads(service.get_data_delta(str(csv_path), "2")[2])
+        assert r["watermark"] == "0:3"
+        assert [(dp.uid, dp.values) for dp in uncompress(r["datapoints_compressed"])] == [("1", {"a": 2, "b": "y"}), ("2", {"a": 3.5, "b": "z"})]
+
+
+def test_uri_version_nested_logs(tmp_path: Path) -> None:
+    fetchers = get_fetchers([])
+    (tmp_path / "slurm_logs").mkdir()
+    log = tmp_path / "slurm_logs" / "a.log"
+    log.write_text("| epoch 001 | loss 8.4\n")
+    (tmp_path / "broken").symlink_to(tmp_path / "does_not_exist")
+    v1 = get_uri_version(fetchers, f"fairseq://{tmp_path}")
+    assert v1 is not None
+    with log.open("a") as f:
+        f.write("| epoch 002 | loss 6.2\n")
+    assert get_uri_version(fetchers, f"fairseq://{tmp_path}") != v1
+
+    perf = tmp_path / "001_perf"
+    perf.write_text("# date\tloss\n2019-09-30\t1.5\n")
+    v1 = get_uri_version(fetchers, f"w2l://{tmp_path}")
+    with perf.open("a") as f:
+        f.write("2019-10-01\t1.2\n")
+    assert get_uri_version(fetchers, f"w2l://{tmp_path}") != v1
@@ -0,0 +1,86 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import math
+import pickle
+import sys
+import typing as tp
+from pathlib import Path
+
+import pytest
+
+import hiplot as hip
+from . import binary_format, jsonenc, snapshot
+from .columns import ColumnStore
+from .compress import compress
+from .fetchers import get_fetchers, load_xp_with_fetchers
+from .fetchers_demo import README_DEMOS
+from .test_compress import ROWS
+
+
+def _datapoints(xp: hip.Experiment) -> tp.List[tp.Any]:
+    # NaN != NaN
+    return [
+        (dp.uid, dp.from_uid, {k: "nan" if isinstance(v, float) and math.isnan(v) else v for k, v in dp.values.items()})
+        for dp in xp.datapoints
+    ]
+
+
+def _check_roundtrip(xp: hip.Experiment) -> hip.Experiment:
+    expected = xp._settings_asdict()
+    decoded = snapshot.loads(snapshot.dumps(xp, extra={"uri": "test"}))
+    assert decoded._settings_asdict() == expected
+    assert _datapoints(decoded) == _datapoints(xp)
+    return decoded
+
+
+def test_snapshot_roundtrip() -> None:
+    xp = hip.Experiment.from_iterable(ROWS + [{"epoch": 2 ** 60, "loss": float("nan"), "lr": [0.1, 0.2]}, {"opt": None}])
+    for dp, next_dp in zip(xp.datapoints[:50], xp.datapoints[1:50]):
+        next_dp.from_uid = dp.uid
+    xp.parameters_definition["epoch"].type = hip.ValueType.NUMERIC_LOG
+    xp.parameters_definition["epoch"].colors = {1: "rgb(0, 0, 0)", "1": "#ffffff"}
+    xp.parameters_definition["loss"].force_range(0, 1)
+    xp.colorby = "loss"
+    xp.display_data(hip.Displays.XY).update({"axis_x": "epoch", "axis_y": "loss"})
+    decoded = _check_roundtrip(xp)
+    assert decoded.parameters_definition["epoch"].colors == {1: "rgb(0, 0, 0)", "1": "#ffffff"}
+    assert decoded.parameters_definition["epoch"].type == hip.ValueType.NUMERIC_LOG
+    # Missing values and `None` are different
+    assert "opt" not in decoded.datapoints[100].values
+    assert decoded.datapoints[101].values == {"opt": None}
+
+    data = snapshot.dumps(xp, extra={"uri": "test"})
+    assert snapshot.loads_header(data[:snapshot.header_size(data[:snapshot.PREFIX_SIZE])])["extra"] == {"uri": "test"}
+    with pytest.raises(ValueError):
+        snapshot.loads(b"HIPB" + data[4:])
+
+
+def test_snapshot_demos() -> None:
+    for v in README_DEMOS.values():
+        _check_roundtrip(v())
+
+
+def test_save_load_mmap(tmp_path: Path) -> None:
+    xp = hip.Experiment.from_iterable(ROWS + [{"epoch": 2 ** 60, "loss": float("nan")}])
+    xp.colorby = "loss"
+    path = tmp_path / "xp.hiplot"
+    xp.save(path)
+    loaded = hip.Experiment.load(path)
+    store = loaded._get_columns()
+    if sys.byteorder == "little":
+        assert isinstance(store.columns["loss"], memoryview)
+    assert loaded._settings_asdict() == xp._settings_asdict()
+    assert _datapoints(loaded) == _datapoints(xp)
+    assert _datapoints(hip.Experiment.load(path, mmap=False)) == _datapoints(xp)
+    # Memory-mapped columns can be used like other columns
+    assert binary_format.dumps(loaded) == binary_format.dumps(xp)
+    assert jsonenc.dumps(compress(loaded._get_columns())) == jsonenc.dumps(compress(xp._get_columns()))  # NaN != NaN
+    assert _datapoints(pickle.loads(pickle.dumps(loaded))) == _datapoints(xp)
+    assert len(ColumnStore.concat([store, xp._get_columns()])) == 2 * len(store)
+
+    # Saving again replaces the file, experiments that were loaded from it stay valid
+    hip.Experiment.from_iterable([{"a": 1}]).save(path)
+    assert _datapoints(loaded) == _datapoints(xp)
+    assert len(load_xp_with_fetchers(get_fetchers([]), str(path)).datapoints) == 1
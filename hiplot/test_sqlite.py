@@ -0,0 +1,108 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import array
+import math
+import os
+import sqlite3
+import typing as tp
+from pathlib import Path
+
+import pytest
+
+from . import experiment as exp
+from . import sqlite
+from .fetchers import get_fetchers, get_tail_reader, get_uri_version, load_sqlite, load_xp_with_fetchers
+from .tail import LiveExperiment
+
+
+def _add_trials(path: Path, trials: tp.List[tp.Tuple[tp.Any, ...]]) -> None:
+    with sqlite3.connect(str(path)) as db:
+        db.execute("CREATE TABLE IF NOT EXISTS trials (trial_id INTEGER PRIMARY KEY, lr REAL, opt TEXT, loss REAL, started TEXT)")
+        db.executemany("INSERT INTO trials VALUES (?, ?, ?, ?, ?)", trials)
+    db.close()
+
+
+def test_parse_uri() -> None:
+    assert sqlite.parse_uri("xp.csv") is None
+    assert sqlite.parse_uri("sqlite://a.db?query=SELECT a&b FROM t WHERE c LIKE '%x+'") == sqlite.SQLiteQuery(
+        "a.db", "SELECT a&b FROM t WHERE c LIKE '%x+'", None)
+    assert sqlite.parse_uri("sqlite:///a.db?watermark=id&query=SELECT * FROM t") == sqlite.SQLiteQuery("/a.db", "SELECT * FROM t", "id")
+    with pytest.raises(ValueError):
+        sqlite.parse_uri("sqlite://a.db")
+    with pytest.raises(ValueError):
+        sqlite.parse_uri("sqlite://a.db?sort=id&query=SELECT 1")
+
+
+def test_fetcher_sqlite(tmp_path: Path) -> None:
+    path = tmp_path / "trials.db"
+    _add_trials(path, [(i, 10 ** -(i % 4), "adam" if i % 2 else "sgd", None if i == 3 else 1 / (i + 1), "2020-01-01 00:00:00")
+                       for i in range(100)])
+    uri = f"sqlite://{path}?query=SELECT trial_id AS uid, lr, opt, loss, started FROM trials WHERE opt = 'adam'"
+    xp = load_sqlite(uri)
+    xp.validate()
+    assert len(xp.datapoints) == 50
+    assert xp.datapoints[0].uid == "1"
+    assert xp.datapoints[0].values == {"lr": 0.1, "opt": "adam", "loss": 0.5, "started": 1577836800}
+    store = xp._get_columns()
+    assert isinstance(store.columns["loss"], array.array) and math.isnan(store.columns["loss"][1])
+    assert xp.parameters_definition["started"].type == exp.ValueType.TIMESTAMP
+    with pytest.raises(exp.ExperimentFetcherDoesntApply):
+        load_sqlite("demo")
+    with pytest.raises(exp.ExperimentFetcherDoesntApply):
+        load_sqlite(f"sqlite://{tmp_path / 'missing.db'}?query=SELECT 1")
+    assert not (tmp_path / "missing.db").exists()
+    with pytest.raises(sqlite3.OperationalError):
+        load_sqlite(f"sqlite://{path}?query=SELECT nope FROM trials")
+
+    fetchers = get_fetchers([])
+    assert len(load_xp_with_fetchers(fetchers, uri).datapoints) == 50
+    version = get_uri_version(fetchers, uri)
+    assert version is not None
+    _add_trials(path, [(100, 1.0, "adam", 0.1, "2020-01-02 00:00:00")])
+    assert get_uri_version(fetchers, uri) != version
+
+
+def test_sqlite_live(tmp_path: Path) -> None:
+    path = tmp_path / "trials.db"
+    _add_trials(path, [(i, 0.1, "sgd", 1.0, "x") for i in range(10)])
+    fetchers = get_fetchers([])
+    assert get_tail_reader(fetchers, f"sqlite://{path}?query=SELECT * FROM trials") is None
+    reader = get_tail_reader(fetchers, f"sqlite://{path}?watermark=trial_id&query=SELECT * FROM trials")
+    assert reader is not None
+    live = LiveExperiment(reader)
+    live.refresh()
+    assert live.num_rows == 10
+    _add_trials(path, [(i, 0.2, "adam", 0.5, "y") for i in range(10, 15)])
+    live.refresh()
+    assert live.num_rows == 15
+    delta, watermark = live.delta("0:10")
+    assert delta is not None and watermark == "0:15"
+    assert delta.uids == [str(i) for i in range(9, 15)]
+    assert list(delta.column_values("trial_id")) == list(range(9, 15))
+
+
+def test_sqlite_live_starts_after_load(tmp_path: Path) -> None:
+    path = tmp_path / "trials.db"
+    _add_trials(path, [(i, 0.1, "sgd", 1.0, "x") for i in range(10)])
+    fetchers = get_fetchers([])
+    uri = f"sqlite://{path}?watermark=trial_id&query=SELECT * FROM trials"
+    st = os.stat(path)
+    xp = load_xp_with_fetchers(fetchers, uri)
+    reader = get_tail_reader(fetchers, uri)
+    assert reader is not None
+    live = LiveExperiment(reader)
+    assert live.start_after(xp, st) and live.num_rows == 10
+    assert isinstance(reader, sqlite.SQLiteTailReader) and reader.last_watermark == 9
+    _add_trials(path, [(i, 0.2, "adam", 0.5, "y") for i in range(10, 12)])
+    live.refresh()
+    assert live.num_rows == 12
+    delta, _ = live.delta("10")
+    assert delta is not None and delta.uids == ["9", "10", "11"]
+    assert list(delta.column_values("trial_id")) == [9, 10, 11]
+
+    # Timestamps converted to seconds can't be compared with the values in the database anymore
+    uri = f"sqlite://{path}?watermark=started&query=SELECT trial_id, '2020-01-01 00:00:00' AS started FROM trials"
+    reader = get_tail_reader(fetchers, uri)
+    assert reader is not None and not reader.start_after(load_xp_with_fetchers(fetchers, uri), os.stat(path))
@@ -0,0 +1,33 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import hiplot as hip
+from . import jsonenc, stream_format
+from .test_binary_format import _normalize
+from .test_compress import ROWS
+
+
+def test_stream_roundtrip() -> None:
+    xp = hip.Experiment.from_iterable(ROWS)
+    for dp, next_dp in zip(xp.datapoints, xp.datapoints[1:]):
+        next_dp.from_uid = dp.uid  # Parents are in the previous chunk for the first datapoint of every chunk
+    xp.compact_uids()
+    lines = list(stream_format.iter_lines(xp, extra={"query": "test"}, first_chunk_rows=3, max_chunk_rows=20))
+    chunks = [jsonenc.loads(line)["datapoints_compressed"] for line in lines[1:-1]]
+    assert [c["num_rows"] for c in chunks] == [3, 12, 20, 20, 20, 20, 5]
+    assert chunks[1]["uid"] == {"enc": "compact_index", "offset": 3}
+
+    decoded = stream_format.loads(b"".join(lines))
+    expected = xp._asdict()
+    assert decoded["query"] == "test"
+    assert {k: v for k, v in decoded["experiment"].items() if k != "datapoints"} == \
+        {k: v for k, v in expected.items() if k != "datapoints"}
+    columns = list(xp._get_columns().columns)
+    assert _normalize(decoded["experiment"]["datapoints"], columns) == _normalize(expected["datapoints"], columns)
+
+
+def test_stream_empty_columns() -> None:
+    xp = hip.Experiment.from_iterable([{}, {}])
+    decoded = stream_format.loads(b"".join(stream_format.iter_lines(xp)))
+    assert [dp["values"] for dp in decoded["experiment"]["datapoints"]] == [{}, {}]
@@ -0,0 +1,113 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import os
+import tempfile
+import typing as tp
+from pathlib import Path
+
+from .fetchers import get_fetchers, get_tail_reader, load_csv, load_fairseq
+from .tail import LineTailReader, LiveExperiment
+
+
+def _append(path: Path, text: str) -> None:
+    with path.open("a", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _values(live: LiveExperiment, watermark: str) -> tp.List[tp.Tuple[str, tp.Dict[str, tp.Any]]]:
+    delta, _ = live.delta(watermark)
+    assert delta is not None
+    return [(uid, delta.values_at(i)) for i, uid in enumerate(delta.uids)]
+
+
+def test_live_csv() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "xp.csv"
+        path.write_text("epoch,loss,opt\n0,1.5,sgd\n1,1.2,sgd\n")
+        reader = get_tail_reader(get_fetchers([]), str(path))
+        assert reader is not None
+        live = LiveExperiment(reader)
+        live.refresh()
+        assert live.watermark == "0:2"
+        num_rows = len(load_csv(str(path))._get_columns())
+
+        _append(path, "2,0.9,adam\n3,0.")  # The last line is not complete yet
+        live.refresh()
+        assert live.watermark == "0:3"
+        assert _values(live, str(num_rows)) == [("1", {"epoch": 1, "loss": 1.2, "opt": "sgd"}), ("2", {"epoch": 2, "loss": 0.9, "opt": "adam"})]
+        _append(path, "7,adam\n")
+        live.refresh()
+        assert _values(live, "0:3") == [("2", {"epoch": 2, "loss": 0.9, "opt": "adam"}), ("3", {"epoch": 3, "loss": 0.7, "opt": "adam"})]
+        assert live.is_up_to_date("0:4")
+
+        # Rewritten file: clients need to reload the experiment
+        os.remove(path)
+        path.write_text("epoch,loss\n0,2.0\n")
+        live.refresh()
+        assert live.watermark == "1:1"
+        assert live.delta("0:4")[0] is None
+        assert live.delta("4")[0] is None
+        assert _values(live, "1") == [("0", {"epoch": 0, "loss": 2.0})]
+
+
+def test_live_buffer() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "xp.csv"
+        path.write_text("a\n")
+        reader = get_tail_reader(get_fetchers([]), str(path))
+        assert reader is not None
+        live = LiveExperiment(reader, max_buffered_rows=10)
+        for i in range(10):
+            _append(path, "".join(f"{i * 5 + k}\n" for k in range(5)))
+            live.refresh()
+        assert live.watermark == "0:50"
+        assert [v["a"] for _, v in _values(live, "45")] == [44, 45, 46, 47, 48, 49]
+        assert live.delta("20")[0] is None  # Too old
+
+
+def test_live_fairseq() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "train.log"
+        path.write_text("Namespace(lr=[0.1], arch='transformer')\n| epoch 001 | loss 8.4 | ppl 300.0\n")
+        reader = get_tail_reader(get_fetchers([]), f"fairseq://{tmpdir}")
+        assert reader is not None
+        live = LiveExperiment(reader)
+        live.refresh()
+        assert live.watermark == "0:1"
+        # Validation metrics update the last datapoint
+        _append(path, "| epoch 001 | valid on 'valid' subset | loss 7.6\n| epoch 002 | loss 6.2 | ppl 100.0\n")
+        live.refresh()
+        assert live.watermark == "0:2"
+        assert _values(live, "0:1") == [
+            ("0", {"lr": [0.1], "arch": "transformer", "epoch": 1, "loss": 8.4, "ppl": 300.0, "valid_loss": 7.6}),
+            ("1", {"lr": [0.1], "arch": "transformer", "epoch": 2, "loss": 6.2, "ppl": 100.0}),
+        ]
+        delta, _ = live.delta("2")
+        assert delta is not None and delta.from_uids == ["0"]
+        xp = load_fairseq(f"fairseq://{tmpdir}")
+        assert [dp.values for dp in xp.datapoints] == [v for _, v in _values(live, "0")]
+
+
+def test_no_tail_reader() -> None:
+    assert get_tail_reader(get_fetchers([]), "demo") is None
+    assert get_tail_reader(get_fetchers([]), "file_does_not_exist.csv") is None
+
+
+def test_live_bounded_reads(tmp_path: Path) -> None:
+    path = tmp_path / "xp.csv"
+    path.write_text('a,b\n0,"quoted\nnewline"\n1,\x0bx y\n')
+    reader = get_tail_reader(get_fetchers([]), str(path))
+    assert isinstance(reader, LineTailReader)
+    reader.read_size = 5  # Records span several reads
+    live = LiveExperiment(reader)
+    live.refresh()
+    assert live.watermark == "0:2"
+    _append(path, '2,"still\nbeing')  # A newline in an open quoted field doesn't end the record
+    live.refresh()
+    assert live.watermark == "0:2"
+    _append(path, ' written"\n')
+    live.refresh()
+    assert [v for _, v in _values(live, "0")] == [
+        {"a": 0, "b": "quoted\nnewline"}, {"a": 1, "b": "\x0bx y"}, {"a": 2, "b": "still\nbeing written"}]
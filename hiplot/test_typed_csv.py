@@ -0,0 +1,123 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import io
+import math
+from pathlib import Path
+
+import pytest
+
+import hiplot as hip
+from .parallel_csv import read_csv_parallel, set_csv_workers
+from . import typed_csv
+from .typed_csv import _parse_timestamp, _TypedColumn, read_csv
+
+
+CSV_CONTENT = """uid,from_uid,i,f,b,t,s,late_float,late_str,empty
+a,,1,0.5,True,2020-03-08 16:48:16,x,,,
+b,a,2,,false,2020-03-08T16:48:17Z,y,,,
+c,b,3,inf,True,2020-03-08,x,2.5,z,
+d,c,4,1e3,False,2020-03-09 00:00:00,x,3,1,
+"""
+
+
+def test_read_csv_types() -> None:
+    for chunk_size in [1, 2, 10]:
+        xp = read_csv(io.StringIO(CSV_CONTENT), chunk_size=chunk_size)
+        xp.validate()
+        dps = xp.datapoints
+        assert [dp.uid for dp in dps] == ["a", "b", "c", "d"]
+        assert [dp.from_uid for dp in dps] == [None, "a", "b", "c"]
+        assert [dp.values["i"] for dp in dps] == [1, 2, 3, 4]
+        f = [dp.values["f"] for dp in dps]
+        assert f[0] == 0.5 and math.isnan(f[1]) and f[2:] == [math.inf, 1000.0]  # type: ignore
+        assert [dp.values["b"] for dp in dps] == [True, False, True, False]
+        assert [dp.values["t"] for dp in dps] == [1583686096, 1583686097, 1583625600, 1583712000]
+        assert xp.parameters_definition["t"].type == hip.ValueType.TIMESTAMP
+        assert [dp.values["s"] for dp in dps] == ["x", "y", "x", "x"]
+        assert math.isnan(dps[0].values["late_float"])  # type: ignore
+        assert dps[3].values["late_float"] == 3.0
+        assert [dp.values["late_str"] for dp in dps] == ["", "", "z", "1"]
+        assert [dp.values["empty"] for dp in dps] == ["", "", "", ""]
+
+
+def test_parse_timestamp() -> None:
+    assert _parse_timestamp("2020-03-08") == 1583625600
+    assert _parse_timestamp("2020-03-08T16:48:17Z") == _parse_timestamp("2020-03-08 16:48:17") == 1583686097
+    assert _parse_timestamp("2020-03-08T17:48:17.123456789+01:00") == _parse_timestamp("2020-03-08 11:18:17-0530") == 1583686097
+    for invalid in ["2020-13-01", "2020-02-30 10:00", "2020-03-08 25:00", "2020-03-08 16:48:17+24:00", "2020-03-08 16:48 UTC"]:
+        with pytest.raises(ValueError):
+            _parse_timestamp(invalid)
+
+
+def test_read_csv_promotion() -> None:
+    xp = read_csv(io.StringIO("a,b\n1,2020-01-01\n1.50,2020-01-01\nx,y\n"), chunk_size=1)
+    assert [dp.values for dp in xp.datapoints] == [
+        {"a": "1", "b": "2020-01-01"},  # Original text is kept when the type of a column changes
+        {"a": "1.50", "b": "2020-01-01"},
+        {"a": "x", "b": "y"},
+    ]
+    assert xp.parameters_definition["b"].type is None
+
+
+def test_read_csv_chunk_sizes(monkeypatch: pytest.MonkeyPatch) -> None:
+    content = "a,b,c,d,e,f\n" + "".join(
+        f"{k:03d},{k}.50,2019-09-{k % 30 + 1:02d},{'' if k < 3 else k},{9007199254740993 + k},{k / 4 if k < 5 else f'{k}.50'}\n"
+        for k in range(10)
+    )
+    content += "x,1e3,not a date,1.5,1.5,y\n"
+    expected = read_csv(io.StringIO(content), chunk_size=100)
+    assert [dp.values["a"] for dp in expected.datapoints[:2]] == ["000", "001"]
+    assert [dp.values["b"] for dp in expected.datapoints[-2:]] == [9.5, 1000.0]
+    assert expected.datapoints[0].values["c"] == "2019-09-01"
+    assert expected.datapoints[0].values["e"] == float(9007199254740993)
+    assert [dp.values["f"] for dp in expected.datapoints[4:6]] == ["1.0", "5.50"]
+    for max_unchecked_text in [0, typed_csv._MAX_UNCHECKED_TEXT]:
+        monkeypatch.setattr(typed_csv, "_MAX_UNCHECKED_TEXT", max_unchecked_text)
+        for chunk_size in [1, 2, 3, 10]:
+            xp = read_csv(io.StringIO(content), chunk_size=chunk_size)
+            # repr: NaN != NaN
+            assert repr([dp.values for dp in xp.datapoints]) == repr([dp.values for dp in expected.datapoints]), chunk_size
+
+
+def test_typed_column_raw_text() -> None:
+    col = _TypedColumn()
+    col.extend(("1", "2"))
+    col.extend(("007",))
+    col.check_raw()
+    assert [chunk.packed for chunk in col.raw] == [None, "007"]  # Only text that can't be written again from the values
+    col.extend(("0.5",))
+    assert col.kind == "float" and [chunk.packed for chunk in col.raw] == [None, "007", "0.5"]
+    col.extend(("x",))
+    assert col.finish() == ["1", "2", "007", "0.5", "x"]
+
+
+def test_read_csv_empty() -> None:
+    assert not read_csv(io.StringIO("")).datapoints
+    assert not read_csv(io.StringIO("a,b\n")).datapoints
+
+
+def test_read_csv_parallel(tmp_path: Path) -> None:
+    set_csv_workers(2)
+    rows = ['uid,from_uid,i,f,mixed,s,quoted,lossy']
+    for k in range(300):
+        mixed = str(k) if k < 150 else ("" if k < 200 else f"{k}.5")
+        lossy = f"{k:04d}" if k < 290 else "x"
+        quoted = f'"line {k}\n""continued"", {k}"' if k % 7 == 0 else f"q{k}"
+        rows.append(f"u{k},{f'u{k - 1}' if k else ''},{k},{k / 3},{mixed},{'abc'[k % 3]},{quoted},{lossy}")
+    content = "\n".join(rows) + "\n"
+    path = tmp_path / "xp.csv"
+    path.write_text(content)
+    expected = read_csv(io.StringIO(content))
+    for chunk_bytes in [64, 1000, 1 << 20]:
+        xp = read_csv_parallel(path, chunk_bytes=chunk_bytes)
+        xp.validate()
+        # repr: NaN != NaN
+        assert repr([(dp.uid, dp.from_uid, dp.values) for dp in xp.datapoints]) == repr([(dp.uid, dp.from_uid, dp.values) for dp in expected.datapoints])
+        assert xp._get_columns().columns["mixed"].typecode == "d"  # type: ignore
+        assert xp.datapoints[7].values["lossy"] == "0007"
+    path.write_text("a,b\n")
+    assert len(read_csv_parallel(path, chunk_bytes=2).datapoints) == 0
+    path.write_text("a,b\n1,x\n2,y")  # No newline at the end
+    assert [dp.values for dp in read_csv_parallel(path, chunk_bytes=2).datapoints] == [{"a": 1, "b": "x"}, {"a": 2, "b": "y"}]
@@ -0,0 +1,391 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import array
+import csv
+import itertools
+import re
+import typing as tp
+from datetime import datetime, timedelta, timezone
+
+from .columns import ColumnBuilder, ColumnData, ColumnStore, RESERVED_COLUMNS, column_typecode
+from .experiment import Experiment, ValueType
+
+
+INT = "int"
+FLOAT = "float"
+BOOL = "bool"
+TIMESTAMP = "timestamp"
+STR = "str"
+
+# Types we try for a column, by order of preference
+_KINDS = [INT, FLOAT, BOOL, TIMESTAMP, STR]
+# Types a column can be converted to when values don't fit anymore
+_PROMOTIONS = {INT: [FLOAT, STR], FLOAT: [STR], BOOL: [STR], TIMESTAMP: [STR]}
+
+_BOOLS = {"True": True, "False": False, "true": True, "false": False}
+_TIMESTAMP_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})(?:[ T](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d+))?)?)?(Z|([+-])(\d{2}):?(\d{2}))?$")
+_NAN = float("nan")
+
+
+def _parse_timestamp(value: str) -> int:
+    """
+    Converts an ISO 8601 timestamp to seconds. Timestamps without a timezone are in UTC.
+    (`datetime.fromisoformat` isn't available in Python 3.6, and only supports some formats before 3.11)
+    """
+    match = _TIMESTAMP_RE.match(value)
+    if match is None:
+        raise ValueError(f"Not a timestamp: {value}")
+    year, month, day, hour, minute, second, fraction, _, tz_sign, tz_hours, tz_minutes = match.groups()
+    tzinfo = timezone.utc
+    if tz_sign is not None:
+        offset = timedelta(hours=int(tz_hours), minutes=int(tz_minutes))
+        tzinfo = timezone(-offset if tz_sign == "-" else offset)
+    date = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                    int((fraction or "")[:6].ljust(6, "0")), tzinfo=tzinfo)
+    return int(date.timestamp())
+
+
+def _convert(kind: str, raw: tp.Sequence[str], strings: tp.Dict[str, str]) -> ColumnBuilder:
+    """
+    Converts raw values of a chunk to the given kind. Raises ValueError if a value can't be converted.
+    """
+    if kind == INT:
+        return array.array("q", map(int, raw))
+    if kind == FLOAT:
+        try:
+            return array.array("d", map(float, raw))
+        except ValueError:
+            return array.array("d", [float(v) if v != '' else _NAN for v in raw])
+    if kind == BOOL:
+        try:
+            return [_BOOLS[v] for v in raw]
+        except KeyError as e:
+            raise ValueError(f"Not a boolean: {e}") from e
+    if kind == TIMESTAMP:
+        if not all(map(_TIMESTAMP_RE.match, raw)):
+            raise ValueError("Not a timestamp")
+        return array.array("q", map(_parse_timestamp, raw))
+    assert kind == STR, kind
+    # Categorical values are usually repeated a lot: only keep one copy of each string
+    return [strings.setdefault(v, v) for v in raw]
+
+
+def _format(kind: str, values: ColumnData) -> tp.Optional[tp.Tuple[str, ...]]:
+    """
+    Canonical text of values converted to the given kind, or `None` if the kind has none (timestamps)
+    """
+    if kind == INT:
+        if column_typecode(values) == "d":  # Integers of a column since promoted to floats
+            return tuple(str(int(v)) for v in values)
+        return tuple(map(str, values))
+    if kind == FLOAT:
+        text = tuple(map(repr, values))
+        if "nan" in text:  # Empty values
+            return tuple(t if t != "nan" else '' for t in text)
+        return text
+    if kind == BOOL:
+        return tuple(map(str, values))
+    return None
+
+
+# Raw values of a chunk are kept in a single string, which is much smaller than one string per value
+_RAW_SEPARATOR = "\x00"
+# Characters of raw text that we keep for a file before checking which chunks can be written again from their values
+_MAX_UNCHECKED_TEXT = 16 << 20
+
+
+class _RawText:
+    """
+    Original text of a chunk of values, in case its column is converted to another type later.
+    Once checked, the text is only kept if it isn't the canonical text of the values (eg `007`, `1e3` or timestamps),
+    so that most numeric columns don't keep any text.
+    """
+
+    __slots__ = ("length", "kind", "packed", "checked")
+
+    def __init__(self, raw: tp.Sequence[str]) -> None:
+        self.length = len(raw)
+        self.kind: tp.Optional[str] = None  # Kind whose canonical text gives the original text back
+        self.checked = False
+        packed = _RAW_SEPARATOR.join(raw)
+        # Values that contain the separator are kept apart
+        self.packed: tp.Union[None, str, tp.Tuple[str, ...]] = packed if packed.count(_RAW_SEPARATOR) == len(raw) - 1 else tuple(raw)
+
+    @property
+    def size(self) -> int:
+        if isinstance(self.packed, str):
+            return len(self.packed)
+        return sum(map(len, self.packed)) if self.packed is not None else 0
+
+    def text(self, values: ColumnData) -> tp.Sequence[str]:
+        if self.packed is None:
+            assert self.kind is not None
+            text = _format(self.kind, values)
+            assert text is not None
+            return text
+        return self.packed.split(_RAW_SEPARATOR) if isinstance(self.packed, str) else self.packed
+
+    def check(self, kinds: tp.Sequence[str], values: ColumnData) -> None:
+        raw = tuple(self.text(values))
+        self.checked = True
+        self.kind = next((k for k in kinds if _format(k, values) == raw), None)
+        if self.kind is not None:
+            self.packed = None
+
+
+class _TypedColumn:
+    def __init__(self) -> None:
+        self.kind: tp.Optional[str] = None  # `None` until we see a non-empty value
+        self.data: ColumnBuilder = []
+        self.num_leading_empty = 0
+        self.strings: tp.Dict[str, str] = {}
+        # Text of the chunks after the leading empty values, until the column is converted to strings:
+        # when the type of the column changes, we convert the original text again (eg `007` stays `007` as a string)
+        self.raw: tp.List[_RawText] = []
+        self.num_checked = 0  # Chunks of `raw` that were checked
+
+    def extend(self, raw: tp.Sequence[str]) -> int:
+        """
+        Returns the number of characters of raw text kept for these values
+        """
+        if not raw:
+            return 0
+        if self.kind is None:
+            if not any(raw):
+                self.num_leading_empty += len(raw)
+                return 0
+            self._resolve_kind(raw)
+        else:
+            try:
+                self.data.extend(_convert(self.kind, raw, self.strings))
+            except (ValueError, OverflowError):
+                self._promote(raw)
+        if self.kind == STR:
+            return 0
+        self.raw.append(_RawText(raw))
+        return self.raw[-1].size
+
+    def check_raw(self) -> None:
+        """
+        Drops the raw text of the chunks that can be written again from their values
+        """
+        assert self.kind is not None or not self.raw
+        offset = self.num_leading_empty + sum(chunk.length for chunk in self.raw[:self.num_checked])
+        for chunk in self.raw[self.num_checked:]:
+            assert self.kind is not None
+            chunk.check([self.kind], self.data[offset:offset + chunk.length])
+            offset += chunk.length
+        self.num_checked = len(self.raw)
+
+    def _promote(self, raw: tp.Sequence[str]) -> None:
+        assert self.kind is not None
+        for new_kind in _PROMOTIONS[self.kind]:
+            try:
+                values = _convert(new_kind, raw, self.strings)
+            except (ValueError, OverflowError):
+                continue
+            data = _convert(new_kind, [''] * self.num_leading_empty, self.strings)
+            chunks: tp.List[_RawText] = []
+            offset = self.num_leading_empty
+            for chunk in self.raw:
+                text = chunk.text(self.data[offset:offset + chunk.length])
+                offset += chunk.length
+                converted = _convert(new_kind, text, self.strings)
+                data.extend(converted)
+                if new_kind != STR:
+                    chunks.append(_RawText(text))
+                    if chunk.checked:
+                        chunks[-1].check([k for k in [chunk.kind, new_kind] if k is not None], converted)
+            data.extend(values)
+            self.data = data
+            self.kind = new_kind
+            self.raw = chunks
+            if new_kind == STR:
+                self.num_checked = 0
+            return
+        assert False, "Conversion to string can't fail"
+
+    def _resolve_kind(self, raw: tp.Sequence[str]) -> None:
+        for kind in _KINDS:
+            if self.num_leading_empty and kind in [INT, BOOL, TIMESTAMP]:
+                # Empty values are only supported as NaNs or empty strings
+                continue
+            try:
+                values = _convert(kind, raw, self.strings)
+            except (ValueError, OverflowError):
+                continue
+            self.kind = kind
+            self.data = _convert(kind, [''] * self.num_leading_empty, self.strings)
+            self.data.extend(values)
+            return
+        assert False, "Conversion to string can't fail"
+
+    def finish(self) -> ColumnData:
+        self.raw, self.num_checked = [], 0  # The type of the column is final
+        if self.kind is None:
+            return [''] * self.num_leading_empty
+        return self.data
+
+
+def _pad_rows(rows: tp.List[tp.List[str]], num_fields: int) -> None:
+    for i, row in enumerate(rows):
+        if len(row) != num_fields:
+            rows[i] = (row + [''] * num_fields)[:num_fields]
+
+
+def convert_rows(header: tp.List[str], rows: tp.List[tp.List[str]], kinds: tp.Dict[str, tp.Optional[str]],
+                 row_offset: int = 0) -> ColumnStore:
+    """
+    Converts rows appended to a CSV file, as :func:`read_csv` would have converted them.
+    Columns are converted to their type in `kinds` when possible (the types inferred for the previous rows),
+    and `kinds` is updated with the new types.
+
+    :param row_offset: Number of previous rows in the file, for default uids
+    """
+    _pad_rows(rows, len(header))
+    fields = list(zip(*rows)) if rows else [()] * len(header)
+    uids = list(fields[header.index("uid")]) if "uid" in header else [str(k) for k in range(row_offset, row_offset + len(rows))]
+    from_uids: tp.List[tp.Optional[str]] = [None] * len(rows)
+    if "from_uid" in header:
+        from_uids = [f if f != '' else None for f in fields[header.index("from_uid")]]
+    columns: tp.Dict[str, ColumnData] = {}
+    for i, name in enumerate(header):
+        if name in RESERVED_COLUMNS:
+            continue
+        col = _TypedColumn()
+        col.kind = kinds.get(name)
+        if col.kind is not None:
+            col.data = _convert(col.kind, [], col.strings)
+        col.extend(fields[i])
+        columns[name] = col.finish()
+        kinds[name] = col.kind
+    return ColumnStore(uids, from_uids, columns)
+
+
+def read_csv(csvfile: tp.Iterable[str], chunk_size: int = 10000) -> Experiment:
+    """
+    Reads a CSV file into an :class:`hiplot.Experiment` with typed columns.
+    Rows are read and converted by chunks of `chunk_size` rows. The raw text of typed values is kept in case their column
+    is converted to strings later, but for large files only when it can't be written again from the values (eg `007`, or timestamps).
+
+    Columns types are inferred in this order: integers, floats (empty values are NaNs), booleans,
+    timestamps in ISO 8601 format (converted to seconds, and rendered as :attr:`hiplot.ValueType.TIMESTAMP`),
+    and strings. When a value does not fit in the current type of its column, the column is converted to a more generic type.
+    """
+    reader = csv.reader(csvfile)
+    try:
+        header = next(reader)
+    except StopIteration:
+        return Experiment._from_columns(ColumnStore([], []))
+    store, kinds = read_records(header, reader, chunk_size=chunk_size)
+    return experiment_from_columns(store, kinds)
+
+
+def _merged_kind(kinds: tp.List[tp.Optional[str]]) -> tp.Optional[str]:
+    # `None` for chunks with only empty values
+    known = {k for k in kinds if k is not None}
+    if not known:
+        return None
+    if len(known) == 1 and None not in kinds:
+        return known.pop()
+    return FLOAT if known <= {INT, FLOAT} else STR
+
+
+def merge_kinds(chunks_kinds: tp.List[tp.Dict[str, tp.Optional[str]]]) -> tp.Dict[str, tp.Optional[str]]:
+    """
+    Returns the types of the columns of a CSV file, given the types of the columns of its chunks
+    (converted separately with :func:`read_records`), as if the chunks had been read one after the other.
+    """
+    if not chunks_kinds:
+        return {}
+    return {name: _merged_kind([kinds[name] for kinds in chunks_kinds]) for name in chunks_kinds[0]}
+
+
+def merge_records(chunks: tp.List[tp.Tuple[ColumnStore, tp.Dict[str, tp.Optional[str]]]]) -> tp.Tuple[ColumnStore, tp.Dict[str, tp.Optional[str]]]:
+    """
+    Merges chunks of a CSV file converted separately with :func:`read_records`, with the types given by :func:`merge_kinds`.
+    Chunks converted to other types must be read again with these types first (see the `kinds` argument of :func:`read_records`):
+    values can't be converted from one type to another without losing their original text.
+    """
+    non_empty = [(store, kinds) for store, kinds in chunks if len(store)]
+    if not non_empty:
+        return chunks[0] if chunks else (ColumnStore([], []), {})
+    merged_kinds = merge_kinds([kinds for _, kinds in non_empty])
+    for _, kinds in non_empty:
+        assert kinds == merged_kinds, "Chunk read with different types"
+    return ColumnStore.concat([store for store, _ in non_empty]), merged_kinds
+
+
+def column_kinds(xp: Experiment) -> tp.Dict[str, tp.Optional[str]]:
+    """
+    Returns the types of the columns of an experiment read with :func:`read_csv` (the inverse of :func:`experiment_from_columns`)
+    """
+    kinds: tp.Dict[str, tp.Optional[str]] = {}
+    for name, col in xp._get_columns().columns.items():
+        typecode = column_typecode(col)
+        if typecode == "q":
+            definition = xp.parameters_definition.get(name)
+            kinds[name] = TIMESTAMP if definition is not None and definition.type == ValueType.TIMESTAMP else INT
+        elif typecode == "d":
+            kinds[name] = FLOAT
+        else:
+            first = next((v for v in col if v != ''), None)
+            kinds[name] = None if first is None else BOOL if isinstance(first, bool) else STR
+    return kinds
+
+
+def experiment_from_columns(store: ColumnStore, kinds: tp.Dict[str, tp.Optional[str]]) -> Experiment:
+    xp = Experiment._from_columns(store)
+    for name, kind in kinds.items():
+        if kind == TIMESTAMP:
+            xp.parameters_definition[name].type = ValueType.TIMESTAMP
+    return xp
+
+
+def read_records(header: tp.List[str], reader: tp.Iterator[tp.List[str]], chunk_size: int = 10000,
+                 row_offset: int = 0, kinds: tp.Optional[tp.Dict[str, tp.Optional[str]]] = None
+                 ) -> tp.Tuple[ColumnStore, tp.Dict[str, tp.Optional[str]]]:
+    """
+    Converts the records of a CSV file (after its header) to typed columns, as :func:`read_csv` does.
+    Returns the columns, and their types.
+
+    :param row_offset: Number of previous rows in the file, for default uids
+    :param kinds: Types to start with for some columns (eg the types of the whole file, see :func:`merge_kinds`)
+    """
+    uids: tp.List[str] = []
+    from_uids: tp.List[tp.Optional[str]] = []
+    uid_idx = header.index("uid") if "uid" in header else None
+    from_uid_idx = header.index("from_uid") if "from_uid" in header else None
+    columns = {name: (i, _TypedColumn()) for i, name in enumerate(header) if name not in RESERVED_COLUMNS}
+    for name, (_, col) in columns.items():
+        col.kind = (kinds or {}).get(name)
+        if col.kind is not None:
+            col.data = _convert(col.kind, [], col.strings)
+    num_fields = len(header)
+    unchecked_text = 0
+    while True:
+        chunk = list(itertools.islice(reader, chunk_size))
+        if not chunk:
+            break
+        _pad_rows(chunk, num_fields)
+        fields = list(zip(*chunk))
+        if uid_idx is not None:
+            uids.extend(fields[uid_idx])
+        else:
+            uids.extend(str(k) for k in range(row_offset + len(uids), row_offset + len(uids) + len(chunk)))
+        if from_uid_idx is not None:
+            from_uids.extend(f if f != '' else None for f in fields[from_uid_idx])
+        else:
+            from_uids.extend([None] * len(chunk))
+        for col_idx, col in columns.values():
+            unchecked_text += col.extend(fields[col_idx])
+        del chunk, fields
+        if unchecked_text > _MAX_UNCHECKED_TEXT:
+            for _, col in columns.values():
+                col.check_raw()
+            unchecked_text = 0
+
+    store = ColumnStore(uids, from_uids, {name: col.finish() for name, (_, col) in columns.items()})
+    return store, {name: col.kind for name, (_, col) in columns.items()}
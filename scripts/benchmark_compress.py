@@ -0,0 +1,56 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Compares `datapoints_compressed` formats v1 and v2: payload size (raw and gzipped),
+encoding time and decoding time (JSON parsing + python reference decoder).
+
+Usage: python scripts/benchmark_compress.py [--rows 200000]
+"""
+
+import argparse
+import gzip
+import json
+import random
+import time
+import typing as tp
+
+import hiplot as hip
+from hiplot.compress import compress, uncompress
+
+
+def make_sweep(num_rows: int) -> hip.Experiment:
+    rng = random.Random(0)
+    rows: tp.List[tp.Dict[str, tp.Any]] = []
+    for run in range(max(1, num_rows // 100)):
+        params = {"lr": rng.choice([0.1, 0.01, 0.001]), "optimizer": rng.choice(["sgd", "adam", "adamw"]), "seed": run}
+        for epoch in range(100):
+            rows.append({"run": f"run_{run}", "epoch": epoch, "timestamp": 1600000000 + 60 * len(rows),
+                         "loss": rng.random(), **params})
+    xp = hip.Experiment.from_iterable(rows[:num_rows])
+    xp._get_columns().from_uids = [None] + [str(i) for i in range(len(rows[:num_rows]) - 1)]
+    return xp
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    store = make_sweep(args.rows)._get_columns()
+    print(f"{len(store)} rows, {len(store.columns)} columns")
+    for version in [1, 2]:
+        start = time.perf_counter()
+        payload = json.dumps(compress(store, version=version))
+        encode_time = time.perf_counter() - start
+        start = time.perf_counter()
+        uncompress(json.loads(payload))
+        decode_time = time.perf_counter() - start
+        gzipped = gzip.compress(payload.encode("utf-8"))
+        print(f"v{version}: {len(payload) / 1e6:8.2f} MB ({len(gzipped) / 1e6:6.2f} MB gzipped)"
+              f" - encode {encode_time:.2f}s - decode {decode_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Load test of the HiPlot server: compares the Flask development server with the async (ASGI) mode.
+Starts each server on a CSV experiment, then sends `/data` requests from concurrent clients
+and reports throughput and latency percentiles.
+
+Usage: python scripts/benchmark_server.py [--rows 20000] [--clients 32] [--duration 10] [--workers 4] [--no-cache]
+Requires `uvicorn` for the async mode.
+"""
+
+import argparse
+import http.client
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import typing as tp
+import urllib.parse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from benchmark_compress import make_sweep  # noqa: E402  # pylint: disable=wrong-import-position
+
+
+def wait_for_server(port: int, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def run_clients(port: int, path: str, clients: int, duration: float) -> tp.List[float]:
+    latencies: tp.List[float] = []
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def client() -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        while time.time() < deadline:
+            start = time.time()
+            conn.request("GET", path, headers={"Accept-Encoding": "gzip"})
+            response = conn.getresponse()
+            response.read()
+            assert response.status == 200, response.status
+            with lock:
+                latencies.append(time.time() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies
+
+
+def report(name: str, latencies: tp.List[float], duration: float) -> None:
+    latencies = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+    print(f"{name:<24} {len(latencies) / duration:>8.1f} req/s   "
+          f"p50 {percentile(0.5):>8.1f} ms   p99 {percentile(0.99):>8.1f} ms   max {latencies[-1] * 1000:>8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--no-cache", action="store_true", help="Parse the experiment again on every request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = str(Path(tmpdir) / "sweep.csv")
+        make_sweep(args.rows).to_csv(csv_path)
+        path = "/data?" + urllib.parse.urlencode({"uri": csv_path})
+        common = ["--cache-entries", "0" if args.no_cache else "16"]
+        modes = {
+            "flask": [],
+            "async (1 worker)": ["--async"],
+            f"async ({args.workers} workers)": ["--async", "--workers", str(args.workers)],
+        }
+        print(f"{args.rows} rows, {args.clients} clients, {'no cache' if args.no_cache else 'cache enabled'}")
+        for i, (name, mode_args) in enumerate(modes.items()):
+            port = 5100 + i
+            server = subprocess.Popen(
+                [sys.executable, "-c", "import sys; from hiplot.server import run_server_main; sys.exit(run_server_main())",
+                 "--port", str(port)] + common + mode_args,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_for_server(port)
+                run_clients(port, path, 1, 0.5)  # Warmup
+                report(name, run_clients(port, path, args.clients, args.duration), args.duration)
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
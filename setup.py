@@ -52,6 +52,7 @@ setup(
         'console_scripts': [
             'hiplot = hiplot.server:run_server_main',
             'hiplot-render = hiplot.render:hiplot_render_main',
+            'hiplot-cache = hiplot.disk_cache:hiplot_cache_main',
         ]
     },
     python_requires='>=3.6',
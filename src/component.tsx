@@ -46,7 +46,11 @@ type PluginComponentClass<P> = React.ComponentClass<P>;
 type PluginClass = React.ClassType<HiPlotPluginData, PluginComponent<HiPlotPluginData>, PluginComponentClass<HiPlotPluginData>>;
 interface PluginsMap {[k: string]: PluginClass; };
 
-type LoadURIPromiseResult = {experiment: HiPlotExperiment} | {error: string};
+// For experiments that are received progressively, or that keep growing, `subscribe` follows new datapoints
+// until the returned function is called.
+export type ExperimentUpdate = {datapoints: Array<Datapoint>} | {reload: LoadURIPromise};
+type SubscribeToUpdates = (on_update: (update: ExperimentUpdate) => void) => (() => void);
+type LoadURIPromiseResult = {experiment: HiPlotExperiment, subscribe?: SubscribeToUpdates} | {error: string};
 export type LoadURIPromise = Promise<LoadURIPromiseResult>;
 
 // Makes a Promise cancelable
@@ -155,6 +159,7 @@ export class HiPlot extends React.Component<HiPlotProps, HiPlotState> {
     rootRef = React.createRef<HTMLDivElement>();
 
     plugins_window_state: {[plugin: string]: any} = {};
+    unsubscribeUpdates: (() => void) | null = null;  // See `onExperimentUpdate`
 
     plugins_ref: {[plugin: string]: React.RefObject<PluginClass>} = {}; // For debugging/tests
 
@@ -205,13 +210,23 @@ export class HiPlot extends React.Component<HiPlotProps, HiPlotState> {
     }
     makeDatasets(experiment: HiPlotExperiment | null, dp_lookup: DatapointLookup, initial_filters: Array<Filter>): IDatasets {
         if (experiment) {
-            const rows_all_unfiltered = experiment.datapoints.map(function(t) {
-                var obj_with_uid = $.extend({
-                    "uid": t.uid,
-                    "from_uid": t.from_uid,
-                }, t.values);
-                dp_lookup[t.uid] = obj_with_uid;
-                return obj_with_uid;
+            var rows_all_unfiltered: Array<Datapoint>;
+            const columns = experiment.datapoints_columns;
+            if (experiment.datapoints === undefined && columns !== undefined) {
+                rows_all_unfiltered = new Array(columns.num_rows);
+                for (var row = 0; row < columns.num_rows; ++row) {
+                    rows_all_unfiltered[row] = columns.row(row);
+                }
+            } else {
+                rows_all_unfiltered = experiment.datapoints.map(function(t) {
+                    return $.extend({
+                        "uid": t.uid,
+                        "from_uid": t.from_uid,
+                    }, t.values);
+                });
+            }
+            rows_all_unfiltered.forEach(function(row) {
+                dp_lookup[row.uid] = row;
             });
             var rows_filtered = rows_all_unfiltered;
             try {
@@ -251,7 +266,7 @@ export class HiPlot extends React.Component<HiPlotProps, HiPlotState> {
     }.bind(this), 200);
     _loadExperiment(experiment: HiPlotExperiment) {
         // Uncompress if compressed
-        if (experiment.datapoints === undefined) {
+        if (experiment.datapoints === undefined && experiment.datapoints_compressed !== undefined) {
             experiment.datapoints = uncompress(experiment.datapoints_compressed);
         }
 
@@ -303,10 +318,68 @@ export class HiPlot extends React.Component<HiPlotProps, HiPlotState> {
             ...datasets,
         }; });
     }
+    _followUpdates(data: {subscribe?: SubscribeToUpdates}) {
+        if (data.subscribe !== undefined) {
+            this.unsubscribeUpdates = data.subscribe(this.onExperimentUpdate.bind(this));
+        }
+    }
+    onExperimentUpdate(update: ExperimentUpdate) {
+        if ("reload" in update) {
+            this.loadWithPromise(update.reload);
+            return;
+        }
+        this.appendDatapoints(update.datapoints);
+    }
+    appendDatapoints(datapoints: Array<Datapoint>) {
+        /**
+         * Adds datapoints to the experiment (or updates them if they have the same uid as an existing one),
+         * and keeps the current filters and selection
+         */
+        this.setState(function(this: HiPlot, state: Readonly<HiPlotState>, props): Partial<HiPlotState> {
+            const dp_lookup = state.dp_lookup;
+            const added = [];
+            datapoints.forEach(function(t) {
+                const existing = dp_lookup[t.uid];
+                if (existing !== undefined) {
+                    Object.assign(existing, t.values, {"from_uid": t.from_uid});
+                    return;
+                }
+                const obj_with_uid = $.extend({
+                    "uid": t.uid,
+                    "from_uid": t.from_uid,
+                }, t.values);
+                dp_lookup[t.uid] = obj_with_uid;
+                added.push(obj_with_uid);
+            });
+            var added_filtered = added;
+            var added_selected = added;
+            try {
+                added_filtered = apply_filters(added, state.rows_filtered_filters);
+                added_selected = state.rows_selected_filter ? apply_filter(added_filtered, state.rows_selected_filter) : added_filtered;
+            } catch (err) {
+                console.error("Error trying to apply filters to new rows:", err);
+            }
+            // New arrays, so that plugins see the updated rows
+            const rows_all_unfiltered = state.rows_all_unfiltered.concat(added);
+            const rows_filtered = state.rows_filtered.concat(added_filtered);
+            return {
+                rows_all_unfiltered: rows_all_unfiltered,
+                rows_filtered: rows_filtered,
+                rows_selected: state.rows_selected.concat(added_selected),
+                params_def: this.createNewParamsDef(rows_filtered),
+                params_def_unfiltered: Object.assign({}, state.params_def_unfiltered,
+                    infertypes(state.persistentState.children(PSTATE_PARAMS), rows_all_unfiltered, state.params_def_unfiltered)),
+            };
+        }.bind(this));
+    }
     getColorForRow(trial: Datapoint, alpha: number): string {
         return colorScheme(this.state.params_def[this.state.colorby], trial[this.state.colorby], alpha, this.state.colormap);
     };
     loadWithPromise(prom: LoadURIPromise) {
+        if (this.unsubscribeUpdates) {
+            this.unsubscribeUpdates();
+            this.unsubscribeUpdates = null;
+        }
         this.setState({
             loadStatus: HiPlotLoadStatus.Loading,
             loadPromise: makeCancelable(prom)
@@ -319,6 +392,9 @@ export class HiPlot extends React.Component<HiPlotProps, HiPlotState> {
         if (this.state.loadPromise) {
             this.state.loadPromise.cancel();
         }
+        if (this.unsubscribeUpdates) {
+            this.unsubscribeUpdates();
+        }
         this.callSelectedUidsHooks.cancel();
         this.callFilteredUidsHooks.cancel();
     }
@@ -363,7 +439,10 @@ export class HiPlot extends React.Component<HiPlotProps, HiPlotState> {
             this.state.loadPromise != prevState.loadPromise) {
             const prom = this.state.loadPromise.promise;
             const me = this;
-            prom.then(function(data: {error?: string, experiment?: HiPlotExperiment}) {
+            prom.then(function(data: {error?: string, experiment?: HiPlotExperiment, subscribe?: SubscribeToUpdates, load_errors?: {[uri: string]: string}}) {
+                if (data.load_errors !== undefined) {
+                    console.warn("Some experiments could not be loaded", data.load_errors);
+                }
                 if (data.error !== undefined) {
                     console.log("Experiment loading failed", data);
                     me.setState({
@@ -374,6 +453,7 @@ export class HiPlot extends React.Component<HiPlotProps, HiPlotState> {
                     return;
                 }
                 me._loadExperiment(data.experiment);
+                me._followUpdates(data);
             })
             .catch(
                 error => {
@@ -5,15 +5,18 @@
  * LICENSE file in the root directory of this source tree.
  */
 
-import $ from "jquery";
-import {LoadURIPromise} from "../component";
+import {decode_binary_experiment, is_binary_experiment} from "../lib/binary";
+import {uncompress} from "../lib/compress";
+import {parse_json} from "../lib/json";
+import {ExperimentUpdate, LoadURIPromise} from "../component";
 import {DataProviderProps} from "../plugin";
-import {HiPlotLoadStatus} from "../types";
+import {Datapoint, HiPlotLoadStatus} from "../types";
 import React from "react";
 import style from "../hiplot.scss";
 
 
 export const PSTATE_LOAD_URI = 'load_uri';
+export const PSTATE_STREAM = 'stream';
 
 
 interface TextAreaProps {
@@ -86,27 +89,208 @@ export class RunsSelectionTextArea extends React.Component<TextAreaProps, TextAr
 }
 
 
-export function loadURIFromWebServer(uri: string): LoadURIPromise {
+// Experiments are requested in binary format (see `binary_format.py`): numeric columns don't need to be parsed,
+// and the browser revalidates the experiments it already has with their ETag.
+// Big experiments can be streamed instead with `stream` (`hip.stream=true` in the URL of the page), see `loadURIStreamFromWebServer`.
+export function loadURIFromWebServer(uri: string, stream: boolean = false): LoadURIPromise {
+    if (stream) {
+        return loadURIStreamFromWebServer(uri);
+    }
+    return new Promise(function(resolve, reject) {
+        const request = new XMLHttpRequest();
+        request.open("GET", "/data?format=binary&uri=" + encodeURIComponent(uri));
+        request.responseType = "arraybuffer";
+        request.onload = function() {
+            if (request.status != 200) {
+                reject(request);
+                return;
+            }
+            const buffer: ArrayBuffer = request.response;
+            if (!is_binary_experiment(buffer)) {
+                // Errors are sent as JSON
+                resolve(parse_json(new TextDecoder("utf-8").decode(new Uint8Array(buffer))));
+                return;
+            }
+            const data = decode_binary_experiment(buffer);
+            const num_rows = data.experiment.datapoints_columns.num_rows;
+            if (data.live && typeof EventSource !== "undefined") {
+                data.subscribe = function(on_update: (update: ExperimentUpdate) => void) {
+                    return followLiveUpdates(uri, num_rows, on_update);
+                };
+            }
+            delete data.live;
+            resolve(data);
+        };
+        request.onerror = function() {
+            resolve({
+                'error': 'Network error'
+            });
+        };
+        request.send();
+    })
+}
+
+// The experiment is streamed (see `stream_format.py`): we display the first datapoints while the others are still being received.
+// The promise resolves with the first chunk of datapoints, and the next chunks are added to the plots as updates (see `HiPlot.appendDatapoints`).
+function loadURIStreamFromWebServer(uri: string): LoadURIPromise {
     return new Promise(function(resolve, reject) {
-        $.get( "/data?uri=" + encodeURIComponent(uri), resolve, "json").fail(function(data) {
-            if (data.readyState == 4 && data.status == 200) {
-                console.log('Unable to parse JSON with JS default decoder (Maybe it contains NaNs?). Using eval');
-                resolve(eval('(' + data.responseText + ')')); // Less secure, but so much faster...
-//                resolve(JSON5.parse(data.responseText));
+        var header = null;
+        var resolved = false;
+        var num_rows = 0;
+        var done = false;
+        var parsed_len = 0;  // Length of the response text that we already parsed
+        var pending: Array<Array<Datapoint>> = [];  // Chunks received before the plots subscribe to updates
+        var on_update: ((update: ExperimentUpdate) => void) | null = null;
+        var stop_live: (() => void) | null = null;
+        var stopped = false;
+
+        function send_chunk(datapoints: Array<Datapoint>) {
+            num_rows += datapoints.length;
+            if (!resolved) {
+                resolved = true;
+                const data = Object.assign({}, header, {experiment: Object.assign({}, header.experiment, {datapoints: datapoints})});
+                delete data.num_rows;
+                delete data.live;
+                data.subscribe = subscribe;
+                resolve(data);
+            } else if (on_update !== null) {
+                on_update({datapoints: datapoints});
+            } else {
+                pending.push(datapoints);
+            }
+        }
+        function follow_live() {
+            if (on_update !== null && done && header.live && typeof EventSource !== "undefined") {
+                stop_live = followLiveUpdates(uri, num_rows, on_update);
+            }
+        }
+        function subscribe(callback: (update: ExperimentUpdate) => void): () => void {
+            on_update = callback;
+            pending.forEach(datapoints => callback({datapoints: datapoints}));
+            pending = [];
+            follow_live();
+            return function() {
+                stopped = true;
+                on_update = null;
+                request.abort();
+                if (stop_live !== null) {
+                    stop_live();
+                }
+            };
+        }
+        function parse_lines(final: boolean): void {
+            const text: string = request.responseText;
+            while (parsed_len < text.length && !stopped) {
+                var end = text.indexOf("\n", parsed_len);
+                if (end == -1) {
+                    if (!final || header !== null) {
+                        break;  // Incomplete line
+                    }
+                    end = text.length;  // Errors are sent as a single line without trailing newline
+                }
+                const line = parse_json(text.substring(parsed_len, end));
+                parsed_len = end + 1;
+                if (header === null) {
+                    header = line;
+                } else if (line.done) {
+                    done = true;
+                } else {
+                    send_chunk(uncompress(line.datapoints_compressed));
+                }
+            }
+        }
+
+        const request = new XMLHttpRequest();
+        request.open("GET", "/data?format=stream&uri=" + encodeURIComponent(uri));
+        request.onprogress = function() {
+            if (request.status == 200) {
+                parse_lines(false);
+            }
+        };
+        request.onload = function() {
+            if (request.status != 200) {
+                reject(request);
+                return;
+            }
+            parse_lines(true);
+            if (header !== null && header.error !== undefined) {
+                resolve(header);
+                return;
             }
-            else if (data.status == 0) {
+            if (!done) {
+                console.error("Connection closed before the experiment was fully received");
                 resolve({
-                    'error': 'Network error'
+                    'error': 'Connection closed before the experiment was fully received'
                 });
                 return;
             }
-            else {
-                reject(data);
+            if (!resolved) {
+                send_chunk([]);  // Experiment without datapoints
             }
-        });
+            follow_live();
+        };
+        request.onerror = function() {
+            resolve({
+                'error': 'Network error'
+            });
+        };
+        request.send();
     })
 }
 
+// Server-sent events tell us when datapoints are added to the experiment (see `DataService.get_live_events`),
+// and we then request the new datapoints. Returns a function to stop following updates.
+function followLiveUpdates(uri: string, num_rows: number, on_update: (update: ExperimentUpdate) => void): () => void {
+    var watermark = `${num_rows}`;
+    var closed = false;
+    var fetching = false;
+    var fetch_again = false;
+    const events = new EventSource("/data_events?uri=" + encodeURIComponent(uri) + "&watermark=" + encodeURIComponent(watermark));
+    function stop() {
+        closed = true;
+        events.close();
+    }
+    function fetch_delta() {
+        if (fetching) {
+            fetch_again = true;
+            return;
+        }
+        fetching = true;
+        const request = new XMLHttpRequest();
+        request.open("GET", "/data?format=delta&uri=" + encodeURIComponent(uri) + "&watermark=" + encodeURIComponent(watermark));
+        request.onload = function() {
+            fetching = false;
+            if (closed || request.status != 200) {
+                return;
+            }
+            const delta = parse_json(request.responseText);
+            if (delta.error !== undefined) {
+                console.warn("Live updates failed", delta.error);
+                stop();
+                return;
+            }
+            if (delta.reset) {
+                // The experiment was rewritten
+                stop();
+                on_update({reload: loadURIFromWebServer(uri)});
+                return;
+            }
+            watermark = delta.watermark;
+            on_update({datapoints: uncompress(delta.datapoints_compressed)});
+            if (fetch_again) {
+                fetch_again = false;
+                fetch_delta();
+            }
+        };
+        request.onerror = function() {
+            fetching = false;
+        };
+        request.send();
+    }
+    events.addEventListener("update", fetch_delta);
+    return stop;
+}
+
 interface State {
     uri?: string;
 }
@@ -120,16 +304,19 @@ export class WebserverDataProvider extends React.Component<DataProviderProps, St
     }
     refresh(): Promise<any> | null {
         console.assert(this.state.uri);
-        return loadURIFromWebServer(this.state.uri);
+        return this.load(this.state.uri);
+    }
+    load(uri: string): LoadURIPromise {
+        return loadURIFromWebServer(uri, this.props.persistentState.get(PSTATE_STREAM, false));
     }
     componentDidMount() {
         if (this.state.uri !== undefined) {
-            this.props.onLoadExperiment(loadURIFromWebServer(this.state.uri));
+            this.props.onLoadExperiment(this.load(this.state.uri));
         }
     }
     componentDidUpdate(prevProps: DataProviderProps, prevState: State): void {
         if (this.state.uri != prevState.uri) {
-            this.props.onLoadExperiment(loadURIFromWebServer(this.state.uri));
+            this.props.onLoadExperiment(this.load(this.state.uri));
             this.props.persistentState.set(PSTATE_LOAD_URI, this.state.uri);
         }
     }
@@ -12,6 +12,7 @@ import {
   Streamlit,
 } from "./streamlit"
 import { HiPlot } from "./hiplot";
+import { parse_json } from "./lib/json";
 
 import ReactDOM from "react-dom";
 import { ComponentProps } from "./streamlit/StreamlitReact";
@@ -32,7 +33,7 @@ class ReactTemplate extends StreamlitComponentBase<State> {
       selected_uids: null,
       filtered_uids: null,
       brush_extents: null,
-      experiment: eval('(' + props.args.experiment + ')'),
+      experiment: parse_json(props.args.experiment),
       experimentJson: props.args.experiment,
     };
   }
@@ -75,7 +76,7 @@ class ReactTemplate extends StreamlitComponentBase<State> {
     const newExp = this.props.args['experiment'];
     if (newExp != this.state.experimentJson) {
       this.setState({
-        experiment: eval('(' + newExp + ')'),
+        experiment: parse_json(newExp),
         experimentJson: newExp
       });
     }
@@ -13,6 +13,7 @@ import React from "react";
 import ReactDOM from "react-dom";
 import { PlotXY } from "./plotxy";
 import { build_props } from "./hiplot_web";
+export { parse_json } from "./lib/json";
 
 
 interface TesterState {
@@ -106,7 +107,7 @@ export class HiPlotTester extends React.Component<{hiplotProps: HiPlotProps}, Te
             clearInterval(this.timeout);
             this.setState({
                 testNum: 0,
-                keepCount: Math.floor(this.hiplot.current.state.experiment.datapoints.length / 2),
+                keepCount: Math.floor(this.hiplot.current.state.rows_all_unfiltered.length / 2),
             });
         }
     }
@@ -12,6 +12,8 @@ import { PersistentStateInURL } from "./lib/savedstate";
 import { WebserverDataProvider } from "./dataproviders/webserver";
 import { StaticDataProvider } from "./dataproviders/static";
 import { UploadDataProvider } from "./dataproviders/upload";
+import { base64_to_buffer, decode_binary_experiment } from "./lib/binary";
+export { parse_json } from "./lib/json";
 
 
 export function build_props(extra?: any): HiPlotProps {
@@ -28,6 +30,10 @@ export function build_props(extra?: any): HiPlotProps {
     if (extra !== undefined) {
         Object.assign(props, extra);
     }
+    if (extra.experiment_binary !== undefined) {  // See `Experiment.to_html(binary=True)`
+        props.experiment = decode_binary_experiment(base64_to_buffer(extra.experiment_binary)).experiment;
+        delete (props as any).experiment_binary;
+    }
     if (extra.dataProviderName !== undefined) {
         props.dataProvider = {
             'webserver': WebserverDataProvider,
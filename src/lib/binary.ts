@@ -0,0 +1,72 @@
+/*
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+import { ColumnarDatapoints, EncodedColumn } from "../types";
+import { decode_column, decode_from_uids } from "./compress";
+import { parse_json } from "./json";
+
+// See `binary_format.py` for the description of the format
+export const BINARY_MIME_TYPE = "application/vnd.hiplot.experiment";
+const MAGIC = "HIPB";
+
+interface BinaryColumn {
+    name: string;
+    dtype: "float64" | "int32" | "json";
+    offset?: number;
+    values?: EncodedColumn;
+};
+
+export function is_binary_experiment(buffer: ArrayBuffer): boolean {
+    if (buffer.byteLength < MAGIC.length + 4) {
+        return false;
+    }
+    const magic = new Uint8Array(buffer, 0, MAGIC.length);
+    for (var i = 0; i < MAGIC.length; ++i) {
+        if (magic[i] != MAGIC.charCodeAt(i)) {
+            return false;
+        }
+    }
+    return true;
+}
+
+// Returns the `extra` data sent with the experiment, with an `experiment` key (datapoints are in `experiment.datapoints_columns`)
+export function decode_binary_experiment(buffer: ArrayBuffer): any {
+    if (!is_binary_experiment(buffer)) {
+        throw new Error("Not an HiPlot binary experiment");
+    }
+    const header_len = new DataView(buffer).getUint32(MAGIC.length, true);
+    const buffers_start = MAGIC.length + 4 + header_len;
+    const header = parse_json(new TextDecoder("utf-8").decode(new Uint8Array(buffer, MAGIC.length + 4, header_len)));
+    const num_rows: number = header.num_rows;
+    const uids = decode_column(header.uid, num_rows);
+    const from_uids = decode_from_uids(header.from_uid, uids, num_rows);
+    const columns: Array<BinaryColumn> = header.columns;
+    // Numeric columns are views on the buffer (buffers are aligned by the python side)
+    const values: Array<ArrayLike<any>> = columns.map(function(col) {
+        switch (col.dtype) {
+            case "float64":
+                return new Float64Array(buffer, buffers_start + col.offset, num_rows);
+            case "int32":
+                return new Int32Array(buffer, buffers_start + col.offset, num_rows);
+            case "json":
+                return decode_column(col.values, num_rows);
+        }
+        throw new Error(`Unknown column dtype: ${col.dtype}`);
+    });
+    // Datapoints stay in their columns: the rows displayed are read from them directly (see `HiPlot.makeDatasets`)
+    header.experiment.datapoints_columns = new ColumnarDatapoints(columns.map(col => col.name), uids, from_uids, values);
+    return Object.assign({}, header.extra, {experiment: header.experiment});
+}
+
+export function base64_to_buffer(data: string): ArrayBuffer {
+    const raw = atob(data);
+    const bytes = new Uint8Array(raw.length);
+    for (var i = 0; i < raw.length; ++i) {
+        bytes[i] = raw.charCodeAt(i);
+    }
+    return bytes.buffer;
+}
@@ -5,10 +5,78 @@
  * LICENSE file in the root directory of this source tree.
  */
 
-import { Datapoint, DatapointsCompressed } from "../types";
+import { Datapoint, DatapointsCompressed, DatapointsCompressedV1, DatapointsCompressedV2, EncodedColumn } from "../types";
 
-// See `compress.py` for compression code on the python side
-export function uncompress(compressed_data: DatapointsCompressed) {
+const BASE62_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ";
+
+// Mirror of `compact_uid` in `columns.py`
+function compact_uid(index: number): string {
+    if (index < 62) {
+        return BASE62_DIGITS[index];
+    }
+    var digits = "";
+    while (index) {
+        digits = BASE62_DIGITS[index % 62] + digits;
+        index = Math.floor(index / 62);
+    }
+    return digits;
+}
+
+export function decode_column(enc: EncodedColumn, num_rows: number): Array<any> {
+    switch (enc.enc) {
+        case "raw":
+            return enc.values;
+        case "rle": {
+            const values = new Array(num_rows);
+            var pos = 0;
+            for (var i = 0; i < enc.values.length; ++i) {
+                const v = enc.values[i];
+                const end = pos + enc.lengths[i];
+                for (; pos < end; ++pos) {
+                    values[pos] = v;
+                }
+            }
+            return values;
+        }
+        case "delta": {
+            // Don't modify the payload in place
+            const values = enc.values.enc == "raw" ? enc.values.values.slice() : decode_column(enc.values, num_rows);
+            for (var i = 1; i < values.length; ++i) {
+                values[i] += values[i - 1];
+            }
+            return values;
+        }
+        case "dict": {
+            const lookup = enc.dict;
+            return decode_column(enc.values, num_rows).map(idx => lookup[idx]);
+        }
+        case "index": {
+            const values = new Array(num_rows);
+            for (var i = 0; i < num_rows; ++i) {
+                values[i] = `${i + enc.offset}`;
+            }
+            return values;
+        }
+        case "compact_index": {
+            const values = new Array(num_rows);
+            const offset = enc.offset !== undefined ? enc.offset : 0;
+            for (var i = 0; i < num_rows; ++i) {
+                values[i] = compact_uid(i + offset);
+            }
+            return values;
+        }
+    }
+    throw new Error(`Unknown column encoding: ${(enc as any).enc}`);
+}
+
+export function decode_from_uids(enc: EncodedColumn, uids: Array<string>, num_rows: number): Array<string | null> {
+    if (enc.enc == "uid_ref") {
+        return decode_column(enc.values, num_rows).map((d, row) => d === null ? null : uids[row - d]);
+    }
+    return decode_column(enc, num_rows);
+}
+
+function uncompress_v1(compressed_data: DatapointsCompressedV1): Array<Datapoint> {
     const columns = compressed_data.columns;
     const rows = compressed_data.rows;
     return rows.map(function(row) {
@@ -23,4 +91,33 @@ export function uncompress(compressed_data: DatapointsCompressed) {
         });
         return dp;
     });
- }
+}
+
+function uncompress_v2(compressed_data: DatapointsCompressedV2): Array<Datapoint> {
+    const num_rows = compressed_data.num_rows;
+    const columns = compressed_data.columns;
+    const uids = decode_column(compressed_data.uid, num_rows);
+    const from_uids = decode_from_uids(compressed_data.from_uid, uids, num_rows);
+    const values = compressed_data.values.map(enc => decode_column(enc, num_rows));
+    const datapoints: Array<Datapoint> = new Array(num_rows);
+    for (var row = 0; row < num_rows; ++row) {
+        const dp_values = {};
+        for (var c = 0; c < columns.length; ++c) {
+            dp_values[columns[c]] = values[c][row];
+        }
+        datapoints[row] = {
+            'uid': uids[row],
+            'from_uid': from_uids[row],
+            'values': dp_values,
+        };
+    }
+    return datapoints;
+}
+
+// See `compress.py` for compression code on the python side
+export function uncompress(compressed_data: DatapointsCompressed): Array<Datapoint> {
+    if ((compressed_data as DatapointsCompressedV2).version == 2) {
+        return uncompress_v2(compressed_data as DatapointsCompressedV2);
+    }
+    return uncompress_v1(compressed_data as DatapointsCompressedV1);
+}
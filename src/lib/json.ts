@@ -0,0 +1,51 @@
+/*
+ * Copyright (c) Facebook, Inc. and its affiliates.
+ *
+ * This source code is licensed under the MIT license found in the
+ * LICENSE file in the root directory of this source tree.
+ */
+
+// Special floats are not valid JSON, so python sends them as sentinel strings (see `jsonenc.py`).
+// Other strings that start with the sentinel prefix are escaped with another prefix.
+const SENTINEL_PREFIX = "__hip_";
+const SENTINELS = {
+    "__hip_NaN__": NaN,
+    "__hip_Inf__": Infinity,
+    "__hip_-Inf__": -Infinity,
+};
+
+function revive_value(v: any): any {
+    if (typeof v == "string") {
+        if (!v.startsWith(SENTINEL_PREFIX)) {
+            return v;
+        }
+        return SENTINELS.hasOwnProperty(v) ? SENTINELS[v] : v.substring(SENTINEL_PREFIX.length);
+    }
+    if (v !== null && typeof v == "object") {
+        revive_special_floats(v);
+    }
+    return v;
+}
+
+// Replaces sentinels with special floats, in place
+function revive_special_floats(obj: any): void {
+    if (Array.isArray(obj)) {
+        for (var i = 0; i < obj.length; ++i) {
+            obj[i] = revive_value(obj[i]);
+        }
+        return;
+    }
+    for (var k in obj) {
+        if (obj.hasOwnProperty(k)) {
+            obj[k] = revive_value(obj[k]);
+        }
+    }
+}
+
+export function parse_json(text: string): any {
+    const obj = JSON.parse(text);
+    if (text.indexOf(SENTINEL_PREFIX) != -1) {
+        revive_special_floats(obj);
+    }
+    return obj;
+}
@@ -38,14 +38,68 @@ export interface HiPlotValueDef { // Mirror of python `hip.ValueDef`
     label_html: string | null;
 };
 
-export interface DatapointsCompressed {
+export interface DatapointsCompressedV1 {
     columns: Array<string>;
     rows: Array<Array<any>>;
 };
 
+export type EncodedColumn =
+    {enc: "raw", values: Array<any>} |
+    {enc: "rle", values: Array<any>, lengths: Array<number>} |
+    {enc: "delta", values: EncodedColumn} |
+    {enc: "dict", dict: Array<any>, values: EncodedColumn} |
+    {enc: "index", offset: number} |
+    {enc: "compact_index", offset?: number} |
+    {enc: "uid_ref", values: EncodedColumn};
+
+export interface DatapointsCompressedV2 { // See `compress.py` for the description of the format
+    version: 2;
+    num_rows: number;
+    columns: Array<string>;
+    uid: EncodedColumn;
+    from_uid: EncodedColumn;
+    values: Array<EncodedColumn>;
+};
+
+export type DatapointsCompressed = DatapointsCompressedV1 | DatapointsCompressedV2;
+
+// Datapoints stored column by column (see `lib/binary.ts`): numeric columns are typed arrays, and rows are read with accessors
+export class ColumnarDatapoints {
+    num_rows: number;
+    columns: Array<string>;
+    uids: ArrayLike<string>;
+    from_uids: ArrayLike<string | null>;
+    values: Array<ArrayLike<any>>;
+    column_index: {[key: string]: number} = {};
+
+    constructor(columns: Array<string>, uids: ArrayLike<string>, from_uids: ArrayLike<string | null>, values: Array<ArrayLike<any>>) {
+        this.num_rows = uids.length;
+        this.columns = columns;
+        this.uids = uids;
+        this.from_uids = from_uids;
+        this.values = values;
+        columns.forEach((name, c) => { this.column_index[name] = c; });
+    }
+    value(row: number, column: string): any {
+        return this.values[this.column_index[column]][row];
+    }
+    // Returns a row as displayed in the plots: an object with the uid, the from_uid and the values of the datapoint
+    row(row: number): Datapoint {
+        const obj: Datapoint = {
+            "uid": this.uids[row],
+            "from_uid": this.from_uids[row],
+        };
+        for (var c = 0; c < this.columns.length; ++c) {
+            obj[this.columns[c]] = this.values[c][row];
+        }
+        return obj;
+    }
+}
+
 export interface HiPlotExperiment { // Mirror of python `hip.Experiment`
     datapoints: Array<Datapoint>,
     datapoints_compressed?: DatapointsCompressed,
+    datapoints_columns?: ColumnarDatapoints,
     parameters_definition?: {[key: string]: HiPlotValueDef},
     colormap?: string;
     colorby?: string;